@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+
+#
+# # Batched confidence computation
+#
+# Spectrum and sweep experiments evaluate the confidence of the same causal
+# endpoints for thousands of different sets of evidenced nodes. The paths
+# between the endpoints do not depend on the evidence, so we compute once how
+# much each node contributes to the confidence when it is evidenced (its
+# importance times the number of paths via the node). The confidence of every
+# evidence configuration is then one row of a matrix-vector product
+#
+#   confidences = evidence_matrix . contributions
+#
+# where `evidence_matrix[i, j]` tells whether the `j`-th node is evidenced in
+# the `i`-th configuration.
+import numpy as np
+import networkx as nx
+
+from hypotest.confidence import compute_confidence, importance_kernel
+from hypotest.graph_generation.hypoth_conf import sort_hypoth_conf_endpoints
+from hypotest.graph_generation import path_counting
+
+
+# ## Contributions of the nodes
+#
+# Contribution of each node in `nodes` to the confidence between `source` and
+# `target`, nodes which are on no path contribute zero
+def node_contributions(hypothgraph, source, target, nodes=None,
+                       func_importance=compute_confidence.default_node_importance_measure):
+    """
+    (hypothgraph, source, target, [node...]) -> np.array([contribution...])
+
+    Nodes are all the nodes of the hypothgraph if not given, source and target
+    should already be sorted topologically
+
+    """
+    if nodes is None:
+        nodes = hypothgraph.nodes()
+
+    nb_paths_through = path_counting.paths_through(hypothgraph, source, target)
+    if nb_paths_through is None:
+        nb_paths_through = path_counting.enumerated_paths_through(
+                hypothgraph, source, target)
+
+    kernel = importance_kernel.importance_kernel(hypothgraph, func_importance)
+
+    return kernel.contributions(nodes, nb_paths_through)
+
+
+# ## Confidences of many evidence configurations
+def batch_confidence(hypothgraph, source, target, evidence_matrix, nodes=None,
+                     normalized=False,
+                     func_importance=compute_confidence.default_node_importance_measure):
+    """
+    (hypothgraph, source, target, bool[n_configs, n_nodes], [node...]) ->
+        np.array([confidence...])
+
+    Column `j` of the evidence matrix refers to `nodes[j]`, nodes are all the
+    nodes of the hypothgraph (`hypothgraph.nodes()`) if not given. We return
+    one confidence (or normalized confidence) per row of the evidence matrix
+
+    """
+    if nodes is None:
+        nodes = hypothgraph.nodes()
+
+    evidence_matrix = np.asarray(evidence_matrix, dtype=bool)
+    if evidence_matrix.ndim != 2 or evidence_matrix.shape[1] != len(nodes):
+        raise ValueError(
+            "evidence matrix should be of shape (n_configs, {}), got {}".format(
+                len(nodes), evidence_matrix.shape))
+
+    # re-order topologically, note that sort_boundary
+    # throws exception if there are no paths from source to target
+    try:
+        source, target = sort_hypoth_conf_endpoints(hypothgraph, source, target)
+    except nx.NetworkXNoPath:
+        print("No path between {} and {}".format(source, target))
+        return np.full(len(evidence_matrix),
+                       float(compute_confidence.MIN_CONFIDENCE))
+
+    contributions = node_contributions(hypothgraph, source, target, nodes,
+                                       func_importance=func_importance)
+    confidences = evidence_matrix.dot(contributions)
+
+    if normalized:
+        max_confidence_measure = compute_confidence.max_confidence(
+                hypothgraph, source, target, func_importance=func_importance)
+        confidences = confidences / max_confidence_measure
+
+    return confidences
@@ -33,10 +33,14 @@ author: Asan Agibetov
 # `u` to any node `v`.
 #
 import functools
+from collections import namedtuple
 from operator import itemgetter
 import networkx as nx
 
 from hypotest.graph_generation.hypoth_conf import sort_hypoth_conf_endpoints
+from hypotest.graph_generation import path_counting
+from hypotest.confidence import importance_kernel
+from hypotest.utils.utils import graph_memo
 
 # ## Constants
 #
@@ -46,24 +50,23 @@ MIN_CONFIDENCE = 0
 # ## Node importance measures
 #
 # The default global importance measure is `evidence_weight` x
-# `importance_weight`
-def default_node_importance_measure(hypothgraph, node):
-    """
-    (hypothgraph, node) -> contribution measure
-
-    """
-    # evidence_weight = hypothgraph.node[node]["evidence_weight"]
-    # importance_weight = hypothgraph.node[node]["importance_weight"]
-
-    # return evidence_weight * importance_weight
-
-    return 1
+# `importance_weight`, for now every node counts the same. Any
+# `(hypothgraph, node) -> importance` callable can be used instead, or an
+# importance measure which computes all the nodes at once (see
+# `importance_kernel`)
+#
+#   importance_kernel.attribute_importance('importance_weight')
+default_node_importance_measure = importance_kernel.unit_importance
 
 
 # Given a path compute a weighted path of all the nodes, where each nodes
-# importance is contributed if he is evidenced or not
+# importance is contributed if he is evidenced or not. Callers scoring many
+# paths with the same evidence pass the importance kernel of the hypothgraph
+# and its evidence mask, otherwise we only ask the importance of the evidenced
+# nodes of the path
 def weighted_path(hypothgraph, nodes_in_path, evidenced_nodes=[],
-                  func_importance=default_node_importance_measure):
+                  func_importance=default_node_importance_measure,
+                  kernel=None, mask=None):
     """
     (hypothgraph, path, fun: node_measure) -> float
 
@@ -79,12 +82,20 @@ def weighted_path(hypothgraph, nodes_in_path, evidenced_nodes=[],
     fn_importance (optional)
         function which chooses how to compute confidence contribution for one node
 
+    kernel, mask (optional)
+        importance kernel of the hypothgraph and its evidence mask, the mask
+        replaces the evidenced nodes
+
     """
-    return sum(
-        func_importance(hypothgraph, node)
-        for node in nodes_in_path
-        if node in evidenced_nodes
-    )
+    if kernel is not None:
+        if mask is None:
+            mask = kernel.evidence_mask(evidenced_nodes)
+        return kernel.path_weight(nodes_in_path, mask)
+
+    evidenced_nodes = set(evidenced_nodes)
+
+    return float(sum(func_importance(hypothgraph, node)
+                     for node in nodes_in_path if node in evidenced_nodes))
 
 
 # Wrapper function to compute tha max confidence, by currying
@@ -97,9 +108,60 @@ def max_weighted_path(hypothgraph, nodes_in_path, **kwargs):
     return f(**kwargs)
 
 
+# ## Sum of weighted paths
+#
+# Confidence is additive over the nodes, every evidenced node contributes its
+# importance once per simple path it lies on. Whenever the region between
+# `source` and `target` has no cycles we count the paths via every node (linear
+# time) instead of enumerating all the simple paths. With cycles, only the
+# paths inside of the strongly connected components are enumerated. Evidenced
+# nodes `None` means that all the nodes are evidenced, i.e. the max confidence
+def sum_weighted_paths(hypothgraph, source, target, evidenced_nodes=None,
+                       func_importance=default_node_importance_measure):
+    """
+    (hypothgraph, source, target, [node...]) -> float
+
+    Source and target should already be sorted topologically
+
+    """
+    nb_paths_through = path_counting.paths_through(hypothgraph, source, target)
+
+    # source is the same as target, we have to enumerate all the cycles
+    if nb_paths_through is None:
+        return enumerate_weighted_paths(hypothgraph, source, target,
+                                        evidenced_nodes,
+                                        func_importance=func_importance)
+
+    kernel = importance_kernel.importance_kernel(hypothgraph, func_importance)
+    mask = None
+    if evidenced_nodes is not None:
+        mask = kernel.evidence_mask(evidenced_nodes)
+
+    return kernel.weighted_sum(nb_paths_through, mask)
+
+
+# Same sum by enumeration of all simple paths from `source` to `target`
+def enumerate_weighted_paths(hypothgraph, source, target, evidenced_nodes=None,
+                             func_importance=default_node_importance_measure):
+    simple_paths = nx.all_simple_paths(hypothgraph, source, target)
+
+    kernel = importance_kernel.importance_kernel(hypothgraph, func_importance)
+    mask = None
+    if evidenced_nodes is not None:
+        mask = kernel.evidence_mask(evidenced_nodes)
+
+    weighted_path_values = [
+        kernel.path_weight(simple_path, mask)
+        for simple_path in simple_paths
+    ]
+
+    return float(sum(weighted_path_values))
+
+
 # For a given hypothesis configuration compute the confidence which you can get
 # as a proportion of the mean weighted path to the mean weighted path whenever
 # all the nodes in the path are evidenced
+@graph_memo
 def confidence(hypothgraph, hypoth_conf,
                func_importance=default_node_importance_measure, log=False):
     """
@@ -127,27 +189,20 @@ def confidence(hypothgraph, hypoth_conf,
         print("No path between {} and {}".format(source, target))
         return MIN_CONFIDENCE
 
-    # compute all paths between source and target
-    simple_paths = nx.all_simple_paths(hypothgraph, source, target)
-
     # Compute weighted paths for all simple paths with a given node importance
     # function
-    weighted_path_values = [
-        weighted_path(hypothgraph, simple_path,
-                      evidenced_nodes, func_importance=func_importance)
-        for simple_path in simple_paths
-    ]
-
-    # nb_paths = len(weighted_path_values)
+    confidence_measure = sum_weighted_paths(hypothgraph, source, target,
+                                            evidenced_nodes,
+                                            func_importance=func_importance)
 
     if log:
-        print("confidence measures are {}".format(confidence_measures))
+        print("confidence measure is {}".format(confidence_measure))
 
-    # return sum(weighted_path_values)/float(nb_paths)
-    return float(sum(weighted_path_values))
+    return confidence_measure
 
 # Max confidence we can get wrt. hypothesis configuration. We evidence all the
 # nodes in the path and compute its maximum possible confidence.
+@graph_memo
 def max_confidence(hypothgraph, source, target,
                    func_importance=default_node_importance_measure):
     # re-order topologically, note that sort_boundary
@@ -158,36 +213,77 @@ def max_confidence(hypothgraph, source, target,
         print("No path between {} and {}".format(source, target))
         return MIN_CONFIDENCE
 
-    # compute all paths between source and target
-    simple_paths = nx.all_simple_paths(hypothgraph, source, target)
-
     # Compute weighted paths for all simple paths with a given node importance
-    # function
-    max_weighted_path_values = [
-        max_weighted_path(hypothgraph, simple_path, func_importance=func_importance)
-        for simple_path in simple_paths
-    ]
-
-    # nb_paths = len(max_weighted_path_values)
-
-    # return sum(max_weighted_path_values)/float(nb_paths)
-    return float(sum(max_weighted_path_values))
+    # function, all nodes in the paths are evidenced
+    return sum_weighted_paths(hypothgraph, source, target,
+                              func_importance=func_importance)
 
 # Normalized confidence is our confidence normalized by the max possible
 # confidence
 def normalized_confidence(hypothgraph, hypoth_conf,
                           func_importance=default_node_importance_measure):
+    report = confidence_report(hypothgraph, hypoth_conf,
+                               func_importance=func_importance)
+    if report is None:
+        return MIN_CONFIDENCE
+
+    return report.normalized
+
+
+# ## Confidence, max confidence and normalized confidence at once
+#
+# The endpoints are sorted once, the paths via every node are counted once, and
+# both sums are taken over the same counts: the confidence with the evidence
+# mask, the max confidence without. With `paths`, every simple path from source
+# to target is also listed with its own confidence and max confidence (this
+# enumerates the paths)
+ConfidenceReport = namedtuple('ConfidenceReport',
+                              ['source', 'target', 'confidence',
+                               'max_confidence', 'normalized', 'paths'])
+
+PathConfidence = namedtuple('PathConfidence',
+                            ['path', 'confidence', 'max_confidence'])
+
+
+@graph_memo
+def confidence_report(hypothgraph, hypoth_conf,
+                      func_importance=default_node_importance_measure,
+                      paths=False):
+    """
+    (hypothgraph, hypoth_conf, func, bool) -> ConfidenceReport
+
+    `paths` of the report is None unless asked for, a tuple of PathConfidence
+    otherwise
+
+    """
     source, target = hypoth_conf.source, hypoth_conf.target
-    evidenced_nodes = hypoth_conf.evidenced_nodes
+
     # re-order topologically, note that sort_boundary
     # throws exception if there are no paths from source to target
     try:
         source, target = sort_hypoth_conf_endpoints(hypothgraph, source, target)
     except nx.NetworkXNoPath:
         print("No path between {} and {}".format(source, target))
-        return MIN_CONFIDENCE
+        return None
+
+    nb_paths_through = path_counting.paths_through(hypothgraph, source, target)
+    if nb_paths_through is None:
+        nb_paths_through = path_counting.enumerated_paths_through(
+                hypothgraph, source, target)
+
+    kernel = importance_kernel.importance_kernel(hypothgraph, func_importance)
+    mask = kernel.evidence_mask(hypoth_conf.evidenced_nodes)
+
+    confidence_measure = kernel.weighted_sum(nb_paths_through, mask)
+    max_confidence_measure = kernel.weighted_sum(nb_paths_through)
 
-    confidence_measure = confidence(hypothgraph, hypoth_conf, func_importance=func_importance)
-    max_confidence_measure = max_confidence(hypothgraph, source, target, func_importance=func_importance)
+    path_confidences = None
+    if paths:
+        path_confidences = tuple(
+            PathConfidence(tuple(path), kernel.path_weight(path, mask),
+                           kernel.path_weight(path))
+            for path in nx.all_simple_paths(hypothgraph, source, target))
 
-    return float(confidence_measure)/max_confidence_measure
+    return ConfidenceReport(
+        source, target, confidence_measure, max_confidence_measure,
+        confidence_measure / max_confidence_measure, path_confidences)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Confidence sessions
+#
+# A curation session keeps the causal endpoints fixed and toggles the evidence
+# of one node at a time. Confidence is additive over the evidenced nodes
+#
+#   confidence = sum(contribution[node] for node in evidenced_nodes)
+#
+# where the contribution of a node is its importance times the number of paths
+# via the node (see `batch_confidence`). A session counts the paths once, and
+# then asserting or unasserting the evidence of a node adds or subtracts its
+# contribution. The gain of evidencing a missing node is its contribution, so
+# the ranking of the missing nodes (see `node_contribution`) is kept sorted and
+# a toggled node only leaves or re-enters it.
+#
+# Edits of the hypothgraph go through the session. Arcs and nodes which are on
+# no path between the endpoints change nothing, otherwise we count the paths of
+# the region between the endpoints again and update only the nodes whose counts
+# changed. Any other change of the hypothgraph calls for `refresh`. On acyclic
+# hypothgraphs the session can read the counts from a `DynamicPathCounts`, the
+# edits then update the counts of the cones of the arc instead of walking the
+# region, and arcs creating cycles are rejected
+import bisect
+import math
+
+from hypotest.confidence import compute_confidence, importance_kernel
+from hypotest.graph_generation import path_counting
+from hypotest.graph_generation.hypoth_conf import Hypoth_Conf, \
+    sort_hypoth_conf_endpoints
+
+
+class ConfidenceSession(object):
+    """Confidence of a hypothesis under changing evidence"""
+
+    def __init__(self, hypothgraph, source, target, evidenced_nodes=(),
+                 func_importance=compute_confidence.default_node_importance_measure,
+                 path_counts=None):
+        self.hypothgraph = hypothgraph
+        self.path_counts = path_counts
+        # edits go through the dynamic counts if we have them
+        self.editor = hypothgraph if path_counts is None else path_counts
+        self.func_importance = func_importance
+        # re-order topologically, throws exception if there is no path
+        self.source, self.target = sort_hypoth_conf_endpoints(
+                hypothgraph, source, target)
+        self.evidenced = set()
+        for node in evidenced_nodes:
+            self._check_node(node)
+            self.evidenced.add(node)
+
+        self.refresh()
+
+    # ## Evidence
+    def assert_evidence(self, node):
+        self._check_node(node)
+        if node in self.evidenced:
+            return
+
+        self.evidenced.add(node)
+        self._unrank(node)
+        self.confidence += self.contributions[node]
+
+    def unassert_evidence(self, node):
+        self._check_node(node)
+        if node not in self.evidenced:
+            return
+
+        self.evidenced.discard(node)
+        self.confidence -= self.contributions[node]
+        self._rank(node)
+
+    def toggle_evidence(self, node):
+        if node in self.evidenced:
+            self.unassert_evidence(node)
+        else:
+            self.assert_evidence(node)
+
+    # ## Reads
+    def normalized_confidence(self):
+        if not self.max_confidence:
+            return compute_confidence.MIN_CONFIDENCE
+
+        return self.confidence / self.max_confidence
+
+    # Same as `node_contribution.most_informative_missing_node`
+    def most_informative_missing_node(self, top_k=None):
+        """(int) -> [(node, gain)...], the most informative first"""
+        ranking = self._ranking if top_k is None else self._ranking[:top_k]
+
+        return [(node, -neg_gain) for neg_gain, _, node in ranking]
+
+    def hypoth_conf(self):
+        """-> Hypoth_Conf(source, target, evidenced_nodes)"""
+        return Hypoth_Conf(self.source, self.target,
+                           [node for node in self._order
+                            if node in self.evidenced])
+
+    # ## Structural edits
+    def add_edge(self, u, v, **attr):
+        new_nodes = [node for node in (u, v) if node not in self.hypothgraph]
+        self.editor.add_edge(u, v, **attr)
+        for node in new_nodes:
+            self._add_node(node)
+
+        if self._on_new_path(u, v):
+            self._recount()
+
+    def remove_edge(self, u, v):
+        self.editor.remove_edge(u, v)
+        if self.counts.get(u) and self.counts.get(v):
+            self._recount()
+
+    def add_node(self, node, **attr):
+        is_new = node not in self.hypothgraph
+        self.editor.add_node(node, **attr)
+        if is_new:
+            self._add_node(node)
+
+    def remove_node(self, node):
+        if node in (self.source, self.target):
+            raise ValueError("cannot remove the endpoint {}".format(node))
+
+        on_path = self.counts.pop(node, 0)
+        self.unassert_evidence(node)
+        self._set_contribution(node, 0.0)
+        self._unrank(node)
+        self.editor.remove_node(node)
+        del self.contributions[node]
+        self._order.pop(node)
+
+        if on_path:
+            self._recount()
+
+    # The importance of `node` has changed (e.g. its attributes)
+    def update_importance(self, node):
+        self._check_node(node)
+        nb_paths = self.counts.get(node, 0)
+        if nb_paths:
+            self._set_contribution(
+                node, self.func_importance(self.hypothgraph, node) * nb_paths)
+
+    # ## Full recompute
+    def refresh(self):
+        hypothgraph = self.hypothgraph
+        self._order = dict((node, i)
+                           for i, node in enumerate(hypothgraph.nodes_iter()))
+        self._next_order = len(self._order)
+        self.evidenced &= set(self._order)
+        self.counts = self._paths_through()
+
+        nodes = list(self._order)
+        kernel = importance_kernel.importance_kernel(hypothgraph,
+                                                     self.func_importance)
+        self.contributions = dict(zip(
+            nodes, kernel.contributions(nodes, self.counts).tolist()))
+
+        self.max_confidence = math.fsum(self.contributions.values())
+        self.confidence = math.fsum(self.contributions[node]
+                                    for node in self.evidenced)
+        self._ranking = sorted(self._rank_entry(node) for node in nodes
+                               if node not in self.evidenced)
+
+    # ## Internals
+    def _check_node(self, node):
+        if node not in self.hypothgraph:
+            raise KeyError(node)
+
+    def _paths_through(self):
+        if self.path_counts is not None and self.source != self.target:
+            return self.path_counts.paths_through(self.source, self.target)
+
+        nb_paths_through = path_counting.paths_through(
+                self.hypothgraph, self.source, self.target)
+        if nb_paths_through is None:
+            nb_paths_through = path_counting.enumerated_paths_through(
+                    self.hypothgraph, self.source, self.target)
+
+        return nb_paths_through
+
+    # Local recompute, only the nodes whose number of paths changed
+    def _recount(self):
+        counts = self._paths_through()
+        changed = [node for node in set(self.counts) | set(counts)
+                   if self.counts.get(node, 0) != counts.get(node, 0)]
+        self.counts = counts
+
+        for node in changed:
+            nb_paths = counts.get(node, 0)
+            contribution = 0.0
+            if nb_paths:
+                contribution = self.func_importance(self.hypothgraph,
+                                                    node) * nb_paths
+            self._set_contribution(node, contribution)
+
+    # An arc is on a new path if we can reach `u` from the source and the
+    # target from `v` (without walking past the endpoints)
+    def _on_new_path(self, u, v):
+        source, target = self.source, self.target
+        if u == target or v == source:
+            return False
+
+        hypothgraph = self.hypothgraph
+
+        def successors_until_target(node):
+            if node == target:
+                return ()
+            return hypothgraph.successors_iter(node)
+
+        def predecessors_until_source(node):
+            if node == source:
+                return ()
+            return hypothgraph.predecessors_iter(node)
+
+        return (u in path_counting.reachable(successors_until_target, source)
+                and v in path_counting.reachable(predecessors_until_source,
+                                                 target))
+
+    def _add_node(self, node):
+        self._order[node] = self._next_order
+        self._next_order += 1
+        self.contributions[node] = 0.0
+        self._rank(node)
+
+    def _set_contribution(self, node, contribution):
+        delta = contribution - self.contributions[node]
+        if not delta:
+            return
+
+        if node in self.evidenced:
+            self.confidence += delta
+        else:
+            self._unrank(node)
+        self.contributions[node] = contribution
+        self.max_confidence += delta
+        if node not in self.evidenced:
+            self._rank(node)
+
+    # The ranking is sorted by decreasing gain, ties in the order of the nodes
+    # of the hypothgraph
+    def _rank_entry(self, node):
+        return (-self.contributions[node], self._order[node], node)
+
+    def _rank(self, node):
+        bisect.insort(self._ranking, self._rank_entry(node))
+
+    def _unrank(self, node):
+        key = self._rank_entry(node)[:2]
+        i = bisect.bisect_left(self._ranking, key)
+        if i < len(self._ranking) and self._ranking[i][:2] == key:
+            del self._ranking[i]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Importance kernels
+#
+# Scoring a path sums the importance of its evidenced nodes. Instead of calling
+# `func_importance(hypothgraph, node)` and testing `node in evidenced_nodes` for
+# every node of every path, a kernel numbers the nodes of the hypothgraph and
+# keeps
+#
+# - the importance of every node in a NumPy vector
+# - the evidence as a boolean mask over the same numbering
+#
+# and a path is scored by gathering and summing the importance of its evidenced
+# nodes.
+#
+# An importance measure computes the importance vector of all the nodes at once
+# (`unit_importance`, `attribute_importance`). The usual per node callables
+# still work: the kernel calls them only for the nodes it needs, the first time
+# it needs them, and keeps the values. Kernels are cached per hypothgraph and
+# importance until the hypothgraph changes (see `utils.graph_memo`).
+import functools
+import weakref
+
+import numpy as np
+
+from hypotest.utils.utils import graph_memo
+
+
+# ## Importance measures
+#
+# A measure is also a per node callable, hence it can be passed wherever a
+# `func_importance` is expected. Measures are pickled by reference to their
+# vector function, which should be a module-level function (or a
+# `functools.partial` of one) so that workers of other processes can load it
+class ImportanceMeasure(object):
+    """Importance of many nodes at once, (hypothgraph, [node...]) -> vector"""
+
+    def __init__(self, fn_vector, name=None):
+        self.fn_vector = fn_vector
+        self.name = name or '{}.{}'.format(fn_vector.__module__,
+                                           fn_vector.__name__)
+
+    def vector(self, hypothgraph, nodes):
+        """(hypothgraph, [node...]) -> np.array([importance...])"""
+        return np.asarray(self.fn_vector(hypothgraph, nodes),
+                          dtype=np.float64)
+
+    def __call__(self, hypothgraph, node):
+        return float(self.vector(hypothgraph, [node])[0])
+
+    def __reduce__(self):
+        return ImportanceMeasure, (self.fn_vector, self.name)
+
+    # stable between sessions (see `result_store`)
+    def __repr__(self):
+        return 'ImportanceMeasure({})'.format(self.name)
+
+
+# The decorated name is bound to the measure, hence the measure cannot be
+# pickled, use `ImportanceMeasure` with a private vector function instead
+def importance_measure(fn_vector):
+    """Decorator, vector function -> ImportanceMeasure"""
+    return ImportanceMeasure(fn_vector)
+
+
+# Every node is equally important
+def _unit_importance(hypothgraph, nodes):
+    return np.ones(len(nodes), dtype=np.float64)
+
+
+unit_importance = ImportanceMeasure(
+    _unit_importance, name='{}.unit_importance'.format(__name__))
+
+
+# Importance read from a node attribute, compiled hypothgraphs already keep
+# the weights as arrays
+def _attribute_importance(attribute, default, hypothgraph, nodes):
+    if hasattr(hypothgraph, 'weights_array'):
+        weights = hypothgraph.weights_array(attribute)
+        weights = weights[hypothgraph.node_ids(nodes)]
+        return np.where(np.isnan(weights), default, weights)
+
+    return np.fromiter(
+        (hypothgraph.node[node].get(attribute, default) for node in nodes),
+        dtype=np.float64, count=len(nodes))
+
+
+def attribute_importance(attribute, default=0.0):
+    """(attribute, float) -> ImportanceMeasure"""
+    return ImportanceMeasure(functools.partial(_attribute_importance,
+                                               attribute, default),
+                             name='attribute_importance({!r}, {!r})'.format(
+                                 attribute, default))
+
+
+# ## Kernel
+class ImportanceKernel(object):
+    """Importance vector over the numbered nodes of a hypothgraph"""
+
+    def __init__(self, hypothgraph, func_importance=unit_importance):
+        # cached kernels should not keep the hypothgraph alive
+        self.hypothgraph = weakref.ref(hypothgraph)
+        self.func_importance = func_importance
+        self.nodes = tuple(hypothgraph.nodes_iter())
+        self.index = dict((node, i) for i, node in enumerate(self.nodes))
+
+        if isinstance(func_importance, ImportanceMeasure):
+            self.importance = func_importance.vector(hypothgraph, self.nodes)
+            self.known = None
+        else:
+            self.importance = np.zeros(len(self.nodes), dtype=np.float64)
+            self.known = np.zeros(len(self.nodes), dtype=bool)
+
+    def node_ids(self, nodes):
+        """([node...]) -> np.array([id...])"""
+        index = self.index
+        return np.fromiter((index[node] for node in nodes), dtype=np.intp)
+
+    # Nodes which are not in the hypothgraph are never on a path, we skip them
+    def evidence_mask(self, evidenced_nodes):
+        """([node...]) -> bool[n_nodes]"""
+        mask = np.zeros(len(self.nodes), dtype=bool)
+        index = self.index
+        ids = [index[node] for node in evidenced_nodes if node in index]
+        mask[ids] = True
+
+        return mask
+
+    # Importance of the nodes with the given ids, per node callables are called
+    # for the nodes we have not seen yet
+    def weights(self, ids):
+        """(np.array([id...])) -> np.array([importance...])"""
+        if self.known is not None:
+            unknown = np.unique(ids[~self.known[ids]])
+            hypothgraph = self.hypothgraph()
+            for i in unknown:
+                self.importance[i] = self.func_importance(hypothgraph,
+                                                          self.nodes[i])
+            self.known[unknown] = True
+
+        return self.importance[ids]
+
+    # ### Scores
+    def path_weight(self, path, mask=None):
+        """([node...], bool[n_nodes]) -> sum of the evidenced importances"""
+        ids = self.node_ids(path)
+        if mask is not None:
+            ids = ids[mask[ids]]
+
+        return float(self.weights(ids).sum())
+
+    # `sum(importance(node) * count)` over the evidenced nodes
+    def weighted_sum(self, counts, mask=None):
+        """({node: count}, bool[n_nodes]) -> float"""
+        ids = self.node_ids(counts)
+        values = np.array(list(counts.values()), dtype=np.float64)
+        if mask is not None:
+            evidenced = mask[ids]
+            ids, values = ids[evidenced], values[evidenced]
+
+        return float(self.weights(ids).dot(values))
+
+    # Importance times count of every node in `nodes`, zero if not counted
+    def contributions(self, nodes, counts):
+        """([node...], {node: count}) -> np.array([contribution...])"""
+        contributions = np.zeros(len(nodes), dtype=np.float64)
+        positions = [j for j, node in enumerate(nodes) if counts.get(node, 0)]
+        if positions:
+            counted = [nodes[j] for j in positions]
+            values = np.array([counts[node] for node in counted],
+                              dtype=np.float64)
+            contributions[positions] = \
+                self.weights(self.node_ids(counted)) * values
+
+        return contributions
+
+
+# One kernel per hypothgraph and importance, rebuilt when the hypothgraph
+# changes
+@graph_memo
+def importance_kernel(hypothgraph, func_importance=unit_importance):
+    """(hypothgraph, func_importance) -> ImportanceKernel"""
+    return ImportanceKernel(hypothgraph, func_importance)
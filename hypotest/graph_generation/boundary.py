@@ -36,10 +36,16 @@ import networkx as nx
 import random
 import math
 
-from hypotest.graph_generation import hypoth_conf
+from hypotest.graph_generation import hypoth_conf, path_counting
+from hypotest.utils.utils import graph_memo
 
 
-# Generates all nodes accessible from source
+# Generates all nodes accessible from source, i.e. the nodes on the simple paths
+# from source to target. They are found by reachability (see
+# `path_counting.st_interior`), we only enumerate the paths when source and
+# target are the same node. The interior is memoized, hence it is returned as a
+# frozenset
+@graph_memo
 def in_boundary_interior(hypothgraph, source, target):
     # if there is no path, nothing we can do
     try:
@@ -47,9 +53,13 @@ def in_boundary_interior(hypothgraph, source, target):
     except Exception as e:
         raise e
 
+    boundary_interior = path_counting.st_interior(hypothgraph, source, target)
+    if boundary_interior is not None:
+        return frozenset(boundary_interior)
+
     simple_paths = nx.all_simple_paths(hypothgraph, source, target)
     all_nodes = (node for path in simple_paths for node in path)
-    boundary_interior = set(all_nodes)
+    boundary_interior = frozenset(all_nodes)
 
     return boundary_interior
 
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Dynamic path counting
+#
+# Curators add or remove one causal arc at a time. On an acyclic hypothgraph
+# the paths which use the arc `(u, v)` are a path into `u`, the arc, and a path
+# out of `v`, hence adding (removing) the arc changes the number of paths from
+# `a` to `b` by
+#
+#   paths(a, u) x paths(v, b)
+#
+# for the ancestors `a` of `u` (and `u`) and the descendants `b` of `v` (and
+# `v`), and nothing else changes. Paths into `u` and out of `v` never use the
+# arc itself, otherwise the hypothgraph would have a cycle. We keep the counts
+# of all the pairs (see `path_counting.all_pairs_path_counts`) and their mirror
+# `{v: {u: nb_paths_from_u_to_v}}`, so that an edit costs the size of the two
+# cones only.
+#
+# An arc `(u, v)` creates a cycle exactly when there is a path from `v` to `u`,
+# which we read from the counts. Such arcs are rejected, `creates_cycle` flags
+# them beforehand.
+from collections import defaultdict
+
+import networkx as nx
+
+from hypotest.graph_generation import path_counting
+
+
+class DynamicPathCounts(object):
+    """Path counts of all pairs of an acyclic hypothgraph, kept under edits"""
+
+    def __init__(self, hypothgraph):
+        successors = dict((node, hypothgraph.successors(node))
+                          for node in hypothgraph.nodes_iter())
+        if path_counting.region_topological_order(successors) is None:
+            raise nx.NetworkXUnfeasible(
+                "dynamic path counts need an acyclic hypothgraph")
+
+        self.hypothgraph = hypothgraph
+        self.counts = defaultdict(dict)
+        self.reverse = defaultdict(dict)
+        for u, node_counts in path_counting.all_pairs_path_counts(
+                hypothgraph).items():
+            self.counts[u] = node_counts
+            for v, nb_paths in node_counts.items():
+                self.reverse[v][u] = nb_paths
+
+    # ## Queries
+    def nb_paths(self, u, v):
+        """(u, v) -> number of paths from u to v"""
+        return self.counts[u].get(v, 0) if u in self.counts else 0
+
+    def creates_cycle(self, u, v):
+        """(u, v) -> True if adding the arc (u, v) creates a cycle"""
+        return u == v or self.nb_paths(v, u) > 0
+
+    # Same as `path_counting.paths_through` for `source != target`, read from
+    # the counts instead of walking the region between the endpoints
+    def paths_through(self, source, target):
+        """(source, target) -> {node: nb_paths_via_node}"""
+        nb_paths = self.nb_paths(source, target)
+        if not nb_paths:
+            return {}
+
+        from_source = self.counts[source]
+        nb_paths_through = dict(
+            (node, nb_from_source * self.counts[node][target])
+            for node, nb_from_source in from_source.items()
+            if target in self.counts[node])
+        nb_paths_through[source] = nb_paths
+        nb_paths_through[target] = nb_paths
+
+        return nb_paths_through
+
+    # ## Edits
+    def add_edge(self, u, v, **attr):
+        if self.creates_cycle(u, v):
+            raise nx.NetworkXUnfeasible(
+                "arc ({}, {}) creates a cycle".format(u, v))
+
+        is_new = not self.hypothgraph.has_edge(u, v)
+        self.hypothgraph.add_edge(u, v, **attr)
+        if is_new:
+            self._update(u, v, 1)
+
+    def remove_edge(self, u, v):
+        self.hypothgraph.remove_edge(u, v)
+        self._update(u, v, -1)
+
+    def add_node(self, node, **attr):
+        self.hypothgraph.add_node(node, **attr)
+
+    def remove_node(self, node):
+        for pred in self.hypothgraph.predecessors(node):
+            self.remove_edge(pred, node)
+        for succ in self.hypothgraph.successors(node):
+            self.remove_edge(node, succ)
+
+        self.hypothgraph.remove_node(node)
+        self.counts.pop(node, None)
+        self.reverse.pop(node, None)
+
+    # Add (`sign = 1`) or remove (`sign = -1`) the paths via the arc `(u, v)`
+    def _update(self, u, v, sign):
+        into_u = dict(self.reverse[u])
+        into_u[u] = 1
+        out_of_v = dict(self.counts[v])
+        out_of_v[v] = 1
+
+        for a, nb_into_u in into_u.items():
+            a_counts = self.counts[a]
+            for b, nb_out_of_v in out_of_v.items():
+                nb_paths = a_counts.get(b, 0) + sign * nb_into_u * nb_out_of_v
+                if nb_paths:
+                    a_counts[b] = nb_paths
+                    self.reverse[b][a] = nb_paths
+                else:
+                    del a_counts[b]
+                    del self.reverse[b][a]
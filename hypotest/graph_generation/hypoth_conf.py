@@ -25,6 +25,10 @@ from collections import namedtuple
 import itertools as it
 from operator import itemgetter
 
+from hypotest.setup_hypothgraph import reachability_index
+from hypotest.graph_generation import path_counting
+from hypotest.utils.utils import graph_memo
+
 # ## Hypothesis configuration
 #
 # Hypothesis configuration is a tuple (source, target, evidenced_nodes) that
@@ -33,30 +37,20 @@ Hypoth_Conf = namedtuple('Hypoth_Conf', ['source', 'target', 'evidenced_nodes'])
 
 
 # Given two nodes, we sort them topologically, we also check whether there is a
-# path between the two nodes
+# path between the two nodes. Versioned hypothgraphs answer both from their
+# reachability index, which is computed once and kept until the graph changes
+# (see `reachability_index.sort_endpoints`)
+@graph_memo
 def sort_hypoth_conf_endpoints(hypothgraph, u, v):
     """
     (hypothgraph, endpoint1, endpoint2) -> sorted(endpoint1, endpoint2)
 
     We run the topological sort on hypothgraph and make sure that u and v are correctly
-    sorted
+    sorted. We may have cycles, in that case no topological sorting is
+    possible and the endpoints are kept as they are
 
     """
-    # We may have cycles, in that case no topological sorting is possible
-    try:
-        topol_sorted = nx.topological_sort(hypothgraph)
-        u_index, v_index = topol_sorted.index(u), topol_sorted.index(v)
-        source, target = (u, v) if u_index < v_index else (v, u)
-
-    # TODO catch proper NetworkX exception (cf. definition of
-    # `nx.topological_sort`)
-    except Exception:
-        source, target = u, v
-
-    if not nx.has_path(hypothgraph, source, target):
-        raise Exception("No path between {} and {}".format(source, target))
-
-    return (source, target)
+    return reachability_index.sort_endpoints(hypothgraph, u, v)
 
 
 # ## Generation of correct source and target nodes
@@ -81,23 +75,36 @@ def generate_rich_endpoints(hypothgraph, min_nb_paths=1):
     return (random_pair[0], random_pair[1])
 
 # Sort all pairs of nodes and return the pair which maximizes the number of
-# paths
+# paths, `NetworkXNoPath` if there is no path between two different nodes
 def generate_max_endpoints(hypothgraph):
-    pairs = sorted_pairs(hypothgraph)
-    endpoints = max(pairs, key=itemgetter(2))
+    top_pairs = path_counting.top_pairs(hypothgraph, 1)
+    if not top_pairs:
+        raise nx.NetworkXNoPath("No path between two different nodes")
+
+    endpoints = top_pairs[0]
 
     return (endpoints[0], endpoints[1])
 
 
 ## Sort all pairs of nodes according to the number of simple paths between them
+#
+# The paths of all the pairs are counted at once (see
+# `path_counting.all_pairs_path_counts`), each pair `(u, v)` is oriented in the
+# direction with the most paths
 def sorted_pairs(hypothgraph):
     """Sort all pairs of nodes according to the number of simple paths between them"""
+    counts = path_counting.all_pairs_path_counts(hypothgraph)
+
     # list of tuples [(u, v, number_of_paths), ... ]
     pairs = []
 
     for u, v in it.combinations(hypothgraph.nodes_iter(), 2):
-        nb_paths_i = len(list(nx.all_simple_paths(hypothgraph, u, v)))
-        pairs.append((u, v, nb_paths_i))
+        nb_paths_uv = counts[u].get(v, 0)
+        nb_paths_vu = counts[v].get(u, 0)
+        if nb_paths_vu > nb_paths_uv:
+            pairs.append((v, u, nb_paths_vu))
+        else:
+            pairs.append((u, v, nb_paths_uv))
 
     return sorted(pairs, key=itemgetter(2))
 
@@ -111,23 +118,10 @@ def random_hypoth_conf_endpoints(digraph):
     (digraph) -> (source, target)
 
     """
-    min_length = 0
-    max_length = len(digraph.nodes())-1
-
-    s_index = random.randint(min_length, max_length)
-    t_index = random.randint(min_length, max_length)
+    # different source and target, with a path between them
+    index = reachability_index.reachability_index(digraph)
 
-    # convert indices in the array to ids in the graph
-    source = list(digraph.nodes_iter())[s_index]
-    target = list(digraph.nodes_iter())[t_index]
-
-    # recompute if source and target are the same, or if there is no path
-    # between them
-    if source == target or not nx.has_path(digraph, source, target):
-        return random_hypoth_conf_endpoints(digraph)
-
-    else:
-        return (source, target)
+    return index.random_reachable_pair()
 
 
 
@@ -140,8 +134,10 @@ def unassign_boundary(hypothgraph):
 
     # delete 'hypothesis_source' and 'hypothesis_target' from dict
     source, target = boundary_nodes
-    del hypothgraph[source]['hypothesis_source']
-    del hypothgraph[source]['hypothesis_target']
+    del hypothgraph.node[source]['hypothesis_source']
+    del hypothgraph.node[target]['hypothesis_target']
+
+    return hypothgraph
 
 
 # Assign boundary nodes to the digraph
@@ -152,7 +148,7 @@ def assign_boundary(hypothgraph, source, target):
     """
     # sort source, target (if not already sorted ) and check that there is a
     # path from source to target otherwise raise exception
-    source, target = sort_boundary(hypothgraph, source, target)
+    source, target = sort_hypoth_conf_endpoints(hypothgraph, source, target)
 
     # unassign previous boundary nodes
     hypothgraph = unassign_boundary(hypothgraph)
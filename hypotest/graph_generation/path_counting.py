@@ -0,0 +1,595 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Path counting
+#
+# Most of the hypothesis computations sum something over all the simple paths
+# between the causal endpoints. Enumerating the paths is exponential, however,
+# whenever the nodes between `source` and `target` do not form a cycle, every
+# walk is a simple path and we can count them instead. The number of paths from
+# `source` to `target` passing via `node` is then
+#
+#   paths(source, node) x paths(node, target)
+#
+# and both factors are obtained with one forward and one backward pass in the
+# topological order of the region between the endpoints.
+import heapq
+from collections import namedtuple, OrderedDict, defaultdict
+from operator import itemgetter
+
+import networkx as nx
+import numpy as np
+
+from hypotest.setup_hypothgraph.compiled_hypothgraph import CompiledHypothgraph
+
+
+# ## Reachability
+#
+# Nodes reachable from `start` by following `neighbours`, i.e.
+# `hypothgraph.successors_iter` or `hypothgraph.predecessors_iter`
+def reachable(neighbours, start):
+    """
+    (fun: node -> [node...], node) -> set(node...)
+
+    The `start` node is always part of the reachable set
+
+    """
+    seen = set([start])
+    fringe = [start]
+
+    while fringe:
+        node = fringe.pop()
+        for neighbour in neighbours(node):
+            if neighbour not in seen:
+                seen.add(neighbour)
+                fringe.append(neighbour)
+
+    return seen
+
+
+# ### Region between the endpoints
+#
+# All nodes which are reachable from `source` and from which we can reach
+# `target`. Simple paths stop as soon as they reach `target` and never come back
+# to `source`, so we do not walk past any of the two endpoints. Every simple
+# path from `source` to `target` goes through this region only
+def st_region(hypothgraph, source, target):
+    """
+    (hypothgraph, source, target) -> set(node...)
+
+    Empty set if there is no path from source to target
+
+    """
+    def successors_until_target(node):
+        if node == target:
+            return ()
+        return hypothgraph.successors_iter(node)
+
+    from_source = reachable(successors_until_target, source)
+
+    if target not in from_source:
+        return set()
+
+    def predecessors_from_source(node):
+        if node == source:
+            return ()
+        return (pred for pred in hypothgraph.predecessors_iter(node)
+                if pred in from_source)
+
+    return reachable(predecessors_from_source, target)
+
+
+# ### Arcs of the region
+#
+# Successors and predecessors of every node in the region. Simple paths never
+# use arcs going into `source` or going out of `target`, so we drop them too
+def region_adjacency(hypothgraph, region, source, target):
+    """
+    (hypothgraph, set(node...), source, target) ->
+        ({node: [successor...]}, {node: [predecessor...]})
+
+    """
+    successors = dict((node, []) for node in region)
+    predecessors = dict((node, []) for node in region)
+
+    for node in region:
+        if node == target:
+            continue
+        for succ in hypothgraph.successors_iter(node):
+            if succ in region and succ != source:
+                successors[node].append(succ)
+                predecessors[succ].append(node)
+
+    return successors, predecessors
+
+
+# ### Topological order of the region
+#
+# Kahn's algorithm on the arcs of the region, we return `None` if the region
+# contains a cycle
+def region_topological_order(successors):
+    """
+    ({node: [successor...]}) -> [node...] | None
+
+    """
+    in_degree = dict.fromkeys(successors, 0)
+    for node_successors in successors.values():
+        for succ in node_successors:
+            in_degree[succ] += 1
+
+    fringe = [node for node, degree in in_degree.items() if degree == 0]
+    order = []
+
+    while fringe:
+        node = fringe.pop()
+        order.append(node)
+        for succ in successors[node]:
+            in_degree[succ] -= 1
+            if in_degree[succ] == 0:
+                fringe.append(succ)
+
+    if len(order) < len(successors):
+        return None
+
+    return order
+
+
+# ## Forward and backward counts
+#
+# `paths_from_source[node]` is the number of paths from `source` to `node`,
+# `paths_to_target[node]` is the number of paths from `node` to `target`. We
+# keep python integers, so that the counts are exact on big graphs
+def forward_path_counts(predecessors, order):
+    """
+    ({node: [predecessor...]}, [source, ..., target]) ->
+        {node: nb_paths_from_source}
+
+    `order` is the topological order of the region, starting with the source
+
+    """
+    counts = {order[0]: 1}
+
+    for node in order[1:]:
+        counts[node] = sum(counts[pred] for pred in predecessors[node])
+
+    return counts
+
+
+def backward_path_counts(successors, order):
+    """
+    ({node: [successor...]}, [source, ..., target]) ->
+        {node: nb_paths_to_target}
+
+    """
+    counts = {order[-1]: 1}
+
+    for node in reversed(order[:-1]):
+        counts[node] = sum(counts[succ] for succ in successors[node])
+
+    return counts
+
+
+# ## Number of paths via every node
+#
+# For the acyclic region between `source` and `target` we return the number of
+# simple paths from `source` to `target` which pass via each node of the region.
+# Nodes outside of the region lie on no path and are not reported. If the region
+# has a cycle we cannot count, and we return `None`, the caller should then fall
+# back to the enumeration of the simple paths
+def acyclic_paths_through(hypothgraph, source, target):
+    """
+    (hypothgraph, source, target) -> {node: nb_paths_via_node} | None
+
+    """
+    if isinstance(hypothgraph, CompiledHypothgraph):
+        return on_compiled(acyclic_paths_through, hypothgraph, source, target)
+
+    # `all_simple_paths(source, source)` enumerates cycles, not paths
+    if source == target:
+        return None
+
+    region = st_region(hypothgraph, source, target)
+    if not region:
+        return {}
+
+    successors, predecessors = region_adjacency(
+            hypothgraph, region, source, target)
+
+    order = region_topological_order(successors)
+    if order is None:
+        return None
+
+    paths_from_source = forward_path_counts(predecessors, order)
+    paths_to_target = backward_path_counts(successors, order)
+
+    return dict((node, paths_from_source[node] * paths_to_target[node])
+                for node in order)
+
+
+# ## Regions with cycles
+#
+# If the region has cycles we condense it into its strongly connected
+# components. A simple path can never come back to a component it has left,
+# hence it crosses the components in their topological order: it enters each
+# component in one node, follows a simple path inside of it, and leaves it from
+# another (or the same) node. Only the paths inside each component have to be
+# enumerated, and only the big components pay the exponential cost.
+#
+# ### Component tables
+#
+# For every entry node of a component (the source, or a node with an arc from
+# another component) we enumerate once all the simple paths inside the
+# component which end in an exit node (the target, or a node with an arc to
+# another component). We keep the number of paths from each entry to each exit,
+# and how many of those paths pass via each node of the component
+ComponentTable = namedtuple('ComponentTable', ['nb_paths', 'nb_hits'])
+
+# Tables depend only on the arcs inside the component and on its entries and
+# exits, we keep the most recent ones
+_component_tables = OrderedDict()
+MAX_CACHED_COMPONENT_TABLES = 128
+
+
+def component_table(successors, component, entries, exits):
+    """
+    ({node: [successor...]}, set(node...), set(entry...), set(exit...)) ->
+        ComponentTable(nb_paths={(entry, exit): nb},
+                       nb_hits={(entry, exit): {node: nb}})
+
+    """
+    # a single node is a path on its own, there is nothing to enumerate
+    if len(component) == 1:
+        table = ComponentTable(nb_paths={}, nb_hits={})
+        for node in entries & exits:
+            table.nb_paths[(node, node)] = 1
+            table.nb_hits[(node, node)] = {node: 1}
+        return table
+
+    arcs = frozenset((node, succ)
+                     for node in component
+                     for succ in successors[node]
+                     if succ in component)
+    key = (arcs, frozenset(component), frozenset(entries), frozenset(exits))
+
+    if key in _component_tables:
+        _component_tables[key] = _component_tables.pop(key)
+        return _component_tables[key]
+
+    table = ComponentTable(nb_paths=defaultdict(int),
+                           nb_hits=defaultdict(lambda: defaultdict(int)))
+
+    for entry in entries:
+        for path in component_simple_paths(successors, component, entry):
+            if path[-1] in exits:
+                table.nb_paths[(entry, path[-1])] += 1
+                hits = table.nb_hits[(entry, path[-1])]
+                for node in path:
+                    hits[node] += 1
+
+    _component_tables[key] = table
+    if len(_component_tables) > MAX_CACHED_COMPONENT_TABLES:
+        _component_tables.popitem(last=False)
+
+    return table
+
+
+# All simple paths inside the component which start in `entry`, including the
+# path made of the `entry` alone
+def component_simple_paths(successors, component, entry):
+    """
+    ({node: [successor...]}, set(node...), node) -> generator([node...])
+
+    """
+    visited = [entry]
+    on_path = set(visited)
+    stack = [iter(successors[entry])]
+
+    yield list(visited)
+
+    while stack:
+        child = next(stack[-1], None)
+
+        if child is None:
+            stack.pop()
+            on_path.discard(visited.pop())
+        elif child in component and child not in on_path:
+            visited.append(child)
+            on_path.add(child)
+            stack.append(iter(successors[child]))
+            yield list(visited)
+
+
+# ### Combining the components
+#
+# In the topological order of the components, `arriving[entry]` is the number
+# of paths from `source` which enter the component of `entry` in `entry`, and
+# `leaving[exit]` the number of paths from `source` which leave the component
+# of `exit` from `exit`. Symmetrically `starting[entry]` and `finishing[exit]`
+# count the paths to `target`. The number of paths via a node is then
+#
+#   sum(arriving[entry] x nb_hits[entry, exit][node] x finishing[exit])
+#
+# over the entries and exits of its component
+def condensed_paths_through(hypothgraph, source, target):
+    """
+    (hypothgraph, source, target) -> {node: nb_paths_via_node} | None
+
+    `None` only if source and target are the same node
+
+    """
+    if isinstance(hypothgraph, CompiledHypothgraph):
+        return on_compiled(condensed_paths_through, hypothgraph, source, target)
+
+    if source == target:
+        return None
+
+    region = st_region(hypothgraph, source, target)
+    if not region:
+        return {}
+
+    successors, predecessors = region_adjacency(
+            hypothgraph, region, source, target)
+
+    region_graph = nx.DiGraph(successors)
+    condensed = nx.condensation(region_graph)
+    component_of = condensed.graph['mapping']
+    components = dict((index, set()) for index in condensed.nodes_iter())
+    for node, index in component_of.items():
+        components[index].add(node)
+
+    order = nx.topological_sort(condensed)
+
+    # entries, exits and tables of every component
+    entries, exits, tables = {}, {}, {}
+    for index in order:
+        component = components[index]
+        entries[index] = set(
+            node for node in component
+            if node == source or
+            any(component_of[pred] != index for pred in predecessors[node]))
+        exits[index] = set(
+            node for node in component
+            if node == target or
+            any(component_of[succ] != index for succ in successors[node]))
+        tables[index] = component_table(successors, component,
+                                        entries[index], exits[index])
+
+    # forward pass
+    arriving, leaving = {}, {}
+    for index in order:
+        nb_paths = tables[index].nb_paths
+        for entry in entries[index]:
+            arriving[entry] = 1 if entry == source else sum(
+                leaving[pred] for pred in predecessors[entry]
+                if component_of[pred] != index)
+        for exit_node in exits[index]:
+            leaving[exit_node] = sum(
+                arriving[entry] * nb_paths.get((entry, exit_node), 0)
+                for entry in entries[index])
+
+    # backward pass
+    starting, finishing = {}, {}
+    for index in reversed(order):
+        nb_paths = tables[index].nb_paths
+        for exit_node in exits[index]:
+            finishing[exit_node] = 1 if exit_node == target else sum(
+                starting[succ] for succ in successors[exit_node]
+                if component_of[succ] != index)
+        for entry in entries[index]:
+            starting[entry] = sum(
+                nb_paths.get((entry, exit_node), 0) * finishing[exit_node]
+                for exit_node in exits[index])
+
+    # paths via every node
+    nb_paths_through = dict.fromkeys(region, 0)
+    for index in order:
+        for (entry, exit_node), hits in tables[index].nb_hits.items():
+            nb_crossing = arriving[entry] * finishing[exit_node]
+            if nb_crossing:
+                for node, nb_hits in hits.items():
+                    nb_paths_through[node] += nb_crossing * nb_hits
+
+    return nb_paths_through
+
+
+# ## Number of paths via every node, with or without cycles
+#
+# We count on the acyclic region directly, and condense the region otherwise.
+# `None` if source and target are the same node, i.e. we have to enumerate
+def paths_through(hypothgraph, source, target):
+    """
+    (hypothgraph, source, target) -> {node: nb_paths_via_node} | None
+
+    """
+    nb_paths_through = acyclic_paths_through(hypothgraph, source, target)
+
+    if nb_paths_through is None:
+        nb_paths_through = condensed_paths_through(hypothgraph, source, target)
+
+    return nb_paths_through
+
+
+# ## Nodes on the paths
+#
+# All the nodes which lie on at least one simple path from `source` to
+# `target`. Without cycles in the region every node of the region is on a path
+# (descendants of `source` and ancestors of `target`). With cycles a node of the
+# region might be reachable only via the nodes it leads to, we keep the nodes
+# with at least one path via them in the condensed counting (only the big
+# components are enumerated). `None` if source and target are the same node
+def st_interior(hypothgraph, source, target):
+    """
+    (hypothgraph, source, target) -> set(node...) | None
+
+    """
+    if isinstance(hypothgraph, CompiledHypothgraph):
+        interior = st_interior(hypothgraph.indexed,
+                               hypothgraph.node_id(source),
+                               hypothgraph.node_id(target))
+        if interior is None:
+            return None
+        return set(hypothgraph.node_label(node_id) for node_id in interior)
+
+    if source == target:
+        return None
+
+    region = st_region(hypothgraph, source, target)
+    if not region:
+        return region
+
+    successors, _ = region_adjacency(hypothgraph, region, source, target)
+    if region_topological_order(successors) is not None:
+        return region
+
+    nb_paths_through = condensed_paths_through(hypothgraph, source, target)
+
+    return set(node for node, nb_paths in nb_paths_through.items() if nb_paths)
+
+
+# ## Counting by enumeration
+#
+# Last resort when `source` and `target` are the same node, the paths are then
+# the cycles via the node, and the node is counted twice on each of them
+def enumerated_paths_through(hypothgraph, source, target):
+    """
+    (hypothgraph, source, target) -> {node: nb_paths_via_node}
+
+    """
+    nb_paths_through = defaultdict(int)
+
+    for path in nx.all_simple_paths(hypothgraph, source, target):
+        for node in path:
+            nb_paths_through[node] += 1
+
+    return dict(nb_paths_through)
+
+
+# ## Compiled hypothgraphs
+#
+# The counting is the same on the integer ids of a compiled hypothgraph, we only
+# translate the endpoints to ids and the counts back to the nodes
+def on_compiled(func_paths_through, compiled, source, target):
+    """
+    (fun: paths through, compiled hypothgraph, source, target) ->
+        {node: nb_paths_via_node} | None
+
+    """
+    nb_paths_through = func_paths_through(
+            compiled.indexed, compiled.node_id(source), compiled.node_id(target))
+
+    if nb_paths_through is None:
+        return None
+
+    return dict((compiled.node_label(node_id), nb_paths)
+                for node_id, nb_paths in nb_paths_through.items())
+
+
+# ## Number of paths between all pairs of nodes
+#
+# On an acyclic hypothgraph the paths from `node` are the arcs to its
+# successors followed by the paths from the successors, i.e.
+#
+#   paths(node, v) = sum(paths(succ, v) + [succ == v] for succ in successors)
+#
+# which we evaluate once per node in the reverse topological order. Counts are
+# python integers and exact on big graphs. With cycles we count the paths of
+# every reachable pair with `paths_through` (the paths from `u` to `v` all pass
+# via `u`).
+def all_pairs_path_counts(hypothgraph):
+    """
+    (hypothgraph) -> {u: {v: nb_paths_from_u_to_v}}
+
+    Only pairs of different nodes with at least one path are reported, the
+    paths from `v` to `u` are in `counts[v][u]`
+
+    """
+    successors = dict((node, list(hypothgraph.successors_iter(node)))
+                      for node in hypothgraph.nodes_iter())
+    order = region_topological_order(successors)
+
+    if order is None:
+        return cyclic_all_pairs_path_counts(hypothgraph)
+
+    counts = {}
+    for node in reversed(order):
+        node_counts = defaultdict(int)
+        for succ in successors[node]:
+            node_counts[succ] += 1
+            for v, nb_paths in counts[succ].items():
+                node_counts[v] += nb_paths
+        counts[node] = dict(node_counts)
+
+    return counts
+
+
+def cyclic_all_pairs_path_counts(hypothgraph):
+    """(hypothgraph) -> {u: {v: nb_paths_from_u_to_v}}"""
+    counts = {}
+    for u in hypothgraph.nodes_iter():
+        counts[u] = {}
+        for v in reachable(hypothgraph.successors_iter, u):
+            if v != u:
+                counts[u][v] = paths_through(hypothgraph, u, v)[u]
+
+    return counts
+
+
+# Dense matrix of the counts, `matrix[i, j]` is the number of paths from
+# `nodes[i]` to `nodes[j]`. Integer matrix if the counts fit in 64 bits, matrix
+# of python integers otherwise
+def path_count_matrix(hypothgraph, nodes=None):
+    """
+    (hypothgraph, [node...]) -> np.array([[nb_paths...]...])
+
+    """
+    if nodes is None:
+        nodes = hypothgraph.nodes()
+    index = dict((node, i) for i, node in enumerate(nodes))
+
+    counts = all_pairs_path_counts(hypothgraph)
+    max_count = max([nb_paths for node_counts in counts.values()
+                     for nb_paths in node_counts.values()] or [0])
+    dtype = np.int64 if max_count < 2**63 else object
+
+    matrix = np.zeros((len(nodes), len(nodes)), dtype=dtype)
+    for u, node_counts in counts.items():
+        if u in index:
+            for v, nb_paths in node_counts.items():
+                if v in index:
+                    matrix[index[u], index[v]] = nb_paths
+
+    return matrix
+
+
+# Ordered pairs `(u, v, nb_paths_from_u_to_v)` with the most paths
+def top_pairs(hypothgraph, k, counts=None):
+    """
+    (hypothgraph, int) -> [(u, v, nb_paths)...]
+
+    """
+    if counts is None:
+        counts = all_pairs_path_counts(hypothgraph)
+
+    pairs = ((u, v, nb_paths)
+             for u, node_counts in counts.items()
+             for v, nb_paths in node_counts.items())
+
+    return heapq.nlargest(k, pairs, key=itemgetter(2))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Path sampling
+#
+# To generate sub hypothgraphs we take a random ratio of the simple paths
+# between two nodes. Instead of listing all the paths and drawing from the list,
+# we number the paths from `0` to `nb_paths - 1` and only build the paths whose
+# numbers were drawn.
+#
+# On an acyclic region between `source` and `target` we know, for every node,
+# the number of paths from the node to `target` (see `path_counting`). The paths
+# starting in a node are ordered by the successor they go to first, hence the
+# path with rank `r` goes to the first successor if `r` is smaller than the
+# number of paths from that successor, otherwise we subtract this number and
+# look at the next successor, and so on until we reach `target`. Drawing a
+# uniform rank gives a uniform random path, and drawing distinct ranks gives
+# distinct paths.
+#
+# If the region has cycles (or `source` is `target`) we cannot count, the paths
+# are then enumerated and ranked by their position in the enumeration.
+import abc
+import bisect
+import random
+import sys
+
+try:
+    from abc import ABC
+except ImportError:
+    ABC = abc.ABCMeta('ABC', (object,), {})
+
+import networkx as nx
+
+from hypotest.graph_generation import path_counting
+
+
+# ## Ranked paths
+#
+# Common part of the samplers, subclasses know the number of paths and how to
+# build the path of a given rank
+class RankedPaths(ABC):
+    """Simple paths numbered from `0` to `nb_paths - 1`"""
+
+    nb_paths = 0
+
+    @abc.abstractmethod
+    def unrank(self, rank):
+        """(rank) -> [node...]"""
+
+    # Uniformly random path
+    def sample(self, rand=random):
+        """(random.Random) -> [node...]"""
+        if not self.nb_paths:
+            raise ValueError("There are no paths to sample from")
+
+        return self.unrank(rand.randrange(self.nb_paths))
+
+    # `nb_samples` uniformly random paths, all different unless `replace`
+    def sample_paths(self, nb_samples, replace=False, rand=random):
+        """(int, bool, random.Random) -> generator([node...])"""
+        for rank in sample_ranks(self.nb_paths, nb_samples, replace, rand):
+            yield self.unrank(rank)
+
+
+class PathSampler(RankedPaths):
+    """Simple paths from `source` to `target`"""
+
+    def __init__(self, hypothgraph, source, target):
+        self.source = source
+        self.target = target
+        self.successors = None
+        self.nb_paths_to_target = None
+        self.paths = None
+
+        if source != target:
+            region = path_counting.st_region(hypothgraph, source, target)
+            successors, _ = path_counting.region_adjacency(
+                    hypothgraph, region, source, target)
+            order = path_counting.region_topological_order(successors)
+
+            if not region:
+                self.paths = []
+            elif order is not None:
+                self.successors = successors
+                self.nb_paths_to_target = path_counting.backward_path_counts(
+                        successors, order)
+
+        # cycles, enumerate all the paths
+        if self.nb_paths_to_target is None and self.paths is None:
+            self.paths = list(nx.all_simple_paths(hypothgraph, source, target))
+
+        if self.paths is not None:
+            self.nb_paths = len(self.paths)
+        else:
+            self.nb_paths = self.nb_paths_to_target[source]
+
+    def unrank(self, rank):
+        """(rank) -> [source, ..., target]"""
+        if not 0 <= rank < self.nb_paths:
+            raise IndexError("Path rank {} out of range".format(rank))
+
+        if self.paths is not None:
+            return list(self.paths[rank])
+
+        path = [self.source]
+        node = self.source
+        while node != self.target:
+            for succ in self.successors[node]:
+                nb_paths = self.nb_paths_to_target[succ]
+                if rank < nb_paths:
+                    break
+                rank -= nb_paths
+            path.append(succ)
+            node = succ
+
+        return path
+
+    def rank(self, path):
+        """([source, ..., target]) -> rank"""
+        if self.paths is not None:
+            return self.paths.index(list(path))
+
+        if not path or path[0] != self.source or path[-1] != self.target:
+            raise ValueError("{} is not a path from {} to {}".format(
+                path, self.source, self.target))
+
+        rank = 0
+        for node, next_node in zip(path, path[1:]):
+            for succ in self.successors.get(node, ()):
+                if succ == next_node:
+                    break
+                rank += self.nb_paths_to_target[succ]
+            else:
+                raise ValueError("{} is not a path from {} to {}".format(
+                    path, self.source, self.target))
+
+        return rank
+
+
+# ## Paths between many pairs of nodes
+#
+# The paths of several samplers one after the other, the rank is first mapped
+# to the sampler and then to the path of that sampler
+class ChainedPathSampler(RankedPaths):
+    """Simple paths of several samplers"""
+
+    def __init__(self, samplers):
+        self.samplers = list(samplers)
+        self.cumulative_nb_paths = []
+
+        nb_paths = 0
+        for sampler in self.samplers:
+            nb_paths += sampler.nb_paths
+            self.cumulative_nb_paths.append(nb_paths)
+        self.nb_paths = nb_paths
+
+    def unrank(self, rank):
+        """(rank) -> [node...]"""
+        if not 0 <= rank < self.nb_paths:
+            raise IndexError("Path rank {} out of range".format(rank))
+
+        position = bisect.bisect_right(self.cumulative_nb_paths, rank)
+        if position:
+            rank -= self.cumulative_nb_paths[position - 1]
+
+        return self.samplers[position].unrank(rank)
+
+
+# Samplers for the paths between every ordered pair of `nbunch`, the same paths
+# as in `paths.chain_many_to_many_path_generator`
+def many_to_many_path_sampler(hypothgraph, nbunch):
+    """(hypothgraph, [node...]) -> ChainedPathSampler"""
+    nbunch = list(nbunch)
+
+    return ChainedPathSampler(
+        PathSampler(hypothgraph, source, target)
+        for source in nbunch
+        for target in nbunch
+        if source != target)
+
+
+# ## Drawing ranks
+#
+# Distinct ranks are drawn with `random.sample` when the number of paths is not
+# too big for a `range`, and by rejection of the ranks already drawn otherwise
+# (then there are many more paths than we can ever draw)
+def sample_ranks(nb_paths, nb_samples, replace=False, rand=random):
+    """(int, int, bool, random.Random) -> generator(rank)"""
+    if replace:
+        if nb_samples and not nb_paths:
+            raise ValueError("There are no paths to sample from")
+        for _ in range(nb_samples):
+            yield rand.randrange(nb_paths)
+        return
+
+    if nb_samples > nb_paths:
+        raise ValueError("Cannot draw {} different paths out of {}".format(
+            nb_samples, nb_paths))
+
+    if nb_paths <= sys.maxsize:
+        for rank in rand.sample(range(nb_paths), nb_samples):
+            yield rank
+        return
+
+    drawn = set()
+    while len(drawn) < nb_samples:
+        rank = rand.randrange(nb_paths)
+        if rank not in drawn:
+            drawn.add(rank)
+            yield rank
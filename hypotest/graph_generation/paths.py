@@ -41,7 +41,8 @@ import math
 import networkx as nx
 import itertools as it
 
-from hypotest.graph_generation import boundary
+from hypotest.graph_generation import boundary, path_counting, path_sampling
+from hypotest.setup_hypothgraph import reachability_index
 
 
 def sort_simple_paths(hypothgraph, source, target):
@@ -122,15 +123,30 @@ def take_ratio_paths_rand(hypothgraph, paths, ratio=0.5):
     nb_paths_to_return = math.ceil(ratio * total_nb_paths)
     nb_paths_returned_so_far = 0
 
-    # draw randomly paths untill we reach the ratio of paths to be returned
+    # draw randomly paths untill we reach the ratio of paths to be returned,
+    # the drawn path is swapped with the last one so that popping is O(1)
     while nb_paths_returned_so_far < nb_paths_to_return:
         max_index = len(all_paths)-1
         random_path_index = random.randint(0, max_index)
 
-        yield all_paths.pop(random_path_index)
+        all_paths[random_path_index], all_paths[max_index] = \
+            all_paths[max_index], all_paths[random_path_index]
+        yield all_paths.pop()
         nb_paths_returned_so_far += 1
 
 
+# Same with the paths of a sampler (see `path_sampling`), only the drawn paths
+# are ever built
+def take_ratio_sampled_paths_rand(sampler, ratio=0.5):
+    """
+    (path_sampling.RankedPaths, float) -> generator([node...])
+
+    """
+    nb_paths_to_return = int(math.ceil(ratio * sampler.nb_paths))
+
+    return sampler.sample_paths(nb_paths_to_return)
+
+
 # ## Boundary interior and on boundary paths
 #
 # Using the helper functions we can now produce paths with given constraints,
@@ -141,9 +157,9 @@ def take_ratio_paths_rand(hypothgraph, paths, ratio=0.5):
 # Give a ratio of all paths from the causal source to the causal target
 
 def take_ratio_endpoints_paths_rand(hypothgraph, source, target, ratio=0.5):
-    all_paths = nx.all_simple_paths(hypothgraph, source, target)
+    sampler = path_sampling.PathSampler(hypothgraph, source, target)
 
-    return take_ratio_paths_rand(hypothgraph, all_paths, ratio=ratio)
+    return take_ratio_sampled_paths_rand(sampler, ratio=ratio)
 
 
 # ### Taking ratio random paths among boundary nodes
@@ -151,10 +167,10 @@ def take_ratio_endpoints_paths_rand(hypothgraph, source, target, ratio=0.5):
 def take_ratio_boundary_paths_rand(hypothgraph, source, target, ratio=0.5):
     on_boundary_nodes = boundary.on_boundary(hypothgraph, source, target)
 
-    boundary_paths = chain_many_to_many_path_generator(
+    boundary_paths = path_sampling.many_to_many_path_sampler(
             hypothgraph, on_boundary_nodes)
 
-    return take_ratio_paths_rand(hypothgraph, boundary_paths, ratio=ratio)
+    return take_ratio_sampled_paths_rand(boundary_paths, ratio=ratio)
 
 
 # # Paths via ending points
@@ -162,18 +178,157 @@ def take_ratio_boundary_paths_rand(hypothgraph, source, target, ratio=0.5):
 # These functions are needed for the subgraph generation based on the ratio of
 # all paths that PASS THROUGH the causal endpoints
 #
+# A simple path which passes via `source` and then via `target` is made of
+# three pieces without common nodes: a prefix which ends in `source`, a middle
+# path from `source` to `target`, and a suffix which starts in `target` (prefix
+# and suffix may be the endpoints alone). We enumerate the middle paths, and
+# extend each of them with the prefixes avoiding its nodes, and then with the
+# suffixes avoiding the nodes of both. Paths which pass via `target` first are
+# the same with the endpoints swapped
 def passing_via_endpoints(hypothgraph, source, target):
-    all_paths = chain_many_to_many_path_generator(hypothgraph, hypothgraph.nodes_iter())
-
-    for path in all_paths:
-        if source in path and target in path:
+    for first, second in endpoints_orders(source, target):
+        for path in compose_via_endpoints(hypothgraph, first, second):
             yield path
 
 
+def endpoints_orders(source, target):
+    if source == target:
+        return [(source, target)]
+
+    return [(source, target), (target, source)]
+
+
+# Paths via `first` and then `second`, of `nb_nodes` nodes if given
+def compose_via_endpoints(hypothgraph, first, second, nb_nodes=None):
+    """
+    (graph, node, node, int) -> generator([node...])
+
+    """
+    if first == second:
+        middles = [[first]]
+    elif nb_nodes is None:
+        middles = nx.all_simple_paths(hypothgraph, first, second)
+    else:
+        middles = nx.all_simple_paths(hypothgraph, first, second,
+                                      cutoff=nb_nodes - 1)
+
+    for middle in middles:
+        middle_nodes = set(middle)
+
+        max_prefix = None
+        if nb_nodes is not None:
+            max_prefix = nb_nodes - len(middle) + 1
+
+        for prefix in simple_paths_from(hypothgraph.predecessors_iter, first,
+                                        avoid=middle_nodes,
+                                        max_nodes=max_prefix):
+            used_nodes = middle_nodes.union(prefix)
+
+            max_suffix = None
+            if nb_nodes is not None:
+                max_suffix = nb_nodes - len(middle) - len(prefix) + 2
+
+            for suffix in simple_paths_from(hypothgraph.successors_iter,
+                                            second, avoid=used_nodes,
+                                            max_nodes=max_suffix):
+                if max_suffix is not None and len(suffix) != max_suffix:
+                    continue
+
+                path = prefix[::-1] + middle[1:] + suffix[1:]
+                # a path has at least two nodes
+                if len(path) > 1:
+                    yield path
+
+
+# All simple paths which start in `start` and follow `neighbours`, the path of
+# `start` alone included. Nodes in `avoid` are never visited, and the paths have
+# at most `max_nodes` nodes
+def simple_paths_from(neighbours, start, avoid=(), max_nodes=None):
+    """
+    (fun: node -> [node...], node, set(node...), int) -> generator([node...])
+
+    """
+    visited = [start]
+    on_path = set(visited)
+    stack = [iter(neighbours(start))]
+
+    yield list(visited)
+
+    while stack:
+        child = next(stack[-1], None)
+
+        if child is None:
+            stack.pop()
+            on_path.discard(visited.pop())
+        elif child not in on_path and child not in avoid and \
+                (max_nodes is None or len(visited) < max_nodes):
+            visited.append(child)
+            on_path.add(child)
+            stack.append(iter(neighbours(child)))
+            yield list(visited)
+
+
+# ## Number of paths via endpoints
+#
+# Without cycles the three pieces never share nodes (a node before `source` and
+# after `target` would close a cycle), so the number of paths is
+#
+#   nb_ending_in(source) x paths(source, target) x nb_starting_in(target)
+#
+# With cycles we compose the pieces, but only count the suffixes
+def count_passing_via_endpoints(hypothgraph, source, target):
+    """
+    (graph, node, node) -> nb_paths
+
+    """
+    index = reachability_index.reachability_index(hypothgraph)
+    if not index.is_acyclic:
+        return sum(1
+                   for first, second in endpoints_orders(source, target)
+                   for _ in compose_via_endpoints(hypothgraph, first, second))
+
+    nb_paths = 0
+    for first, second in endpoints_orders(source, target):
+        if first == second:
+            nb_middles = 1
+        elif index.has_path(first, second):
+            nb_middles = path_counting.paths_through(
+                    hypothgraph, first, second)[first]
+        else:
+            continue
+
+        nb_paths += nb_paths_from(hypothgraph.predecessors_iter, first) * \
+            nb_middles * nb_paths_from(hypothgraph.successors_iter, second)
+
+    # the path made of the endpoint alone is not a path
+    if source == target:
+        nb_paths -= 1
+
+    return nb_paths
+
+
+# Number of paths starting in `start` (the path of `start` alone included) in an
+# acyclic graph, `1 + sum(nb_paths_from(child))` over the reachable nodes
+def nb_paths_from(neighbours, start):
+    """(fun: node -> [node...], node) -> nb_paths"""
+    reached = path_counting.reachable(neighbours, start)
+    successors = dict((node, list(neighbours(node))) for node in reached)
+    order = path_counting.region_topological_order(successors)
+
+    counts = {}
+    for node in reversed(order):
+        counts[node] = 1 + sum(counts[child] for child in successors[node])
+
+    return counts[start]
+
+
 # ## Paths via endpoints sorted
+#
+# Paths are produced by increasing number of nodes, one length at a time, we
+# never keep more than the current path in memory
 def passing_via_endpoints_sorted(hypothgraph, source, target):
-    sorted_paths = list(passing_via_endpoints(hypothgraph, source, target))
-    sorted_paths = sorted(sorted_paths, key=len)
-
-    for path in sorted_paths:
-        yield path
+    for nb_nodes in range(2, hypothgraph.number_of_nodes() + 1):
+        for first, second in endpoints_orders(source, target):
+            for path in compose_via_endpoints(hypothgraph, first, second,
+                                              nb_nodes=nb_nodes):
+                yield path
@@ -18,10 +18,7 @@ author: Asan Agibetov
    See the License for the specific language governing permissions and
    limitations under the License.
 """
-import networkx as nx
-
-from hypotest.setup_hypothgraph import convert_to_hypothgraph
-from hypotest.graph_generation import paths
+from hypotest.graph_generation import paths, subgraph_view
 #
 # # Generation of subhypothgraphs
 #
@@ -37,12 +34,15 @@ from hypotest.graph_generation import paths
 # This function will try to generate a subgraph from the hypothegraph, which
 # will contain the required number of paths in the boundary interior and on the
 # boundary. On the boundary paths are generated as paths from the `source`
+#
+# Paths only mark their nodes and arcs in a view of the hypothgraph (see
+# `subgraph_view`), the standalone digraph is built at the end unless
+# `materialize` is False, in that case the view itself is returned
 def generate_sub_hypothgraph(hypothgraph, source, target,
                             ratio_endpoints_paths=0.5,
                             ratio_on_boundary_paths=0.5,
-                            data=False):
-    sub_hypothgraph = nx.DiGraph()
-    sub_hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(sub_hypothgraph)
+                            data=False, materialize=True):
+    sub_hypothgraph = subgraph_view.SubHypothgraphView(hypothgraph)
 
     # adding endpoints paths
     endpoints_paths = paths.take_ratio_endpoints_paths_rand(
@@ -58,17 +58,18 @@ def generate_sub_hypothgraph(hypothgraph, source, target,
     for on_boundary_path in on_boundary_paths:
         sub_hypothgraph.add_path(on_boundary_path)
 
-    # add data if required
-    sub_hypothgraph = copy_data_to_subgraph(hypothgraph, sub_hypothgraph)
+    if not materialize:
+        return sub_hypothgraph
 
-    return sub_hypothgraph
+    # standalone digraph with the data of the hypothgraph
+    return sub_hypothgraph.materialize()
 
 
 # Go through nodes and edges and coput data attributes, assumes that nodes and
 # edges exist in the big graph
 def copy_data_to_subgraph(big, small):
     for small_node in small.nodes_iter():
-        if small_node in big.nodes_iter():
+        if big.has_node(small_node):
             small.node[small_node] = big.node[small_node]
         else:
             print('{} is not in the big graph'.format(small_node))
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Sub hypothgraph views
+#
+# A sub hypothgraph is a set of nodes and arcs of a bigger hypothgraph, with the
+# attributes of the bigger hypothgraph. Instead of building a new digraph and
+# copying the attributes, a view keeps a reference to the parent hypothgraph and
+# two masks
+#
+# - the nodes of the subgraph
+# - the arcs of the subgraph, `{u: {v: None}}` for successors and predecessors
+#
+# Building the view costs the size of the subgraph only, membership is a
+# dictionary lookup, and the attributes (`view.node[node]`, `view[u][v]`) are
+# the dictionaries of the parent. The view answers the read part of the
+# networkx digraph interface, and `materialize` (or `copy`) builds a standalone
+# digraph when one is needed.
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+import networkx as nx
+
+
+class SubHypothgraphView(object):
+    """Nodes and arcs of a parent hypothgraph"""
+
+    def __init__(self, parent, nodes=(), edges=()):
+        self.parent = parent
+        self.graph = parent.graph
+        self._nodes = {}
+        self._succ = {}
+        self._pred = {}
+
+        for node in nodes:
+            self.add_node(node)
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    # ### Masks
+    def add_node(self, node):
+        if node not in self._nodes:
+            if not self.parent.has_node(node):
+                raise KeyError("{} is not in the parent graph".format(node))
+            self._nodes[node] = None
+            self._succ[node] = {}
+            self._pred[node] = {}
+
+    def add_edge(self, u, v):
+        if not self.parent.has_edge(u, v):
+            raise KeyError(
+                "({}, {}) is not in the parent graph".format(u, v))
+        self.add_node(u)
+        self.add_node(v)
+        self._succ[u][v] = None
+        self._pred[v][u] = None
+
+    def add_path(self, nodes):
+        nodes = list(nodes)
+        if len(nodes) == 1:
+            self.add_node(nodes[0])
+        for u, v in zip(nodes, nodes[1:]):
+            self.add_edge(u, v)
+
+    # ### Standalone digraph
+    #
+    # Same digraph as built by adding the paths one by one, the attribute
+    # dictionaries are shared with the parent (cf.
+    # `sub_hypothgraph.copy_data_to_subgraph`). Successors and predecessors
+    # share one dictionary per arc, as in any networkx digraph. Read-only
+    # attributes (of a compiled parent) are copied
+    def materialize(self):
+        """-> nx.DiGraph"""
+        parent = self.parent
+        digraph = nx.DiGraph()
+        digraph.add_nodes_from(self._nodes)
+
+        for node in digraph.nodes_iter():
+            digraph.node[node] = shared_data(parent.node[node])
+        for u, succs in self._succ.items():
+            parent_succ = parent[u]
+            for v in succs:
+                digraph.succ[u][v] = digraph.pred[v][u] = \
+                    shared_data(parent_succ[v])
+
+        return digraph
+
+    copy = materialize
+
+    # ### Read-only networkx interface
+    @property
+    def node(self):
+        return SubNodeData(self)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __contains__(self, node):
+        try:
+            return node in self._nodes
+        except TypeError:
+            return False
+
+    def __getitem__(self, node):
+        """(node) -> {successor: arc attributes}"""
+        parent_succ = self.parent[node]
+        return dict((succ, parent_succ[succ]) for succ in self._succ[node])
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return False
+
+    def has_node(self, node):
+        return node in self
+
+    def has_edge(self, u, v):
+        return u in self._succ and v in self._succ[u]
+
+    def number_of_nodes(self):
+        return len(self._nodes)
+
+    def number_of_edges(self):
+        return sum(len(succs) for succs in self._succ.values())
+
+    def nodes(self, data=False):
+        return list(self.nodes_iter(data=data))
+
+    def nodes_iter(self, data=False):
+        if data:
+            return ((node, self.parent.node[node]) for node in self._nodes)
+        return iter(self._nodes)
+
+    def edges(self, data=False):
+        return list(self.edges_iter(data=data))
+
+    def edges_iter(self, data=False):
+        for u, succs in self._succ.items():
+            for v in succs:
+                if data:
+                    yield (u, v, self.parent[u][v])
+                else:
+                    yield (u, v)
+
+    def successors(self, node):
+        return list(self._succ[node])
+
+    def successors_iter(self, node):
+        return iter(self._succ[node])
+
+    def predecessors(self, node):
+        return list(self._pred[node])
+
+    def predecessors_iter(self, node):
+        return iter(self._pred[node])
+
+    neighbors = successors
+    neighbors_iter = successors_iter
+
+
+class SubNodeData(Mapping):
+    """`G.node` of a view, {node: attributes of the parent}"""
+
+    def __init__(self, view):
+        self._view = view
+
+    def __getitem__(self, node):
+        if node not in self._view:
+            raise KeyError(node)
+        return self._view.parent.node[node]
+
+    def __iter__(self):
+        return iter(self._view)
+
+    def __len__(self):
+        return len(self._view)
+
+
+# Attribute dictionaries of the parent, copies if they are read-only
+def shared_data(data):
+    """(attributes) -> dict"""
+    return data if isinstance(data, dict) else dict(data)
@@ -26,26 +26,41 @@ For a given configuration of a hypothesis, try the following experiments:
    function)
 3) For a given threshold of confidence, find the best hypothesis configuration
 
+Generalization sweeps the candidate endpoints in one pass: with the target
+fixed, the confidence of every ancestor `a` of the source as the new source is
+
+    confidence(a, target) = w(a) x nb_paths(a, target) +
+                            sum(confidence(succ, target))
+
+over the successors of `a` which reach the target (`w` is the importance of
+evidenced nodes, zero otherwise). On an acyclic region one backward pass from
+the target gives all of them, and one breadth first search all the distances.
+The forward generalization is the same pass from the source.
+
 """
 import networkx as nx
 from collections import namedtuple
 from operator import attrgetter
 
-from hypotest import utils
-from hypotest import confidence_propagation as cp
-from hypotest import assert_endpoints
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import path_counting
+from hypotest.graph_generation.hypoth_conf import Hypoth_Conf, \
+    sort_hypoth_conf_endpoints
 
 Path = namedtuple('Path', ['confidence', 'conf_delta', 'distance',
                            'dist_delta'])
 
+default_fn_importance = compute_confidence.default_node_importance_measure
 
-def generalize_directional(H, source, target, direction='backwards'):
+
+def generalize_directional(H, hypoth_conf, direction='backwards',
+                           fn_importance=default_fn_importance):
     """
-    (hypothgraph, source, backwards or forward) -> {
-        'ancestor_i': (confidence(ancestor_i, target),
-                       distance(ancestor_i, target)) |
-        'descendant_i': (confidence(descendant_i, target),
-                       distance(descendant_i, target)) |
+    (hypothgraph, hypoth_conf, backwards or forward) -> {
+        (ancestor_i, target): Path(confidence(ancestor_i, target),
+                                   distance(ancestor_i, target), ...) |
+        (source, descendant_i): Path(confidence(source, descendant_i),
+                                     distance(source, descendant_i), ...)
         }
 
     Compute all ancestors or descendants from the source or target node, i.e.,
@@ -54,30 +69,51 @@ def generalize_directional(H, source, target, direction='backwards'):
     confidence, and the delta increase/decrese
 
     """
-    # make all experiments on a copy of the hypothesis graph
-    H = H.copy()
-
-    farther_nodes, from_node = nx.algorithms.ancestors, source
-    if direction != 'backwards':
-        farther_nodes, from_node = nx.algorithms.descendants, target
+    source, target = sort_hypoth_conf_endpoints(
+            H, hypoth_conf.source, hypoth_conf.target)
+    evidenced_nodes = frozenset(hypoth_conf.evidenced_nodes)
 
     # we need to compare with the current confidence and distance
-    current_confidence = cp.paths_confidence(H, source, target)
+    current_confidence = compute_confidence.confidence(
+            H, Hypoth_Conf(source, target, evidenced_nodes),
+            func_importance=fn_importance)
     current_distance = nx.shortest_path_length(H, source, target)
 
-    generalization = {}
+    # farther nodes, the fixed endpoint and how to walk towards it
+    if direction == 'backwards':
+        from_node, fixed = source, target
+        away, towards = H.predecessors_iter, H.successors_iter
+    else:
+        from_node, fixed = target, source
+        away, towards = H.successors_iter, H.predecessors_iter
 
-    for farther_node in farther_nodes(H, from_node):
-        new_source, new_target = utils.sort_endpoints(H, farther_node, target)
-        if direction != 'backwards':
-            new_source, new_target = utils.sort_endpoints(H, farther_node,
-                                                          source)
+    farther_nodes = path_counting.reachable(away, from_node)
+    farther_nodes.discard(from_node)
+    farther_nodes.discard(fixed)
 
-        # assign the new endpoints
-        assert_endpoints.assert_endpoints(H, new_source, new_target)
+    swept = confidence_sweep(H, fixed, away, towards, evidenced_nodes,
+                             fn_importance=fn_importance)
 
-        new_confidence = cp.paths_confidence(H, new_source, new_target)
-        new_distance = nx.shortest_path_length(H, new_source, new_target)
+    generalization = {}
+
+    for farther_node in farther_nodes:
+        if direction == 'backwards':
+            new_source, new_target = farther_node, target
+        else:
+            new_source, new_target = source, farther_node
+
+        if swept is not None:
+            confidences, distances = swept
+            new_confidence = confidences[farther_node]
+            new_distance = distances[farther_node]
+        else:
+            # cycles, every candidate is computed on its own
+            new_source, new_target = sort_hypoth_conf_endpoints(
+                    H, new_source, new_target)
+            new_confidence = compute_confidence.confidence(
+                    H, Hypoth_Conf(new_source, new_target, evidenced_nodes),
+                    func_importance=fn_importance)
+            new_distance = nx.shortest_path_length(H, new_source, new_target)
 
         # increase or decrease in confidence, when we go farther
         conf_delta = new_confidence - current_confidence
@@ -99,18 +135,69 @@ def generalize_directional(H, source, target, direction='backwards'):
     return generalization
 
 
-def generalize(H):
+# ## Sweep of the confidences
+#
+# Confidence and distance between `fixed` and every node which reaches it (or
+# which it reaches), `towards` are the neighbours in the direction of `fixed`
+# and `away` in the opposite direction. `None` if the nodes have cycles
+def confidence_sweep(H, fixed, away, towards, evidenced_nodes,
+                     fn_importance=default_fn_importance):
+    """
+    (hypothgraph, node, func, func, set(node...)) ->
+        ({node: confidence}, {node: distance}) | None
+
+    """
+    nodes = path_counting.reachable(away, fixed)
+    steps = dict((node, [] if node == fixed else
+                  [step for step in towards(node) if step in nodes])
+                 for node in nodes)
+
+    order = path_counting.region_topological_order(steps)
+    if order is None:
+        return None
+
+    nb_paths, confidences = {}, {}
+    for node in reversed(order):
+        if node == fixed:
+            nb_paths[node], confidences[node] = 1, 0.0
+        else:
+            nb_paths[node] = sum(nb_paths[step] for step in steps[node])
+            confidences[node] = sum(confidences[step] for step in steps[node])
+
+        if node in evidenced_nodes:
+            confidences[node] += fn_importance(H, node) * nb_paths[node]
+
+    # breadth first distances from the fixed node
+    distances = {fixed: 0}
+    fringe = [fixed]
+    while fringe:
+        next_fringe = []
+        for node in fringe:
+            for neighbour in away(node):
+                if neighbour not in distances:
+                    distances[neighbour] = distances[node] + 1
+                    next_fringe.append(neighbour)
+        fringe = next_fringe
+
+    return confidences, distances
+
+
+def generalize(H, hypoth_conf, fn_importance=default_fn_importance):
     """
-    (hypothgraph) -> list of stats of bi-directional generalization
+    (hypothgraph, hypoth_conf) -> list of stats of bi-directional
+        generalization
 
-    We identify endpoints, and then we try to *grow* the boundary (predecessors
+    We take the endpoints, and then we try to *grow* the boundary (predecessors
     for the source, successors for target) and recompute the confidence function
 
     """
-    source, target = utils.find_causal_endpoints(H)
+    source, target = sort_hypoth_conf_endpoints(
+            H, hypoth_conf.source, hypoth_conf.target)
 
     # construct the same named tuple with the current state of the hypothesis
-    current_confidence = cp.paths_confidence(H, source, target)
+    current_confidence = compute_confidence.confidence(
+            H, Hypoth_Conf(source, target, hypoth_conf.evidenced_nodes),
+            func_importance=fn_importance)
     current_distance = nx.shortest_path_length(H, source, target)
 
     stats = {
@@ -123,9 +210,10 @@ def generalize(H):
     current_state = [Path(**stats)]
 
     # generalize backwards anf forward, sort according to the delta distance
-    backwards_gen = generalize_directional(H, source, target)
-    forward_gen = generalize_directional(H, source, target,
-                                         direction='forward')
+    backwards_gen = generalize_directional(H, hypoth_conf,
+                                           fn_importance=fn_importance)
+    forward_gen = generalize_directional(H, hypoth_conf, direction='forward',
+                                         fn_importance=fn_importance)
 
     back_gen, forward_gen = [extract_paths_and_sort(backwards_gen),
                              extract_paths_and_sort(forward_gen)]
@@ -144,7 +232,8 @@ def extract_paths_and_sort(generalization_obj, key=attrgetter('dist_delta')):
     return sorted(paths, key=key)
 
 
-def generalization_data_for_plot(H):
+def generalization_data_for_plot(H, hypoth_conf,
+                                 fn_importance=default_fn_importance):
     """
     Returns then necessary data for the generalization
 
@@ -152,7 +241,7 @@ def generalization_data_for_plot(H):
 
 
     """
-    sorted_paths = generalize(H)
+    sorted_paths = generalize(H, hypoth_conf, fn_importance=fn_importance)
 
     dist_deltas = [attrgetter('dist_delta')(path) for path in sorted_paths]
     confidences = [attrgetter('confidence')(path) for path in sorted_paths]
@@ -25,29 +25,52 @@ author: Asan Agibetov
 # a difference in overall confidence whenever this node is evidenced or not.
 # That is, say node `x` is not evidenced, and it is inside the hypothesis
 # configuration path, then its contribution is computed as
-# `conf(x_unevidenced) - conf(x_evidenced)`
+# `conf(x_evidenced) - conf(x_unevidenced)`
+#
+# Confidence is additive over the evidenced nodes, hence the gain of evidencing
+# `x` is its importance times the number of simple paths from source to target
+# via `x`. The gains of all the missing nodes come from one path counting pass,
+# and the hypothgraph is never modified.
+import heapq
+from operator import itemgetter
+
+from hypotest.confidence import compute_confidence, batch_confidence
+from hypotest.graph_generation.hypoth_conf import Hypoth_Conf, \
+    sort_hypoth_conf_endpoints
+
+default_fn_importance = compute_confidence.default_node_importance_measure
+
+
+# Nodes which are not evidenced in the hypothesis configuration
+def find_missing_nodes(H, hypoth_conf):
+    """(hypothgraph, hypoth_conf) -> [node...]"""
+    evidenced_nodes = set(hypoth_conf.evidenced_nodes)
+
+    return [node for node in H.nodes_iter() if node not in evidenced_nodes]
+
 
-def difference_importance(H, source, target, candidate_evidenced_node,
+def difference_importance(H, hypoth_conf, candidate_evidenced_node,
                           fn_importance=default_fn_importance, log=False):
     """
-    (graph, path) -> float
+    (graph, hypoth_conf, node) -> float
 
     Compute difference in confidence value with or without candidate evidenced
     node
 
     """
-    confidence_without = paths_confidence(H, source, target,
-                                          fn_importance=fn_importance)
+    source, target, evidenced_nodes = hypoth_conf
+    confidence_without = compute_confidence.confidence(
+            H, hypoth_conf, func_importance=fn_importance)
 
-    assert_evidence(H, candidate_evidenced_node)
-    confidence_with = paths_confidence(H, source, target,
-                                       fn_importance=fn_importance)
-    unassert_evidence(H, candidate_evidenced_node)
+    conf_with = Hypoth_Conf(source, target,
+                            list(evidenced_nodes) + [candidate_evidenced_node])
+    confidence_with = compute_confidence.confidence(
+            H, conf_with, func_importance=fn_importance)
 
     gain_in_confidence = abs(confidence_with - confidence_without)
 
     if log:
-        print("missing nodes {}".format(list(find_missing_nodes(H))))
+        print("missing nodes {}".format(find_missing_nodes(H, hypoth_conf)))
         print("candidate evidenced node {}".format(candidate_evidenced_node))
         print("with confidence - {}, without - {}".format(confidence_with,
                                                           confidence_without))
@@ -56,27 +79,28 @@ def difference_importance(H, source, target, candidate_evidenced_node,
     return gain_in_confidence
 
 
-def most_informative_missing_node(H, source=None, target=None,
+def most_informative_missing_node(H, hypoth_conf, top_k=None,
                                   fn_importance=default_fn_importance):
     """
-    (hypothgraph, source, target) -> [(node_id, delta_metric), ...]
+    (hypothgraph, hypoth_conf, int) -> [(node_id, delta_metric), ...]
 
-    Simulate finding an evidence for one missing node, and assess the difference
-    importance
+    Gains in confidence of evidencing each missing node, the most informative
+    first. Only the `top_k` most informative nodes if `top_k` is given
 
     """
-    if not source or not target:
-        source, target = find_causal_endpoints(H)
+    source, target, _ = hypoth_conf
+    missing_nodes = find_missing_nodes(H, hypoth_conf)
 
-    missing_nodes = find_missing_nodes(H)
-    most_informative = {}
+    # gains of all the missing nodes in one pass
+    source, target = sort_hypoth_conf_endpoints(H, source, target)
+    gains = batch_confidence.node_contributions(
+            H, source, target, missing_nodes, func_importance=fn_importance)
+    most_informative = zip(missing_nodes, gains.tolist())
 
-    for missing_node in missing_nodes:
-        # evidence him and compute overall confidence
-        most_informative[missing_node] = \
-            difference_importance(H, source, target, missing_node)
+    if top_k is not None:
+        return heapq.nlargest(top_k, most_informative, key=itemgetter(1))
 
-    sorted_most_informative = sorted(most_informative.items(),
+    sorted_most_informative = sorted(most_informative,
                                      key=itemgetter(1),
                                      reverse=True)
 
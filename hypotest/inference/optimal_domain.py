@@ -21,78 +21,102 @@ Experiments finding the best domain
 For a given configuration of a hypothesis, and given evidenced nodes, find the
 best endpoints (given the confidence function)
 
+We score every pair of nodes as the endpoints of the hypothesis configuration,
+with the same evidenced nodes. Pairs are independent, so the pair space can be
+split in chunks and scored in a pool of processes. Every worker receives once
+a compiled (read-only, integer indexed) snapshot of the hypothgraph and only
+the chunk descriptions travel with the tasks.
+
 """
+import binascii
+import heapq
 import networkx as nx
+import numpy as np
 import itertools as it
 from collections import namedtuple
-from operator import attrgetter
-
+from multiprocessing import Pool
+from operator import attrgetter, itemgetter
 
-from hypotest import assert_endpoints
-from hypotest import confidence_propagation as cp
-from hypotest import utils
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation.hypoth_conf import Hypoth_Conf, \
+    sort_hypoth_conf_endpoints
+from hypotest.graph_generation import path_counting
+from hypotest.setup_hypothgraph.compiled_hypothgraph import compile_hypothgraph
+from hypotest.setup_hypothgraph.reachability_index import reachability_index
 
 
 DomainStats = namedtuple('DomainStats', ['source', 'target', 'confidence',
                                          'conf_delta', 'distance',
                                          'dist_delta'])
 
+default_fn_importance = compute_confidence.default_node_importance_measure
+
 
-def optimal_domain(H, threshold=0.0):
+def optimal_domain(H, hypoth_conf, threshold=0.0,
+                   fn_importance=default_fn_importance,
+                   nb_workers=None, nb_chunks=None, top_k=None):
     """
-    (hypothgraph) -> sorted({[(source, target): confidence, ... }])
+    (hypothgraph, hypoth_conf) -> sorted([DomainStats, ...])
 
     We try all possible combinations of (source, target) pair - boundaries or
     limits of the hypothesis confidence propagation, and see which ones are the
     best or are above a given threshold
 
-    """
-    # make all experiments on a copy of the hypothesis graph
-    H = H.copy()
+    With `nb_workers` > 1 the pairs are scored in that many processes, split in
+    `nb_chunks` chunks (by default four chunks per worker). Otherwise, if only
+    the domains above a positive `threshold` or the `top_k` best domains are
+    required and the hypothgraph has no cycles, we run the pruned search (see
+    `pruned_optimal_domain`)
 
-    domains_stats = []
+    """
+    # make all experiments on a snapshot of the hypothesis graph
+    compiled = compile_hypothgraph(H)
 
-    # optimization for already tried endpoints
-    simulated_endpoints = []
+    serial = nb_workers is None or nb_workers <= 1
+    if serial and (top_k is not None or threshold > 0) and compiled.is_acyclic:
+        return pruned_optimal_domain(compiled, hypoth_conf,
+                                     threshold=threshold, top_k=top_k,
+                                     fn_importance=fn_importance)
+    evidenced_nodes = frozenset(hypoth_conf.evidenced_nodes)
 
-    source, target = utils.find_causal_endpoints(H)
+    source, target = sort_hypoth_conf_endpoints(
+            compiled, hypoth_conf.source, hypoth_conf.target)
 
     # we need to compare with the current confidence and distance
-    current_confidence = cp.paths_confidence(H, source, target)
-    current_distance = nx.shortest_path_length(H, source, target)
-
-    for s, t in generate_endpoints(H):
-        if not (s, t) in simulated_endpoints:
-
-            try:
-                # assign new endpoints
-                new_source, new_target = utils.sort_endpoints(H, s, t)
-                assert_endpoints.assert_endpoints(H, new_source, new_target)
-
-                new_confidence = cp.paths_confidence(H, new_source, new_target)
-                new_distance = nx.shortest_path_length(H, new_source,
-                                                       new_target)
-
-                # increase or decrease in confidence, for the new domain
-                conf_delta = new_confidence - current_confidence
-                dist_delta = new_distance - current_distance
-
-                # increase or decrease in distance, and in confidence
-                stats = {
-                    'confidence': new_confidence,
-                    'distance': new_distance,
-                    'conf_delta': conf_delta,
-                    'dist_delta': dist_delta,
-                    'source': new_source,
-                    'target': new_target
-                }
-
-                domains_stats.append(DomainStats(**stats))
-
-            except Exception as e:
-                print(e)
-
-    return sort_domains_stats(domains_stats)
+    current_confidence = compute_confidence.confidence(
+            compiled, Hypoth_Conf(source, target, evidenced_nodes),
+            func_importance=fn_importance)
+    current_distance = nx.shortest_path_length(compiled, source, target)
+
+    worker_state = (compiled, evidenced_nodes, current_confidence,
+                    current_distance, fn_importance)
+
+    if serial:
+        set_worker_state(*worker_state)
+        try:
+            scored = score_chunk((0, 1))
+        finally:
+            set_worker_state(None)
+    else:
+        nb_chunks = nb_chunks or 4 * nb_workers
+        chunks = [(offset, nb_chunks) for offset in range(nb_chunks)]
+
+        scored = []
+        pool = Pool(processes=nb_workers, initializer=set_worker_state,
+                    initargs=worker_state)
+        try:
+            for chunk_scored in pool.map(score_chunk, chunks):
+                scored.extend(chunk_scored)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    # same order as the serial enumeration of the pairs, before sorting
+    scored.sort(key=itemgetter(0))
+    domains_stats = [stats for _, stats in scored
+                     if stats.confidence >= threshold]
+
+    return sort_domains_stats(domains_stats)[:top_k]
 
 
 def sort_domains_stats(domains_stats):
@@ -113,3 +137,195 @@ def generate_endpoints(H):
     nodes = H.nodes()
 
     return it.combinations(nodes, 2)
+
+
+# ## Scoring the pairs
+#
+# Pairs `(i, j)`, `i < j`, of node ids are split by the first node, chunk
+# `(offset, step)` takes the nodes `offset, offset + step, ...`. Interleaving
+# the first nodes balances the chunks, since the first nodes have less and less
+# pairs
+_worker_state = None
+
+
+def set_worker_state(compiled, evidenced_nodes=None, current_confidence=None,
+                     current_distance=None, fn_importance=None):
+    global _worker_state
+
+    if compiled is None:
+        _worker_state = None
+    else:
+        _worker_state = (compiled, evidenced_nodes, current_confidence,
+                         current_distance, fn_importance)
+
+
+def score_chunk(chunk):
+    """
+    ((offset, step)) -> [((i, j), DomainStats), ...]
+
+    """
+    compiled, evidenced_nodes, current_confidence, current_distance, \
+        fn_importance = _worker_state
+    offset, step = chunk
+    nb_nodes = compiled.number_of_nodes()
+
+    scored = []
+    for i in range(offset, nb_nodes, step):
+        for j in range(i + 1, nb_nodes):
+            stats = domain_stats(
+                    compiled, compiled.node_label(i), compiled.node_label(j),
+                    evidenced_nodes, current_confidence, current_distance,
+                    fn_importance)
+            if stats is not None:
+                scored.append(((i, j), stats))
+
+    return scored
+
+
+# Stats of one pair of endpoints, `None` if there is no path between them
+def domain_stats(H, s, t, evidenced_nodes, current_confidence,
+                 current_distance, fn_importance=default_fn_importance):
+    """
+    (hypothgraph, node, node, set(node...), float, int) -> DomainStats | None
+
+    """
+    try:
+        new_source, new_target = sort_hypoth_conf_endpoints(H, s, t)
+    except Exception:
+        return None
+
+    new_confidence = compute_confidence.confidence(
+            H, Hypoth_Conf(new_source, new_target, evidenced_nodes),
+            func_importance=fn_importance)
+    new_distance = nx.shortest_path_length(H, new_source, new_target)
+
+    # increase or decrease in distance, and in confidence
+    return DomainStats(
+        source=new_source,
+        target=new_target,
+        confidence=new_confidence,
+        conf_delta=new_confidence - current_confidence,
+        distance=new_distance,
+        dist_delta=new_distance - current_distance)
+
+
+# ## Pruned search
+#
+# Every simple path from `s` to `t` passes at most once via each evidenced
+# node, hence
+#
+#   confidence(s, t) <= nb_paths(s, t) x sum(importance(e))
+#
+# over the evidenced nodes `e` between `s` and `t` (reachable from `s` and
+# reaching `t`). On an acyclic hypothgraph the numbers of paths of all the
+# pairs come from one pass (see `path_counting.path_count_matrix`) and the
+# reachability from the bitsets of the reachability index, and the bounds of
+# all the pairs are a few matrix products. With cycles counting the paths of
+# every pair costs as much as scoring it, `optimal_domain` does not prune
+# there. We score the pairs by
+# decreasing bound, skip the pairs whose bound is below the threshold, and stop
+# as soon as the bound is below the `top_k`-th best confidence found so far.
+# Importances should be non-negative. Bounds and confidences are summed in a
+# different order, we keep a small slack so that rounding never prunes a pair
+# which ties with the best ones
+BOUND_SLACK = 1e-9
+
+
+def pruned_optimal_domain(H, hypoth_conf, threshold=0.0, top_k=None,
+                          fn_importance=default_fn_importance):
+    """
+    (hypothgraph, hypoth_conf, float, int) -> sorted([DomainStats, ...])
+
+    Same domains as `optimal_domain`, in the same order
+
+    """
+    compiled = compile_hypothgraph(H)
+    evidenced_nodes = frozenset(hypoth_conf.evidenced_nodes)
+
+    source, target = sort_hypoth_conf_endpoints(
+            compiled, hypoth_conf.source, hypoth_conf.target)
+    current_confidence = compute_confidence.confidence(
+            compiled, Hypoth_Conf(source, target, evidenced_nodes),
+            func_importance=fn_importance)
+    current_distance = nx.shortest_path_length(compiled, source, target)
+
+    candidates = bounded_pairs(compiled, evidenced_nodes, fn_importance)
+    candidates = [candidate for candidate in candidates
+                  if candidate[0] * (1 + BOUND_SLACK) >= threshold]
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+
+    # min heap of the best domains, (confidence, -rank, stats)
+    best = []
+    for bound, rank, s, t in candidates:
+        if top_k is not None and len(best) == top_k and \
+                bound * (1 + BOUND_SLACK) < best[0][0]:
+            break
+
+        stats = domain_stats(compiled, s, t, evidenced_nodes,
+                             current_confidence, current_distance,
+                             fn_importance)
+        if stats is None or stats.confidence < threshold:
+            continue
+
+        item = (stats.confidence, -rank, stats)
+        if top_k is None or len(best) < top_k:
+            heapq.heappush(best, item)
+        elif item[:2] > best[0][:2]:
+            heapq.heapreplace(best, item)
+
+    best.sort(key=lambda item: (-item[0], -item[1]))
+
+    return [stats for _, _, stats in best]
+
+
+# Bound of every pair with a path, `rank` is the position of the pair in
+# `generate_endpoints`. The hypothgraph should be acyclic
+def bounded_pairs(compiled, evidenced_nodes, fn_importance):
+    """
+    (compiled hypothgraph, set(node...), func) ->
+        [(bound, rank, source, target), ...]
+
+    """
+    nb_nodes = compiled.number_of_nodes()
+    index = reachability_index(compiled)
+    reaches = reachability_matrix(index.descendants, nb_nodes)
+    nb_paths = path_counting.path_count_matrix(compiled)
+
+    # importance of the evidenced nodes between every pair
+    evidenced = [node for node in evidenced_nodes if node in compiled]
+    evidenced_ids = compiled.node_ids(evidenced)
+    weights = np.array([fn_importance(compiled, node) for node in evidenced],
+                       dtype=np.float64)
+    importance = (reaches[:, evidenced_ids] * weights).dot(
+        reaches[evidenced_ids, :].astype(np.float64))
+    bounds = nb_paths * importance
+
+    # pairs `(i, j)`, `i < j`, with a path one way or the other, sorted
+    # topologically (without cycles at most one way has a path)
+    upper = np.triu(np.ones((nb_nodes, nb_nodes), dtype=bool), 1)
+    forward = reaches & upper
+    backward = reaches.T & upper
+    i, j = np.nonzero(forward | backward)
+    is_forward = forward[i, j]
+    s = np.where(is_forward, i, j)
+    t = np.where(is_forward, j, i)
+    ranks = i * nb_nodes - i * (i + 1) // 2 + (j - i - 1)
+
+    labels = compiled.nodes_list
+    return [(bound, rank, labels[s_id], labels[t_id])
+            for bound, rank, s_id, t_id in zip(
+                bounds[s, t].tolist(), ranks.tolist(), s.tolist(), t.tolist())]
+
+
+# `matrix[i, j]` is True if there is a path from `i` to `j`, from the
+# descendant bitsets. Bitsets are packed big-endian (most significant byte and
+# bit first), hence the columns are unpacked from the last bit to the first
+def reachability_matrix(descendants, nb_nodes):
+    """([bits...], int) -> bool[nb_nodes, nb_nodes]"""
+    nb_bytes = (nb_nodes + 7) // 8
+    packed = np.frombuffer(
+        b''.join(binascii.unhexlify('%0*x' % (2 * nb_bytes, bits))
+                 for bits in descendants),
+        dtype=np.uint8).reshape(nb_nodes, nb_bytes)
+
+    return np.unpackbits(packed, axis=1)[:, ::-1][:, :nb_nodes].astype(bool)
@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Compiled hypothesis graph
+#
+# Hypothesis graphs are networkx digraphs keyed by the URIs of the factors, every
+# graph traversal hashes URIs and goes through nested dictionaries. Whenever we
+# run many queries on the same graph we compile it once into an immutable
+# snapshot, where
+#
+# - nodes are interned into integer ids `0..n-1`
+# - arcs are stored as CSR arrays (`indptr`, `indices`) for successors and for
+#   predecessors
+# - the topological order (if any) and the strongly connected components are
+#   computed once
+# - `evidence_weight` and `importance_weight` are NumPy arrays indexed by ids
+#
+# The snapshot also answers the read-only part of the networkx digraph
+# interface (`nodes_iter`, `successors_iter`, `G[node]`, `G.node[node]` etc.),
+# so that it can be given to the confidence, boundary and paths functions
+# instead of the digraph.
+import bisect
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+import networkx as nx
+import numpy as np
+
+
+# ## Compilation
+def compile_hypothgraph(hypothgraph):
+    """
+    (hypothgraph) -> CompiledHypothgraph
+
+    Snapshot of the graph, later changes of the hypothgraph are not reflected in
+    the compiled graph
+
+    """
+    if isinstance(hypothgraph, CompiledHypothgraph):
+        return hypothgraph
+
+    return CompiledHypothgraph(hypothgraph)
+
+
+class CompiledHypothgraph(object):
+    """Immutable integer indexed snapshot of a hypothesis graph"""
+
+    def __init__(self, hypothgraph):
+        nodes = tuple(hypothgraph.nodes_iter())
+        index = dict((node, i) for i, node in enumerate(nodes))
+
+        successor_ids = [
+            tuple(sorted(index[succ]
+                         for succ in hypothgraph.successors_iter(node)))
+            for node in nodes]
+        predecessor_ids = [[] for _ in nodes]
+        edge_data = []
+        for i, node in enumerate(nodes):
+            for j in successor_ids[i]:
+                predecessor_ids[j].append(i)
+                edge_data.append(dict(hypothgraph[node][nodes[j]]))
+        predecessor_ids = [tuple(preds) for preds in predecessor_ids]
+
+        self.nodes_list = nodes
+        self.index = index
+        self.graph = dict(hypothgraph.graph)
+        self.node_data = tuple(dict(hypothgraph.node[node]) for node in nodes)
+        self.edge_data = tuple(edge_data)
+
+        # integer adjacency, python tuples for traversals and CSR arrays for
+        # the vectorized computations
+        self.successor_ids = successor_ids
+        self.predecessor_ids = predecessor_ids
+        self.succ_indptr, self.succ_indices = csr_arrays(successor_ids)
+        self.pred_indptr, self.pred_indices = csr_arrays(predecessor_ids)
+
+        # strongly connected components and topological order (if no cycles)
+        self.component_ids = frozen_array(
+            strongly_connected_component_ids(successor_ids), np.int64)
+        self.topological_order = topological_order_ids(successor_ids)
+        self.topological_position = None
+        if self.topological_order is not None:
+            position = np.empty(len(nodes), dtype=np.int64)
+            position[self.topological_order] = np.arange(len(nodes))
+            self.topological_position = frozen_array(position, np.int64)
+
+        # node weights
+        self.evidence_weight = self.weights_array('evidence_weight')
+        self.importance_weight = self.weights_array('importance_weight')
+
+        # successors by labels, this is what networkx algorithms iterate over
+        self._successors = tuple(
+            tuple(nodes[j] for j in succs) for succs in successor_ids)
+        self._predecessors = tuple(
+            tuple(nodes[j] for j in preds) for preds in predecessor_ids)
+
+    # Node attribute as a float array, `nan` if the node has no such attribute
+    def weights_array(self, attribute):
+        """(attribute name) -> np.array([weight, ...])"""
+        return frozen_array(
+            [data.get(attribute, np.nan) for data in self.node_data],
+            np.float64)
+
+    # ### Integer ids
+    def node_id(self, node):
+        """(node) -> id"""
+        return self.index[node]
+
+    def node_ids(self, nodes):
+        """([node...]) -> np.array([id...])"""
+        return np.fromiter((self.index[node] for node in nodes),
+                           dtype=np.int64)
+
+    def node_label(self, node_id):
+        """(id) -> node"""
+        return self.nodes_list[node_id]
+
+    @property
+    def is_acyclic(self):
+        return self.topological_order is not None
+
+    # Integer adjacency with the same interface as the digraph, all the graph
+    # algorithms can then run on ids directly
+    @property
+    def indexed(self):
+        """-> adjacency on the integer ids"""
+        return IndexedAdjacency(self.successor_ids, self.predecessor_ids)
+
+    def has_path(self, source, target):
+        """(source, target) -> bool"""
+        source_id, target_id = self.index[source], self.index[target]
+        if source_id == target_id:
+            return True
+
+        # in a DAG nodes can only reach the nodes after them
+        position = self.topological_position
+        if position is not None and position[source_id] > position[target_id]:
+            return False
+
+        seen = set([source_id])
+        fringe = [source_id]
+        while fringe:
+            for succ in self.successor_ids[fringe.pop()]:
+                if succ == target_id:
+                    return True
+                if succ not in seen:
+                    seen.add(succ)
+                    fringe.append(succ)
+
+        return False
+
+    # Back to a mutable networkx digraph
+    def to_digraph(self):
+        """-> nx.DiGraph"""
+        digraph = nx.DiGraph()
+        digraph.graph.update(self.graph)
+        digraph.add_nodes_from(
+            (node, dict(data))
+            for node, data in zip(self.nodes_list, self.node_data))
+        digraph.add_edges_from(
+            (u, v, dict(data)) for u, v, data in self.edges_iter(data=True))
+
+        return digraph
+
+    # ### Read-only networkx interface
+    @property
+    def node(self):
+        return ReadOnlyNodeData(self)
+
+    def __len__(self):
+        return len(self.nodes_list)
+
+    def __iter__(self):
+        return iter(self.nodes_list)
+
+    def __contains__(self, node):
+        try:
+            return node in self.index
+        except TypeError:
+            return False
+
+    def __getitem__(self, node):
+        """(node) -> {successor: read-only arc attributes}"""
+        return CompiledAdjacency(self, self.index[node])
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return False
+
+    def has_node(self, node):
+        return node in self
+
+    def has_edge(self, u, v):
+        return u in self and v in self._successors[self.index[u]]
+
+    def number_of_nodes(self):
+        return len(self.nodes_list)
+
+    def number_of_edges(self):
+        return len(self.succ_indices)
+
+    def nodes(self, data=False):
+        return list(self.nodes_iter(data=data))
+
+    def nodes_iter(self, data=False):
+        if data:
+            return ((node, self.node[node]) for node in self.nodes_list)
+        return iter(self.nodes_list)
+
+    def edges(self, data=False):
+        return list(self.edges_iter(data=data))
+
+    def edges_iter(self, data=False):
+        position = 0
+        for u, succs in zip(self.nodes_list, self._successors):
+            for v in succs:
+                if data:
+                    yield (u, v, ReadOnlyMapping(self.edge_data[position]))
+                else:
+                    yield (u, v)
+                position += 1
+
+    def successors(self, node):
+        return list(self._successors[self.index[node]])
+
+    def successors_iter(self, node):
+        return iter(self._successors[self.index[node]])
+
+    def predecessors(self, node):
+        return list(self._predecessors[self.index[node]])
+
+    def predecessors_iter(self, node):
+        return iter(self._predecessors[self.index[node]])
+
+    neighbors = successors
+    neighbors_iter = successors_iter
+
+
+# ## Integer adjacency
+#
+# Successors and predecessors of the integer ids, the same methods as for the
+# digraph so that the traversals can run on both
+class IndexedAdjacency(object):
+    """Adjacency of a compiled hypothgraph on the integer ids"""
+
+    def __init__(self, successor_ids, predecessor_ids):
+        self.successor_ids = successor_ids
+        self.predecessor_ids = predecessor_ids
+
+    def successors_iter(self, node_id):
+        return iter(self.successor_ids[node_id])
+
+    def predecessors_iter(self, node_id):
+        return iter(self.predecessor_ids[node_id])
+
+
+# ## Read-only attributes
+class ReadOnlyMapping(Mapping):
+    """Read-only view of an attributes dictionary"""
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(self._data)
+
+
+# Successors of one node, the arcs of a node are stored in the order of the
+# successor ids
+class CompiledAdjacency(Mapping):
+    """`G[node]` of a compiled hypothgraph, {successor: arc attributes}"""
+
+    def __init__(self, compiled, node_id):
+        self._compiled = compiled
+        self._node_id = node_id
+
+    def __getitem__(self, succ):
+        if succ not in self:
+            raise KeyError(succ)
+
+        compiled = self._compiled
+        k = bisect.bisect_left(compiled.successor_ids[self._node_id],
+                               compiled.index[succ])
+        return ReadOnlyMapping(
+            compiled.edge_data[compiled.succ_indptr[self._node_id] + k])
+
+    def __iter__(self):
+        return iter(self._compiled._successors[self._node_id])
+
+    def __len__(self):
+        return len(self._compiled.successor_ids[self._node_id])
+
+    def __contains__(self, succ):
+        return succ in self._compiled._successors[self._node_id]
+
+
+class ReadOnlyNodeData(Mapping):
+    """`G.node` of a compiled hypothgraph, {node: read-only attributes}"""
+
+    def __init__(self, compiled):
+        self._compiled = compiled
+
+    def __getitem__(self, node):
+        return ReadOnlyMapping(
+            self._compiled.node_data[self._compiled.index[node]])
+
+    def __iter__(self):
+        return iter(self._compiled.nodes_list)
+
+    def __len__(self):
+        return len(self._compiled.nodes_list)
+
+
+# ## Helper functions
+def frozen_array(values, dtype):
+    """([value...], dtype) -> read-only np.array"""
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+
+    return array
+
+
+# Adjacency lists to CSR arrays: neighbours of `i` are
+# `indices[indptr[i]:indptr[i+1]]`
+def csr_arrays(adjacency):
+    """([(neighbour_id...), ...]) -> (indptr, indices)"""
+    indptr = np.zeros(len(adjacency) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(neighbours) for neighbours in adjacency])
+    indices = np.fromiter((j for neighbours in adjacency for j in neighbours),
+                          dtype=np.int64, count=int(indptr[-1]))
+
+    indptr.flags.writeable = False
+    indices.flags.writeable = False
+
+    return indptr, indices
+
+
+# Kahn's algorithm on the ids, `None` if there is a cycle
+def topological_order_ids(successor_ids):
+    """([(successor_id...), ...]) -> read-only np.array([id...]) | None"""
+    in_degree = [0] * len(successor_ids)
+    for succs in successor_ids:
+        for j in succs:
+            in_degree[j] += 1
+
+    fringe = [i for i, degree in enumerate(in_degree) if degree == 0]
+    order = []
+    while fringe:
+        i = fringe.pop()
+        order.append(i)
+        for j in successor_ids[i]:
+            in_degree[j] -= 1
+            if in_degree[j] == 0:
+                fringe.append(j)
+
+    if len(order) < len(successor_ids):
+        return None
+
+    return frozen_array(order, np.int64)
+
+
+# Component id of every node, components are numbered in a topological order of
+# the condensed graph
+def strongly_connected_component_ids(successor_ids):
+    """([(successor_id...), ...]) -> [component_id...]"""
+    digraph = nx.DiGraph()
+    digraph.add_nodes_from(range(len(successor_ids)))
+    digraph.add_edges_from((i, j)
+                           for i, succs in enumerate(successor_ids)
+                           for j in succs)
+
+    condensed = nx.condensation(digraph)
+    position = dict((component, i) for i, component in
+                    enumerate(nx.topological_sort(condensed)))
+    mapping = condensed.graph['mapping']
+
+    return [position[mapping[i]] for i in range(len(successor_ids))]
@@ -27,7 +27,10 @@ author: Asan Agibetov
 # - `importance_weight`
 # - `boundary nodes` (`hypothesis_source` and `hypothesis_target`)
 #
+# The hypothgraph is versioned (see `hypothgraph.HypothGraph`), so that the
+# cached indices and results know when it changes
 from hypotest.graph_mutation import importance_weights, evidence_weights
+from hypotest.setup_hypothgraph.hypothgraph import HypothGraph
 
 
 # Convert networkx graph into a hypograph with causality meta-data updated
@@ -38,4 +41,7 @@ def convert_to_hypothgraph(digraph):
     # assign evidence weights to the graph
     digraph = evidence_weights.assign_evidence_weights(digraph)
 
+    if not isinstance(digraph, HypothGraph):
+        digraph = HypothGraph(digraph)
+
     return digraph
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Evidence overlay
+#
+# What-if analyses (which node should we evidence next, what if the endpoints
+# were different) used to copy the whole hypothgraph before changing the
+# evidence or the endpoints of the copy. An overlay instead keeps a reference
+# to the base hypothgraph and stores only the attributes written through it
+#
+#   {node: {attribute: value}}
+#
+# Reading `overlay.node[node]` gives the attributes of the base with the written
+# ones on top, writing never touches the base. The nodes and the arcs are the
+# ones of the base, the overlay answers the read part of the networkx digraph
+# interface (arc attributes are the dictionaries of the base), hence it can be
+# given to any function expecting a hypothgraph. Overlays can be stacked, and
+# a scenario costs memory proportional to its changes.
+#
+# Evidence is the `evidenced` attribute (`1` evidenced, `-1` not), endpoints are
+# the `hypothesis_source` and `hypothesis_target` attributes (see
+# `hypoth_conf.assign_boundary`)
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError:
+    from collections import Mapping, MutableMapping
+
+
+EVIDENCED = 'evidenced'
+SOURCE = 'hypothesis_source'
+TARGET = 'hypothesis_target'
+
+# marks an attribute of the base deleted in the overlay
+_deleted = object()
+
+
+class EvidenceOverlay(object):
+    """Attribute changes on top of a shared base hypothgraph"""
+
+    def __init__(self, base, evidenced_nodes=(), endpoints=None):
+        self.base = base
+        self.graph = base.graph
+        self.changes = {}
+        # incremented at every write, see `utils.graph_stamp`
+        self.version = 0
+
+        if endpoints is not None:
+            self.assign_endpoints(*endpoints)
+        for node in evidenced_nodes:
+            self.assert_evidence(node)
+
+    # ### Writes
+    def set_attribute(self, node, attribute, value):
+        if node not in self.base:
+            raise KeyError(node)
+        self.changes.setdefault(node, {})[attribute] = value
+        self.version += 1
+
+    def delete_attribute(self, node, attribute):
+        if attribute not in self.node[node]:
+            raise KeyError(attribute)
+        self.changes.setdefault(node, {})[attribute] = _deleted
+        self.version += 1
+
+    def assert_evidence(self, node):
+        self.set_attribute(node, EVIDENCED, 1)
+
+    def unassert_evidence(self, node):
+        self.set_attribute(node, EVIDENCED, -1)
+
+    def assign_endpoints(self, source, target):
+        current = self.endpoints()
+        if current is not None:
+            self.delete_attribute(current[0], SOURCE)
+            self.delete_attribute(current[1], TARGET)
+
+        self.set_attribute(source, SOURCE, 1)
+        self.set_attribute(target, TARGET, 1)
+
+    # ### Reads
+    def attributes(self, node):
+        """(node) -> {attribute: value}, the base with the overlay on top"""
+        attributes = self.base.node[node]
+        changes = self.changes.get(node)
+        if changes:
+            attributes = dict(attributes)
+            for attribute, value in changes.items():
+                if value is _deleted:
+                    attributes.pop(attribute, None)
+                else:
+                    attributes[attribute] = value
+
+        return attributes
+
+    def evidenced_nodes(self):
+        """-> [node...] with `evidenced == 1`"""
+        return [node for node, data in self.nodes_iter(data=True)
+                if data.get(EVIDENCED) == 1]
+
+    def endpoints(self):
+        """-> (source, target) or None"""
+        source = next((node for node, data in self.nodes_iter(data=True)
+                       if SOURCE in data), None)
+        target = next((node for node, data in self.nodes_iter(data=True)
+                       if TARGET in data), None)
+        if source is None or target is None:
+            return None
+
+        return (source, target)
+
+    # ### Read-only networkx interface
+    @property
+    def node(self):
+        return OverlayNodeData(self)
+
+    def __len__(self):
+        return len(self.base)
+
+    def __iter__(self):
+        return iter(self.base)
+
+    def __contains__(self, node):
+        return node in self.base
+
+    def __getitem__(self, node):
+        return self.base[node]
+
+    @property
+    def edge(self):
+        return self.base.edge
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return False
+
+    def has_node(self, node):
+        return self.base.has_node(node)
+
+    def has_edge(self, u, v):
+        return self.base.has_edge(u, v)
+
+    def number_of_nodes(self):
+        return self.base.number_of_nodes()
+
+    def number_of_edges(self):
+        return self.base.number_of_edges()
+
+    def nodes(self, data=False):
+        return list(self.nodes_iter(data=data))
+
+    def nodes_iter(self, data=False):
+        if data:
+            return ((node, OverlayAttributes(self, node))
+                    for node in self.base.nodes_iter())
+        return self.base.nodes_iter()
+
+    def edges(self, data=False):
+        return self.base.edges(data=data)
+
+    def edges_iter(self, data=False):
+        return self.base.edges_iter(data=data)
+
+    def successors(self, node):
+        return self.base.successors(node)
+
+    def successors_iter(self, node):
+        return self.base.successors_iter(node)
+
+    def predecessors(self, node):
+        return self.base.predecessors(node)
+
+    def predecessors_iter(self, node):
+        return self.base.predecessors_iter(node)
+
+    neighbors = successors
+    neighbors_iter = successors_iter
+
+    # A standalone digraph with the attributes of the overlay
+    def copy(self):
+        """-> digraph"""
+        digraph = self.base.copy()
+        for node in self.changes:
+            digraph.node[node] = dict(self.attributes(node))
+
+        return digraph
+
+
+# `overlay.node`, {node: OverlayAttributes}
+class OverlayNodeData(Mapping):
+    """`G.node` of an overlay"""
+
+    def __init__(self, overlay):
+        self._overlay = overlay
+
+    def __getitem__(self, node):
+        if node not in self._overlay:
+            raise KeyError(node)
+        return OverlayAttributes(self._overlay, node)
+
+    def __iter__(self):
+        return iter(self._overlay)
+
+    def __len__(self):
+        return len(self._overlay)
+
+
+# Attributes of one node, written into the overlay
+class OverlayAttributes(MutableMapping):
+    """`G.node[node]` of an overlay"""
+
+    def __init__(self, overlay, node):
+        self._overlay = overlay
+        self._node = node
+
+    def __getitem__(self, attribute):
+        return self._overlay.attributes(self._node)[attribute]
+
+    def __setitem__(self, attribute, value):
+        self._overlay.set_attribute(self._node, attribute, value)
+
+    def __delitem__(self, attribute):
+        self._overlay.delete_attribute(self._node, attribute)
+
+    def __iter__(self):
+        return iter(self._overlay.attributes(self._node))
+
+    def __len__(self):
+        return len(self._overlay.attributes(self._node))
+
+    def __repr__(self):
+        return repr(dict(self))
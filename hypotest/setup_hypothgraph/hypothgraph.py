@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Versioned hypothgraph
+#
+# Derived structures (reachability indices, path counts, confidences) can only
+# be reused if we know that the hypothgraph has not changed since they were
+# computed. A plain digraph does not tell, and the graph mutations
+# (`assign_importance_weights`, `assign_evidence_weights`, `assign_boundary`)
+# write into the node dictionaries in place.
+#
+# `HypothGraph` is a digraph with two counters
+#
+# - `structure_version` is incremented whenever nodes or arcs are added or
+#   removed
+# - `attribute_version` is incremented whenever a node, arc or graph attribute
+#   is set or deleted, also in place (`H.node[node][key] = value`)
+#
+# The attribute dictionaries are `TrackedAttributes`, dictionaries which notify
+# the hypothgraphs they belong to. A dictionary can belong to several
+# hypothgraphs (`subgraph` shares the dictionaries with its parent), all of
+# them are notified. Copies (`H.copy()`, pickles) are new hypothgraphs with
+# their own dictionaries.
+#
+# The counters only say whether *this* hypothgraph changed. To recognize the
+# same hypothgraph in another process or in another session, `content_hash`
+# computes a digest of the nodes, arcs and attributes which does not depend on
+# the insertion order nor on python's hash randomization.
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+import hashlib
+import numbers
+import weakref
+
+import networkx as nx
+
+
+# ## Attribute dictionaries
+class TrackedAttributes(dict):
+    """Attribute dictionary which notifies its hypothgraphs of changes"""
+
+    def __init__(self, owner=None, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._owners = []
+        if owner is not None:
+            self.add_owner(owner)
+
+    def add_owner(self, owner):
+        if not any(ref() is owner for ref in self._owners):
+            self._owners.append(weakref.ref(owner))
+
+    def changed(self):
+        for ref in self._owners:
+            owner = ref()
+            if owner is not None:
+                owner.attribute_version += 1
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.changed()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.changed()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        self.changed()
+        return value
+
+    def popitem(self):
+        item = dict.popitem(self)
+        self.changed()
+        return item
+
+    def clear(self):
+        dict.clear(self)
+        self.changed()
+
+    # copies and pickles are plain dictionaries, the hypothgraph they end up
+    # in tracks them again
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+# `H.node`, {node: TrackedAttributes}, every dictionary stored in it is tracked
+class NodeAttributes(TrackedAttributes):
+    """Node attribute dictionaries of a hypothgraph"""
+
+    def __init__(self, owner):
+        TrackedAttributes.__init__(self)
+        self.owner = weakref.ref(owner)
+
+    def __setitem__(self, node, attributes):
+        TrackedAttributes.__setitem__(self, node,
+                                      track(attributes, self.owner()))
+
+    def update(self, *args, **kwargs):
+        for node, attributes in dict(*args, **kwargs).items():
+            self[node] = attributes
+
+    def setdefault(self, node, default=None):
+        if node not in self:
+            self[node] = {} if default is None else default
+        return self[node]
+
+    def changed(self):
+        owner = self.owner()
+        if owner is not None:
+            owner.attribute_version += 1
+
+
+def track(attributes, owner):
+    """(dict, hypothgraph) -> TrackedAttributes"""
+    if not isinstance(attributes, TrackedAttributes):
+        attributes = TrackedAttributes(None, attributes)
+    if owner is not None:
+        attributes.add_owner(owner)
+
+    return attributes
+
+
+# ## Hypothgraph
+class HypothGraph(nx.DiGraph):
+    """Digraph with structure and attribute version counters"""
+
+    def __init__(self, data=None, **attr):
+        self.structure_version = 0
+        self.attribute_version = 0
+        self._content_hash = None
+        nx.DiGraph.__init__(self, data, **attr)
+
+    # networkx builds the arc dictionaries with this factory, and assigns
+    # `H.node` and `H.graph` directly (e.g. `to_networkx_graph`)
+    def edge_attr_dict_factory(self):
+        return TrackedAttributes(self)
+
+    @property
+    def node(self):
+        return self._node_attributes
+
+    @node.setter
+    def node(self, attributes):
+        if not (isinstance(attributes, NodeAttributes) and
+                attributes.owner() is self):
+            node_attributes = NodeAttributes(self)
+            node_attributes.update(attributes)
+            attributes = node_attributes
+        self._node_attributes = attributes
+        self.attribute_version += 1
+
+    @property
+    def graph(self):
+        return self._graph_attributes
+
+    @graph.setter
+    def graph(self, attributes):
+        self._graph_attributes = track(attributes, self)
+        self.attribute_version += 1
+
+    @property
+    def version(self):
+        """-> (structure_version, attribute_version)"""
+        return (self.structure_version, self.attribute_version)
+
+    # ### Structure changes
+    def add_node(self, n, attr_dict=None, **attr):
+        if n not in self.succ:
+            self.structure_version += 1
+        nx.DiGraph.add_node(self, n, attr_dict, **attr)
+
+    def add_nodes_from(self, nodes, **attr):
+        nb_nodes = len(self.succ)
+        nx.DiGraph.add_nodes_from(self, nodes, **attr)
+        if len(self.succ) != nb_nodes:
+            self.structure_version += 1
+
+    def remove_node(self, n):
+        nx.DiGraph.remove_node(self, n)
+        self.structure_version += 1
+
+    def remove_nodes_from(self, nbunch):
+        nx.DiGraph.remove_nodes_from(self, nbunch)
+        self.structure_version += 1
+
+    def add_edge(self, u, v, attr_dict=None, **attr):
+        if not self.has_edge(u, v):
+            self.structure_version += 1
+        nx.DiGraph.add_edge(self, u, v, attr_dict, **attr)
+
+    def add_edges_from(self, ebunch, attr_dict=None, **attr):
+        ebunch = list(ebunch)
+        if any(len(e) in (2, 3) and not self.has_edge(e[0], e[1])
+               for e in ebunch):
+            self.structure_version += 1
+        nx.DiGraph.add_edges_from(self, ebunch, attr_dict, **attr)
+
+    def remove_edge(self, u, v):
+        nx.DiGraph.remove_edge(self, u, v)
+        self.structure_version += 1
+
+    def remove_edges_from(self, ebunch):
+        nx.DiGraph.remove_edges_from(self, ebunch)
+        self.structure_version += 1
+
+    def clear(self):
+        nx.DiGraph.clear(self)
+        self.structure_version += 1
+
+    # ### Shared and copied dictionaries
+    #
+    # The subgraph shares the attribute dictionaries of this hypothgraph, it is
+    # notified of their changes as well
+    def subgraph(self, nbunch):
+        subgraph = nx.DiGraph.subgraph(self, nbunch)
+        for _, _, data in subgraph.edges_iter(data=True):
+            data.add_owner(subgraph)
+
+        return subgraph
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.track_attributes()
+
+    def track_attributes(self):
+        self.node = self._node_attributes
+        self.graph = self._graph_attributes
+
+        for u, succs in self.succ.items():
+            for v, data in succs.items():
+                data = track(data, self)
+                succs[v] = data
+                self.pred[v][u] = data
+
+    # ### Content hash
+    def content_hash(self, nb_iterations=2):
+        """-> hex digest, cached until the hypothgraph changes"""
+        key = (self.version, nb_iterations)
+        if self._content_hash is None or self._content_hash[0] != key:
+            self._content_hash = (key, content_hash(self, nb_iterations))
+
+        return self._content_hash[1]
+
+
+# ## Content hash
+#
+# Weisfeiler-Lehman refinement of node labels: the initial label of a node is
+# the digest of the node and of its sorted attributes, at every iteration the
+# label becomes the digest of the label and of the sorted labels of its
+# successors (with the arc attributes) and predecessors. The hash of the
+# hypothgraph is the digest of the sorted final labels and of the graph
+# attributes. Nodes are part of the initial labels because queries are about
+# named nodes (causal endpoints, evidenced nodes), isomorphic hypothgraphs with
+# different nodes get different hashes.
+#
+# Works for any hypothgraph (digraph, compiled snapshot or view)
+def content_hash(hypothgraph, nb_iterations=2):
+    """(hypothgraph, int) -> hex digest"""
+    labels = dict(
+        (node, digest(stable_repr(node), stable_repr(data)))
+        for node, data in hypothgraph.nodes_iter(data=True))
+
+    arcs = [(u, v, digest(stable_repr(data)))
+            for u, v, data in hypothgraph.edges_iter(data=True)]
+
+    for _ in range(max(nb_iterations, 1)):
+        neighbours = dict((node, ([], [])) for node in labels)
+        for u, v, arc_digest in arcs:
+            neighbours[u][0].append(labels[v] + arc_digest)
+            neighbours[v][1].append(labels[u] + arc_digest)
+
+        labels = dict(
+            (node, digest(labels[node], ','.join(sorted(succs)),
+                          ','.join(sorted(preds))))
+            for node, (succs, preds) in neighbours.items())
+
+    return digest(stable_repr(dict(hypothgraph.graph)),
+                  *sorted(labels.values()))
+
+
+def digest(*parts):
+    """(str...) -> hex digest"""
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part.encode('utf-8'))
+        sha.update(b'\0')
+
+    return sha.hexdigest()
+
+
+# Representation which is the same in every process, dictionaries and sets are
+# sorted (also read-only mappings of compiled hypothgraphs), numbers are
+# represented by their value
+def stable_repr(value):
+    """(value) -> str"""
+    if isinstance(value, Mapping):
+        return '{' + ','.join(sorted(
+            stable_repr(key) + ':' + stable_repr(item)
+            for key, item in value.items())) + '}'
+    if isinstance(value, (set, frozenset)):
+        return 'set(' + ','.join(sorted(stable_repr(item)
+                                        for item in value)) + ')'
+    if isinstance(value, (list, tuple)):
+        return '(' + ','.join(stable_repr(item) for item in value) + ')'
+    if isinstance(value, bool):
+        return repr(value)
+    if isinstance(value, numbers.Integral):
+        return repr(int(value))
+    if isinstance(value, numbers.Real):
+        return repr(float(value))
+
+    return repr(value)
@@ -24,7 +24,8 @@ function which builds the graph.
 """
 
 import networkx as nx
-import random
+
+from hypotest.setup_hypothgraph import reachability_index
 
 
 nodes = [
@@ -109,11 +110,12 @@ def random_endpoints(H, min, max, s=None, t=None):
     Makes sure then the same nodes are not selected, and that the path exists
 
     """
-    s = s or random.randint(min, max)
-    t = t or random.randint(min, max)
-
-    if s == t or not nx.has_path(H, s, t):
-        return random_endpoints(H, min, max)
+    index = reachability_index.reachability_index(H)
 
-    else:
+    if s is not None and t is not None and s != t and index.has_path(s, t):
         return (s, t)
+
+    # draw directly among the pairs with a path
+    candidates = [n for n in H.nodes_iter() if min <= n <= max]
+
+    return index.random_reachable_pair(nodes=candidates)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Reachability index
+#
+# Every confidence computation starts by checking that there is a path between
+# the causal endpoints and by sorting them topologically. Instead of a graph
+# traversal per query we compute once the transitive closure of the hypothgraph:
+# the descendants of every node are stored as a bitset (python integer), where
+# bit `j` is set if the node with id `j` is reachable. Then
+#
+# - `has_path(u, v)` is a bit test
+# - `u` precedes `v` topologically if `u` reaches `v` but not the other way
+# - a random reachable pair is drawn without retrying unreachable pairs
+#
+# Nodes of a strongly connected component share the same descendants, so we
+# compute one bitset per component in the reverse topological order of the
+# condensed graph.
+#
+# Indices are cached per versioned hypothgraph, and rebuilt as soon as the
+# nodes or the arcs of the hypothgraph change.
+import bisect
+import random
+import weakref
+
+import networkx as nx
+
+from hypotest.setup_hypothgraph.compiled_hypothgraph import \
+    CompiledHypothgraph, strongly_connected_component_ids
+from hypotest.setup_hypothgraph.hypothgraph import HypothGraph
+from hypotest.setup_hypothgraph.evidence_overlay import EvidenceOverlay
+
+
+class ReachabilityIndex(object):
+    """Transitive closure of a hypothgraph as bitsets of descendants"""
+
+    def __init__(self, hypothgraph):
+        nodes = tuple(hypothgraph.nodes_iter())
+        index = dict((node, i) for i, node in enumerate(nodes))
+        successor_ids = [
+            [index[succ] for succ in hypothgraph.successors_iter(node)]
+            for node in nodes]
+
+        self.nodes_list = nodes
+        self.index = index
+        self.component_ids = strongly_connected_component_ids(successor_ids)
+        self.descendants = descendant_bitsets(successor_ids, self.component_ids)
+
+        # no cycles if every component is a single node without a self loop
+        self.is_acyclic = \
+            len(set(self.component_ids)) == len(nodes) and \
+            not any(i in succs for i, succs in enumerate(successor_ids))
+
+        # cumulative number of reachable pairs `(u, v)`, `u != v`, to draw
+        # random pairs
+        self.cumulative_nb_pairs = []
+        nb_pairs = 0
+        for i, bits in enumerate(self.descendants):
+            nb_pairs += popcount(bits & ~(1 << i))
+            self.cumulative_nb_pairs.append(nb_pairs)
+
+    # ### Queries
+    def has_path(self, source, target):
+        """(source, target) -> bool, every node reaches itself"""
+        return bool(self.descendants[self.index[source]] >>
+                    self.index[target] & 1)
+
+    def precedes(self, u, v):
+        """(u, v) -> bool, `u` comes before `v` in every topological order"""
+        return u != v and self.has_path(u, v) and not self.has_path(v, u)
+
+    def descendants_of(self, node):
+        """(node) -> set(node...), the node itself is included"""
+        return set(self.nodes_list[j] for j in iter_bits(
+            self.descendants[self.index[node]]))
+
+    # Same as `hypoth_conf.sort_hypoth_conf_endpoints`, endpoints are reordered
+    # only if the hypothgraph has no cycles
+    def sort_endpoints(self, u, v):
+        """(u, v) -> (source, target)"""
+        source, target = u, v
+        if self.is_acyclic and self.precedes(v, u):
+            source, target = v, u
+
+        if not self.has_path(source, target):
+            raise nx.NetworkXNoPath(
+                "No path between {} and {}".format(source, target))
+
+        return (source, target)
+
+    # Uniformly random pair `(source, target)` of different nodes with a path
+    # from source to target. If `nodes` is given, both endpoints are drawn among
+    # them
+    def random_reachable_pair(self, nodes=None, rand=random):
+        """([node...], random.Random) -> (source, target)"""
+        if nodes is None:
+            cumulative_nb_pairs = self.cumulative_nb_pairs
+            candidates = None
+            node_ids = range(len(self.nodes_list))
+        else:
+            node_ids = [self.index[node] for node in nodes]
+            candidates = 0
+            for i in node_ids:
+                candidates |= 1 << i
+            cumulative_nb_pairs = []
+            nb_pairs = 0
+            for i in node_ids:
+                nb_pairs += popcount(self.descendants[i] & candidates &
+                                     ~(1 << i))
+                cumulative_nb_pairs.append(nb_pairs)
+
+        if not cumulative_nb_pairs or not cumulative_nb_pairs[-1]:
+            raise ValueError("No pair of nodes with a path between them")
+
+        # pick the source proportionally to its number of descendants, and one
+        # of its descendants
+        pair = rand.randrange(cumulative_nb_pairs[-1])
+        position = bisect.bisect_right(cumulative_nb_pairs, pair)
+        source_id = node_ids[position]
+        if position:
+            pair -= cumulative_nb_pairs[position - 1]
+
+        bits = self.descendants[source_id] & ~(1 << source_id)
+        if candidates is not None:
+            bits &= candidates
+        target_id = nth_bit(bits, pair)
+
+        return (self.nodes_list[source_id], self.nodes_list[target_id])
+
+
+# ## Cached indices
+#
+# One index per hypothgraph, it is valid as long as the nodes and the arcs of
+# the hypothgraph are the same. Compiled hypothgraphs never change, versioned
+# hypothgraphs count their structure changes. Overlays have the nodes and the
+# arcs of their base, and share its index. Plain networkx digraphs do not tell
+# when they change, they get a new index every time
+_indices = weakref.WeakKeyDictionary()
+
+
+def reachability_index(hypothgraph):
+    """
+    (hypothgraph) -> ReachabilityIndex
+
+    """
+    hypothgraph = structure_owner(hypothgraph)
+
+    version = structure_version(hypothgraph)
+    if version is None:
+        return ReachabilityIndex(hypothgraph)
+
+    cached = _indices.get(hypothgraph)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    index = ReachabilityIndex(hypothgraph)
+    _indices[hypothgraph] = (version, index)
+
+    return index
+
+
+# The hypothgraph whose nodes and arcs we see
+def structure_owner(hypothgraph):
+    while isinstance(hypothgraph, EvidenceOverlay):
+        hypothgraph = hypothgraph.base
+
+    return hypothgraph
+
+
+def structure_version(hypothgraph):
+    """(hypothgraph) -> version of the nodes and the arcs | None"""
+    if isinstance(hypothgraph, CompiledHypothgraph):
+        return 0
+    if isinstance(hypothgraph, HypothGraph):
+        return hypothgraph.structure_version
+
+    return None
+
+
+# ## Sorting the endpoints
+#
+# Versioned hypothgraphs answer from their cached index. On plain digraphs
+# building the index would cost more than answering the query, we check for
+# cycles and look for the paths directly
+def sort_endpoints(hypothgraph, u, v):
+    """(hypothgraph, u, v) -> (source, target)"""
+    hypothgraph = structure_owner(hypothgraph)
+    if structure_version(hypothgraph) is not None:
+        return reachability_index(hypothgraph).sort_endpoints(u, v)
+
+    source, target = u, v
+    if u != v and nx.is_directed_acyclic_graph(hypothgraph) and \
+            nx.has_path(hypothgraph, v, u):
+        source, target = v, u
+
+    if not nx.has_path(hypothgraph, source, target):
+        raise nx.NetworkXNoPath(
+                "No path between {} and {}".format(source, target))
+
+    return (source, target)
+
+
+# ## Helper functions
+#
+# Descendants of every node, components are numbered in a topological order of
+# the condensed graph (see `strongly_connected_component_ids`)
+def descendant_bitsets(successor_ids, component_ids):
+    """([[successor_id...]...], [component_id...]) -> [bits...]"""
+    nb_components = max(component_ids) + 1 if component_ids else 0
+    members = [[] for _ in range(nb_components)]
+    for i, component in enumerate(component_ids):
+        members[component].append(i)
+
+    component_bits = [0] * nb_components
+    for component in reversed(range(nb_components)):
+        bits = 0
+        for i in members[component]:
+            bits |= 1 << i
+            for j in successor_ids[i]:
+                if component_ids[j] != component:
+                    bits |= component_bits[component_ids[j]]
+        component_bits[component] = bits
+
+    return [component_bits[component] for component in component_ids]
+
+
+def popcount(bits):
+    """(int) -> number of set bits"""
+    return bin(bits).count('1')
+
+
+def iter_bits(bits):
+    """(int) -> generator(position of set bit...)"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+# Position of the `n`-th set bit (from zero), we skip 64 bits at a time
+def nth_bit(bits, n):
+    """(int, int) -> position"""
+    offset = 0
+    while True:
+        word = bits & 0xFFFFFFFFFFFFFFFF
+        nb_set = popcount(word)
+        if n < nb_set:
+            for position in iter_bits(word):
+                if n == 0:
+                    return offset + position
+                n -= 1
+        n -= nb_set
+        bits >>= 64
+        offset += 64
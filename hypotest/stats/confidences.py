@@ -24,11 +24,15 @@ author: Asan Agibetov
 # Given a hypothesis graph and the causal endpoints we compute the full
 # spectrum of confidences based on nodes in the boundary interior.
 import itertools as it
+from collections import namedtuple, defaultdict
+from fractions import Fraction
 
-from hypotest.confidence import compute_confidence
-from hypotest.graph_generation import boundary, hypoth_conf
+import numpy as np
+import networkx as nx
 
-from functools import partial
+from hypotest.confidence import compute_confidence, batch_confidence
+from hypotest.graph_generation import boundary, hypoth_conf
+from hypotest.utils.result_store import stored
 
 
 Hypoth_Conf = hypoth_conf.Hypoth_Conf
@@ -51,34 +55,76 @@ def confidences_possibilities(hypothgraph, source, target,
         return [0.0]
 
     # all nodes which potentially need to be evidenced
-    interior_nodes = boundary.in_boundary_interior(hypothgraph, source, target)
-
-    # we accumulate confidence values here
-    confidences = []
-
-    # which type of confidence are we computing, normalized or not
-    func_confidence = partial(
-            compute_confidence.confidence, func_importance=func_importance)
-    if normalized:
-        func_confidence = partial(
-                compute_confidence.normalized_confidence,
-                func_importance=func_importance)
+    interior_nodes = list(
+            boundary.in_boundary_interior(hypothgraph, source, target))
 
     # take combinations of interior nodes for the required number of evidenced
-    # nodes
-    for evidenced_possibility in it.combinations(interior_nodes, number_of_evidenced):
-        # make a hypothesis configuration
-        new_conf = Hypoth_Conf(source, target, evidenced_possibility)
-        confidences.append(func_confidence(hypothgraph, new_conf))
+    # nodes, one row of the evidence matrix per combination
+    combinations = list(it.combinations(range(len(interior_nodes)),
+                                         number_of_evidenced))
+    evidence_matrix = np.zeros((len(combinations), len(interior_nodes)),
+                               dtype=bool)
+    if combinations:
+        rows = np.repeat(np.arange(len(combinations)), number_of_evidenced)
+        evidence_matrix[rows, np.ravel(combinations)] = True
 
-    return confidences
+    # confidences of all the combinations at once
+    confidences = batch_confidence.batch_confidence(
+            hypothgraph, source, target, evidence_matrix,
+            nodes=interior_nodes, normalized=normalized,
+            func_importance=func_importance)
+
+    return confidences.tolist()
 
 
 # Compute the possible spectrum of mean confidences for the gradually
 # increasing number of evidenced nodes
+#
+# With `method='enumerate'` we list the confidences of all the combinations of
+# evidenced interior nodes. With `method='analytic'` we never enumerate the
+# combinations and return one `SpectrumLevel` per number of evidenced nodes, see
+# `analytic_confidence_spectrum`. With `method='sampled'` we draw random
+# combinations until the standard error of the mean is below `tolerance`, drawn
+# `batch_size` at a time and at most `max_samples` per number of evidenced
+# nodes, see `sampled_confidence_spectrum`
+#
+# Spectra are kept in the result store (if one is used), except the sampled
+# spectra without a seed
+SPECTRUM_METHODS = ('enumerate', 'analytic', 'sampled')
+
+
+def deterministic_spectrum(arguments):
+    return arguments['method'] != 'sampled' or arguments['seed'] is not None
+
+
+@stored(version=3, when=deterministic_spectrum)
 def confidence_spectrum(hypothgraph, source, target,
                         normalized=False,
-                        func_importance=def_func_import):
+                        func_importance=def_func_import,
+                        method='enumerate', bins=None,
+                        tolerance=None, seed=None,
+                        batch_size=None, max_samples=None):
+    if method not in SPECTRUM_METHODS:
+        raise ValueError("Unknown spectrum method {}, expected one of {}".format(
+            method, SPECTRUM_METHODS))
+
+    if method == 'analytic':
+        return analytic_confidence_spectrum(
+                hypothgraph, source, target, normalized=normalized,
+                func_importance=func_importance, bins=bins)
+
+    if method == 'sampled':
+        if tolerance is None:
+            tolerance = DEFAULT_TOLERANCE
+        if batch_size is None:
+            batch_size = DEFAULT_BATCH_SIZE
+        if max_samples is None:
+            max_samples = DEFAULT_MAX_SAMPLES
+        return sampled_confidence_spectrum(
+                hypothgraph, source, target, normalized=normalized,
+                func_importance=func_importance, tolerance=tolerance,
+                seed=seed, batch_size=batch_size, max_samples=max_samples)
+
     spectrum = []
 
     # all nodes in the boundary interior
@@ -100,6 +146,244 @@ def confidence_spectrum(hypothgraph, source, target,
     return spectrum
 
 
+# ## Analytic spectrum
+#
+# Confidence is linear in the evidence indicators: the confidence of a set of
+# evidenced nodes is the sum of the contributions of the nodes (see
+# `batch_confidence.node_contributions`). Hence, for `k` evidenced nodes out of
+# `m` interior nodes, every node is evidenced in `k/m` of the combinations and
+#
+#   mean(|E| = k) = k/m * sum(contributions)
+#
+# The distribution of the confidences for `k` is the number of `k`-subsets of
+# the contributions per value of their sum, which we get with a subset-sum DP
+# instead of enumerating the `C(m, k)` combinations.
+#
+# The keys of the DP are integers, so that equal sums are the same key whatever
+# the order in which they are added: exact contributions are counted in units
+# of their smallest binary fraction (floats are binary fractions), binned
+# contributions in units of the bin width.
+#
+# `values` are sorted, and `counts[i]` is the number of combinations whose
+# confidence is `values[i]`
+SpectrumLevel = namedtuple('SpectrumLevel',
+                           ['number_of_evidenced', 'mean', 'values', 'counts'])
+
+
+def analytic_confidence_spectrum(hypothgraph, source, target, normalized=False,
+                                 func_importance=def_func_import, bins=None):
+    """
+    (hypothgraph, source, target, bool, func, int) -> [SpectrumLevel...]
+
+    Distributions are exact if `bins` is None, otherwise the contributions are
+    rounded to multiples of `sum(contributions)/bins` and the values are the
+    centers of the bins
+
+    """
+    contributions, scale = interior_contributions(
+            hypothgraph, source, target, normalized=normalized,
+            func_importance=func_importance)
+    total = contributions.sum()
+    nb_interior = len(contributions)
+
+    # contributions as the keys of the DP, and the value of a key
+    if bins is None:
+        keys, unit = binary_units(contributions.tolist())
+    else:
+        unit = total / bins if total > 0 else 1.0
+        keys = [int(round(contribution / unit))
+                for contribution in contributions]
+
+    spectrum = []
+    distributions = subset_sum_distributions(keys)
+    for number_of_evidenced, distribution in enumerate(distributions):
+        mean = 0.0
+        if nb_interior:
+            mean = total * number_of_evidenced / nb_interior / scale
+
+        keys_sorted = sorted(distribution)
+        spectrum.append(SpectrumLevel(
+            number_of_evidenced,
+            float(mean),
+            [float(key * unit) / scale for key in keys_sorted],
+            [distribution[key] for key in keys_sorted]))
+
+    return spectrum
+
+
+# Floats as exact integer multiples of the smallest power of two among their
+# denominators
+def binary_units(values):
+    """([float...]) -> ([int...], Fraction(1, denominator))"""
+    ratios = [value.as_integer_ratio() for value in values]
+    denominator = max([1] + [ratio[1] for ratio in ratios])
+
+    return ([numerator * (denominator // ratio_denominator)
+             for numerator, ratio_denominator in ratios],
+            Fraction(1, denominator))
+
+
+# Number of `k`-subsets of `weights` per value of their sum for every `k`, the
+# counts are exact python integers
+def subset_sum_distributions(weights):
+    """([weight...]) -> [{sum: nb_subsets}, ...] indexed by subset size"""
+    distributions = [defaultdict(int) for _ in range(len(weights) + 1)]
+    distributions[0][0] = 1
+
+    for nb_weights, weight in enumerate(weights):
+        # larger subsets first, so that each weight is added at most once
+        for size in range(nb_weights, -1, -1):
+            extended = distributions[size + 1]
+            for subset_sum, nb_subsets in distributions[size].items():
+                extended[subset_sum + weight] += nb_subsets
+
+    return [dict(distribution) for distribution in distributions]
+
+
+# Contributions of the nodes in the boundary interior, and the value by which
+# we divide the confidences (max confidence if normalized)
+def interior_contributions(hypothgraph, source, target, normalized=False,
+                           func_importance=def_func_import):
+    """
+    (hypothgraph, source, target, bool, func) -> (np.array([contribution...]),
+                                                  scale)
+
+    """
+    # all nodes in the boundary interior, and their contributions
+    interior = list(boundary.in_boundary_interior(hypothgraph, source, target))
+    source, target = hypoth_conf.sort_hypoth_conf_endpoints(
+            hypothgraph, source, target)
+    contributions = batch_confidence.node_contributions(
+            hypothgraph, source, target, interior,
+            func_importance=func_importance)
+
+    scale = 1.0
+    if normalized:
+        scale = compute_confidence.max_confidence(
+                hypothgraph, source, target, func_importance=func_importance)
+
+    return contributions, scale
+
+
+# ## Sampled spectrum
+#
+# When the interior is too big even for the subset-sum DP (many distinct
+# real-valued contributions), we estimate the spectrum by drawing random
+# combinations of `k` interior nodes, `batch_size` combinations at a time. The
+# confidences of a batch are the sums of the contributions of the drawn nodes.
+# We stop drawing for `k` as soon as the standard error of the mean falls below
+# `tolerance` (absolute, in the units of the returned confidences), or when we
+# have drawn `max_samples` combinations.
+#
+# `quantiles` are the values of the sampled confidences at the requested
+# `quantile_levels`, and `ci_width` is the width of the 95% confidence interval
+# of the mean. The same `seed` gives the same spectrum
+SampledSpectrumLevel = namedtuple(
+    'SampledSpectrumLevel',
+    ['number_of_evidenced', 'mean', 'std_error', 'ci_width', 'quantiles',
+     'nb_samples'])
+
+DEFAULT_TOLERANCE = 1e-3
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_SAMPLES = 100000
+DEFAULT_QUANTILE_LEVELS = (0.05, 0.5, 0.95)
+Z_95 = 1.959963984540054
+
+
+def sampled_confidence_spectrum(hypothgraph, source, target, normalized=False,
+                                func_importance=def_func_import,
+                                tolerance=DEFAULT_TOLERANCE, seed=None,
+                                batch_size=DEFAULT_BATCH_SIZE,
+                                max_samples=DEFAULT_MAX_SAMPLES,
+                                quantile_levels=DEFAULT_QUANTILE_LEVELS):
+    """
+    (hypothgraph, source, target, bool, func, float, int) ->
+        [SampledSpectrumLevel...]
+
+    """
+    contributions, scale = interior_contributions(
+            hypothgraph, source, target, normalized=normalized,
+            func_importance=func_importance)
+    contributions = contributions / scale
+    random_state = np.random.RandomState(seed)
+
+    spectrum = []
+    for number_of_evidenced in range(len(contributions) + 1):
+        samples = []
+        nb_samples = 0
+        std_error = np.inf
+        while nb_samples < max_samples and not std_error < tolerance:
+            samples.append(sample_confidences(
+                contributions, number_of_evidenced,
+                min(batch_size, max_samples - nb_samples), random_state))
+            nb_samples += len(samples[-1])
+
+            confidences = np.concatenate(samples)
+            if nb_samples > 1:
+                std_error = confidences.std(ddof=1) / np.sqrt(nb_samples)
+
+        spectrum.append(SampledSpectrumLevel(
+            number_of_evidenced,
+            float(confidences.mean()),
+            float(std_error),
+            float(2 * Z_95 * std_error),
+            [float(quantile) for quantile in
+             np.percentile(confidences, [100 * q for q in quantile_levels])],
+            nb_samples))
+
+    return spectrum
+
+
+# Confidences of `nb_samples` random combinations of `number_of_evidenced`
+# nodes. Every row draws its own `k` distinct nodes, so the memory is
+# `nb_samples x k` and never `nb_samples x nb_interior`. When more than half of
+# the nodes are evidenced we draw the unevidenced ones instead, and subtract
+# their contributions from the total
+def sample_confidences(contributions, number_of_evidenced, nb_samples,
+                       random_state):
+    """(np.array, int, int, RandomState) -> np.array([confidence...])"""
+    nb_interior = len(contributions)
+    if number_of_evidenced == 0:
+        return np.zeros(nb_samples)
+    if number_of_evidenced == nb_interior:
+        return np.full(nb_samples, contributions.sum())
+
+    complement = number_of_evidenced > nb_interior // 2
+    nb_drawn = nb_interior - number_of_evidenced if complement \
+        else number_of_evidenced
+
+    drawn = draw_combinations(nb_interior, nb_drawn, nb_samples, random_state)
+    confidences = contributions[drawn].sum(axis=1)
+
+    if complement:
+        return contributions.sum() - confidences
+    return confidences
+
+
+# `nb_samples` uniform `k`-subsets of `range(n)`, one per row. Floyd's algorithm
+# draws the `k` columns for all the rows at once, each column checks the
+# previous ones, `nb_samples x k^2` operations. For big `k` (more than
+# `FLOYD_MAX_COLUMNS` and `k^2 > n`) each row is drawn on its own from a
+# permutation of `n` nodes instead
+FLOYD_MAX_COLUMNS = 128
+
+
+def draw_combinations(n, k, nb_samples, random_state):
+    """(int, int, int, RandomState) -> int[nb_samples, k]"""
+    drawn = np.empty((nb_samples, k), dtype=np.intp)
+    if k > FLOYD_MAX_COLUMNS and k * k > n:
+        for row in range(nb_samples):
+            drawn[row] = random_state.choice(n, k, replace=False)
+        return drawn
+
+    for column, j in enumerate(range(n - k, n)):
+        candidates = random_state.randint(0, j + 1, size=nb_samples)
+        taken = (drawn[:, :column] == candidates[:, None]).any(axis=1)
+        drawn[:, column] = np.where(taken, j, candidates)
+
+    return drawn
+
+
 # #################################
 # DEPRECATED
 # #################################
@@ -135,45 +419,60 @@ def old_confidence_spectrum(hypothgraph, source, target, normalized=False):
 # Relative confidences of a subgraph to its max confidence, and to the max
 # confidence possible, we return a dictionary of values which is suitable for
 # pandas dataframes
-def relative_confidence_spectrum(big, small, source, target):
-    evidenced_nodes = []
-    iterative_hypoth_conf = Hypoth_Conf(source, target, evidenced_nodes)
-    dict_confidences = {}
+#
+# Nodes of the boundary interior of the SUBGRAPH are evidenced one at a time,
+# hence the confidence after `k` nodes is the sum of the contributions of the
+# first `k` nodes. We compute the contributions once per graph and the four
+# spectra are cumulative sums (see `cumulative_confidences`)
+@stored(version=1)
+def relative_confidence_spectrum(big, small, source, target,
+                                 func_importance=def_func_import):
+    # all nodes in the boundary interior of the SUBGRAPH
+    nodes_boundary_interior = list(boundary.in_boundary_interior(
+            small, source, target))
 
-    # shortcut names for confidence functions
-    func_conf = compute_confidence.confidence
-    func_conf_norm = compute_confidence.normalized_confidence
+    sub_confidences, max_small_confidence = cumulative_confidences(
+            small, source, target, nodes_boundary_interior,
+            func_importance=func_importance)
+    big_confidences, max_big_confidence = cumulative_confidences(
+            big, source, target, nodes_boundary_interior,
+            func_importance=func_importance)
 
-    # compute max confidences in the small and in the big graphs
-    max_small_confidence = compute_confidence.max_confidence(small, source, target)
-    max_big_confidence = compute_confidence.max_confidence(big, source, target)
+    dict_confidences = {}
+    dict_confidences['sub_confidence_spectrum'] = sub_confidences.tolist()
+    dict_confidences['big_confidence_spectrum'] = big_confidences.tolist()
+    dict_confidences['sub_confidence_normalized_spectrum'] = (
+            sub_confidences / max_small_confidence).tolist()
+    dict_confidences['big_confidence_normalized_spectrum'] = (
+            big_confidences / max_big_confidence).tolist()
 
-    # all nodes in the boundary interior of the SUBGRAPH
-    nodes_boundary_interior = boundary.in_boundary_interior(
-            small, source, target)
-
-    # initial confidence values
-    dict_confidences['sub_confidence_spectrum'] = [
-            func_conf(small, iterative_hypoth_conf)]
-    dict_confidences['big_confidence_spectrum'] = [
-            func_conf(big, iterative_hypoth_conf)]
-    dict_confidences['sub_confidence_normalized_spectrum'] = [
-            func_conf_norm(small, iterative_hypoth_conf)]
-    dict_confidences['big_confidence_normalized_spectrum'] = [
-            func_conf_norm(big, iterative_hypoth_conf)]
+    return dict_confidences
 
-    # add confidence values
-    for boundary_interior_node in nodes_boundary_interior:
-        evidenced_nodes.append(boundary_interior_node)
-        iterative_hypoth_conf = Hypoth_Conf(source, target, evidenced_nodes)
 
-        dict_confidences['sub_confidence_spectrum'].append(
-                func_conf(small, iterative_hypoth_conf))
-        dict_confidences['big_confidence_spectrum'].append(
-                func_conf(big, iterative_hypoth_conf))
-        dict_confidences['sub_confidence_normalized_spectrum'].append(
-                func_conf_norm(small, iterative_hypoth_conf))
-        dict_confidences['big_confidence_normalized_spectrum'].append(
-                func_conf_norm(big, iterative_hypoth_conf))
+# Confidences when the `nodes` are evidenced one after the other, starting with
+# no evidence, and the max confidence. Nodes which are not in the hypothgraph
+# contribute nothing, no path between the endpoints gives zero confidences
+def cumulative_confidences(hypothgraph, source, target, nodes,
+                           func_importance=def_func_import):
+    """
+    (hypothgraph, source, target, [node...], func) ->
+        (np.array([confidence...]), max_confidence)
 
-    return dict_confidences
+    """
+    confidences = np.zeros(len(nodes) + 1)
+    try:
+        source, target = hypoth_conf.sort_hypoth_conf_endpoints(
+                hypothgraph, source, target)
+    except nx.NetworkXNoPath:
+        print("No path between {} and {}".format(source, target))
+        return confidences, 1.0
+
+    contributions = batch_confidence.node_contributions(
+            hypothgraph, source, target, nodes,
+            func_importance=func_importance)
+    np.cumsum(contributions, out=confidences[1:])
+
+    max_confidence_measure = compute_confidence.max_confidence(
+            hypothgraph, source, target, func_importance=func_importance)
+
+    return confidences, max_confidence_measure
@@ -26,11 +26,9 @@ target of the hypothesis. And we do so for all the unevidenced nodes.
 """
 import pandas as pd
 
-from hypotest import utils as hypotest_utils
-from hypotest.print_stats import utils as stats_utils
-from hypotest.assert_evidence import assert_evidence, unassert_evidence
-from hypotest import assert_endpoints
-from hypotest.inference import generalization
+from hypotest.stats import utils as stats_utils
+from hypotest.inference import generalization, node_contribution
+from hypotest.setup_hypothgraph.evidence_overlay import EvidenceOverlay
 
 
 def generalization_stats(H, endpoints=None, evidenced_nodes=None):
@@ -55,35 +53,37 @@ def generalization_stats(H, endpoints=None, evidenced_nodes=None):
 
 
     """
-    # assert new endpoints and evidenced nodes in the copy of the graph and
+    # assert new endpoints and evidenced nodes in an overlay of the graph and
     # return reference to it
     H = stats_utils.preapre_hypothesis_graph(H, endpoints, evidenced_nodes)
 
-    source, target = hypotest_utils.find_causal_endpoints(H)
-    unevidenced_nodes = hypotest_utils.find_missing_nodes(H)
+    hypoth_conf = stats_utils.extract_hypoth_conf(H)
+    unevidenced_nodes = node_contribution.find_missing_nodes(H, hypoth_conf)
 
     generalizations = {}
     # we evidence one node at a time and see how well does it generalize
     for unevidenced_node in unevidenced_nodes:
         generalizations[unevidenced_node] = generalize_wrapper(
-            H, unevidenced_node, f=generalization.generalization_data_for_plot)
+            H, hypoth_conf, unevidenced_node,
+            f=generalization.generalization_data_for_plot)
 
     return generalizations
 
 
-def generalize_wrapper(H, unevidenced_node, f=generalization.generalize,
-                       *args, **kwargs):
+def generalize_wrapper(H, hypoth_conf, unevidenced_node,
+                       f=generalization.generalize, *args, **kwargs):
     """
-    () -> evidences ``unevidenced_node``; f() ; unevidence back the node
+    () -> f() with ``unevidenced_node`` evidenced
 
-    ``f`` is the generalization function
+    ``f`` is the generalization function, it runs on an overlay of ``H`` where
+    the node is evidenced, ``H`` itself is not changed
 
     """
-    assert_evidence(H, unevidenced_node)
-    result = f(H, *args, **kwargs)
-    unassert_evidence(H, unevidenced_node)
+    scenario = EvidenceOverlay(H, evidenced_nodes=[unevidenced_node])
+    scenario_conf = hypoth_conf._replace(
+        evidenced_nodes=list(hypoth_conf.evidenced_nodes) + [unevidenced_node])
 
-    return result
+    return f(scenario, scenario_conf, *args, **kwargs)
 
 
 def convert_to_dataframe(H, endpoints=None, evidenced_nodes=None):
@@ -150,21 +150,16 @@ def generalization_different_evidenced_nodes(H, endpoints, evidenced_list,
     them
 
     """
-    source, target = endpoints
-    hypoth_confs = [H.copy() for _ in range(len(evidenced_list))]
-
     stats_evidenced = {}
 
-    # evidence all the needed nodes
-    for hypoth_conf, evidenced_nodes, label in zip(hypoth_confs,
-                                                   evidenced_list,
-                                                   evidenced_list_labels):
-        assert_endpoints.assert_endpoints(hypoth_conf, source, target)
-        for evidenced_node in evidenced_nodes:
-            assert_evidence(hypoth_conf, evidenced_node)
+    # evidence all the needed nodes, one overlay per configuration
+    for evidenced_nodes, label in zip(evidenced_list, evidenced_list_labels):
+        scenario = stats_utils.preapre_hypothesis_graph(
+            H, endpoints, evidenced_nodes)
+        hypoth_conf = stats_utils.extract_hypoth_conf(scenario)
 
         stats_evidenced[label] = \
-            generalization.generalization_data_for_plot(hypoth_conf)
+            generalization.generalization_data_for_plot(scenario, hypoth_conf)
 
     return stats_evidenced
 
@@ -18,27 +18,47 @@ author: Asan Agibetov
 
 Common functions for all stats printing scripts
 """
-from hypotest import assert_endpoints
-from hypotest import assert_evidence
+from hypotest.graph_generation import hypoth_conf
+from hypotest.setup_hypothgraph import evidence_overlay
 
 
 def preapre_hypothesis_graph(H, endpoints=None, evidenced_nodes=None):
     """
-    Makes a copy of the hypothesis graph, and asserts endpoints (if any), as
-    well as the evidenced nodes
+    Makes an overlay of the hypothesis graph, and asserts endpoints (if any), as
+    well as the evidenced nodes. The hypothesis graph itself is not changed,
+    the overlay only keeps the asserted attributes
 
     """
-    H1 = H.copy()
+    H1 = evidence_overlay.EvidenceOverlay(H)
 
     if endpoints:
         try:
-            assert_endpoints.assert_endpoints(H1, *endpoints)
+            endpoints = hypoth_conf.sort_hypoth_conf_endpoints(H, *endpoints)
         except Exception as e:
             print(e)
             return e
+        H1.assign_endpoints(*endpoints)
 
     if evidenced_nodes:
         for evidenced_node in evidenced_nodes:
-            assert_evidence.assert_evidence(H1, evidenced_node)
+            H1.assert_evidence(evidenced_node)
 
     return H1
+
+
+def extract_hypoth_conf(H):
+    """
+    (hypothgraph) -> Hypoth_Conf
+
+    Hypothesis configuration from the asserted endpoints and evidenced nodes
+
+    """
+    endpoints = hypoth_conf.get_boundary_nodes(H)
+    if endpoints is None:
+        raise ValueError("No endpoints are asserted in the hypothesis graph")
+
+    evidenced_nodes = [
+        node for node, data in H.nodes_iter(data=True)
+        if data.get(evidence_overlay.EVIDENCED) == 1]
+
+    return hypoth_conf.Hypoth_Conf(endpoints[0], endpoints[1], evidenced_nodes)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+"""
+author: Asan Agibetov
+
+   Copyright 2015-2017 Asan Agibetov <asan.agibetov@gmail.com>
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+#
+# # Persistent result store
+#
+# Notebooks and scripts are rerun many times on the same hypothgraphs, and
+# recompute the same confidences and spectra every time. The result store keeps
+# these results on disk, in a SQLite database, between the runs.
+#
+# A result is keyed by
+#
+# - the name of the function and its version, the version is bumped whenever
+#   the function computes something different, and a hash of its code so that
+#   a function redefined with another body (e.g. in a notebook) misses
+# - the content hash of every hypothgraph argument (see
+#   `hypothgraph.content_hash`), the same hypothgraph built in another session
+#   has the same hash
+# - a stable representation of the other arguments, importance functions are
+#   represented by their module, name and code
+#
+# Results are pickled and compressed. The store keeps the running total of the
+# sizes of its results, when it grows bigger than `max_bytes` the least
+# recently read results are dropped. The database is in write-ahead-log mode,
+# hence many processes can read while one writes.
+#
+# The store is optional: functions decorated with `stored` compute their result
+# as usual unless a store was opened with `use_result_store`. Every call opens
+# the database, hence only the expensive entry points (e.g. the spectra) are
+# stored, not the confidences they are made of
+#
+#   from hypotest.utils import result_store
+#   result_store.use_result_store('~/.cache/hypotest/results.sqlite')
+#
+# Results are unpickled, only open stores you have written yourself.
+import inspect
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+from functools import wraps
+
+from hypotest.setup_hypothgraph.hypothgraph import content_hash, stable_repr
+from hypotest.utils.utils import graph_memo
+
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+DEFAULT_TIMEOUT = 30.0
+
+
+class ResultStore(object):
+    """Size-bounded key -> result store in a SQLite database"""
+
+    _missing = object()
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES,
+                 timeout=DEFAULT_TIMEOUT):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        with self.connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'size INTEGER NOT NULL, accessed REAL NOT NULL)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS results_accessed '
+                'ON results (accessed)')
+            # one row, the total size of the results
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS totals (size INTEGER NOT NULL)')
+            connection.execute(
+                'INSERT INTO totals (size) '
+                'SELECT COALESCE(SUM(size), 0) FROM results '
+                'WHERE NOT EXISTS (SELECT 1 FROM totals)')
+
+    # One connection per operation, a store can be shared by forked processes
+    def connect(self):
+        return Connection(self.path, self.timeout)
+
+    def get(self, key, default=None):
+        with self.connect() as connection:
+            row = connection.execute(
+                'SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+
+            try:
+                value = pickle.loads(zlib.decompress(row[0]))
+            except Exception:
+                self.misses += 1
+                self.discard(connection, key)
+                return default
+
+            # recency is best effort, readers do not wait for writers
+            best_effort(connection, connection.execute,
+                        'UPDATE results SET accessed = ? WHERE key = ?',
+                        (time.time(), key))
+
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        blob = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        if self.max_bytes is not None and len(blob) > self.max_bytes:
+            return
+
+        with self.connect() as connection:
+            row = connection.execute(
+                'SELECT size FROM results WHERE key = ?', (key,)).fetchone()
+            replaced = row[0] if row is not None else 0
+            connection.execute(
+                'INSERT OR REPLACE INTO results (key, value, size, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                (key, sqlite3.Binary(blob), len(blob), time.time()))
+            connection.execute('UPDATE totals SET size = size + ?',
+                               (len(blob) - replaced,))
+            self.evict(connection)
+
+    # Drop the least recently read results until the store fits
+    def evict(self, connection):
+        if self.max_bytes is None:
+            return
+
+        total, = connection.execute('SELECT size FROM totals').fetchone()
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in connection.execute(
+                'SELECT key, size FROM results ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key, size))
+            total -= size
+
+        self.remove(connection, evicted)
+
+    def discard(self, connection, key):
+        rows = connection.execute(
+            'SELECT key, size FROM results WHERE key = ?', (key,)).fetchall()
+        best_effort(connection, self.remove, connection, rows)
+
+    # Delete the results and their sizes from the total
+    def remove(self, connection, rows):
+        """(connection, [(key, size)...])"""
+        connection.executemany('DELETE FROM results WHERE key = ?',
+                               [(key,) for key, _ in rows])
+        connection.execute('UPDATE totals SET size = size - ?',
+                           (sum(size for _, size in rows),))
+
+    def size(self):
+        """-> (number of results, bytes)"""
+        with self.connect() as connection:
+            nb_results, = connection.execute(
+                'SELECT COUNT(*) FROM results').fetchone()
+            nb_bytes, = connection.execute(
+                'SELECT size FROM totals').fetchone()
+
+            return (nb_results, nb_bytes)
+
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute('DELETE FROM results')
+            connection.execute('UPDATE totals SET size = 0')
+        self.hits = 0
+        self.misses = 0
+
+
+# Connection committed (or rolled back) and closed at the end of the `with`
+class Connection(object):
+    def __init__(self, path, timeout):
+        self.connection = sqlite3.connect(path, timeout=timeout)
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+        finally:
+            self.connection.close()
+
+
+# Writes of the readers give up at once if a writer holds the lock, instead of
+# waiting for the timeout of the connection
+def best_effort(connection, write, *args):
+    connection.execute('PRAGMA busy_timeout = 0')
+    try:
+        write(*args)
+    except sqlite3.OperationalError:
+        connection.rollback()
+
+
+# ## Current store
+_store = None
+
+
+def use_result_store(path, max_bytes=DEFAULT_MAX_BYTES):
+    """(path, int) -> ResultStore, stored functions read and write it"""
+    global _store
+    _store = ResultStore(path, max_bytes=max_bytes)
+
+    return _store
+
+
+def close_result_store():
+    global _store
+    _store = None
+
+
+def current_result_store():
+    """-> ResultStore or None"""
+    return _store
+
+
+# ## Stored functions
+#
+# `when(arguments)` tells whether a call can be stored (e.g. not if the result
+# is random), `arguments` are the arguments of the call by name, with their
+# defaults
+def stored(version, when=None):
+    """Store the results of $f$ in the current result store"""
+    def decorator(f):
+        name = '{}.{}@{}'.format(f.__module__, f.__name__,
+                                 code_fingerprint(f.__code__))
+
+        @wraps(f)
+        def wrap(*args, **kwargs):
+            store = _store
+            if store is None:
+                return f(*args, **kwargs)
+
+            arguments = inspect.getcallargs(f, *args, **kwargs)
+            key = None
+            if when is None or when(arguments):
+                key = result_key(name, version, arguments)
+            if key is None:
+                return f(*args, **kwargs)
+
+            result = store.get(key, ResultStore._missing)
+            if result is ResultStore._missing:
+                result = f(*args, **kwargs)
+                store.put(key, result)
+
+            return result
+
+        return wrap
+
+    return decorator
+
+
+# Key of a call, or None if an argument has no stable representation
+def result_key(name, version, arguments):
+    """(str, int, {name: argument}) -> hex digest"""
+    parts = [name, stable_repr(version)]
+    for argument_name, value in sorted(arguments.items()):
+        representation = argument_repr(value)
+        if representation is None:
+            return None
+        parts.append(argument_name + '=' + representation)
+
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def argument_repr(value):
+    """(value) -> str or None"""
+    if is_hypothgraph(value):
+        return 'hypothgraph:' + graph_fingerprint(value)
+
+    if inspect.isfunction(value) or inspect.isbuiltin(value):
+        qualified_name = getattr(value, '__qualname__', value.__name__)
+        # lambdas and local functions have no stable name
+        if '<' in qualified_name:
+            return None
+        code = getattr(value, '__code__', None)
+        return 'function:{}.{}@{}'.format(
+            value.__module__, qualified_name,
+            code_fingerprint(code) if code is not None else '')
+
+    return stable_repr(value)
+
+
+# Hash of the bytecode, the constants and the names of a function, nested
+# functions are hashed by their code as well
+def code_fingerprint(code):
+    """(code object) -> hex digest"""
+    parts = [code.co_code]
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            const = code_fingerprint(const)
+        parts.append(stable_repr(const).encode('utf-8'))
+    parts.extend(name.encode('utf-8') for name in code.co_names)
+
+    return hashlib.sha256(b'\0'.join(parts)).hexdigest()
+
+
+def is_hypothgraph(value):
+    return hasattr(value, 'nodes_iter') and hasattr(value, 'edges_iter')
+
+
+# Content hashes are recomputed only when the hypothgraph changes
+@graph_memo
+def graph_fingerprint(hypothgraph):
+    """(hypothgraph) -> hex digest"""
+    if hasattr(hypothgraph, 'content_hash'):
+        return hypothgraph.content_hash()
+
+    return content_hash(hypothgraph)
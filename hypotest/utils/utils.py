@@ -19,22 +19,190 @@ author: Asan Agibetov
    limitations under the License.
 """
 #
+from collections import OrderedDict, namedtuple
 from functools import wraps
+import itertools as it
+import weakref
 
+from hypotest.setup_hypothgraph.compiled_hypothgraph import CompiledHypothgraph
+from hypotest.setup_hypothgraph.hypothgraph import HypothGraph
+from hypotest.setup_hypothgraph.evidence_overlay import EvidenceOverlay
 
-def memo(f):
-    """Memoization for function $f$"""
-    cache = {}
+
+# ## Memoization
+#
+# Results are kept in a least recently used cache of at most `maxsize` entries
+# (unbounded if `maxsize` is None), the oldest entry is dropped when the cache
+# is full. Every memoized function exposes `cache_info()` and `cache_clear()`,
+# as with `functools.lru_cache`
+DEFAULT_MAXSIZE = 128
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    """Bounded mapping key -> value with hit/miss statistics"""
+
+    _missing = object()
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.entries.pop(key, self._missing)
+        if value is self._missing:
+            self.misses += 1
+            return default
+
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        if self.maxsize is not None:
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self.entries))
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def memoized(f, make_key, maxsize):
+    cache = LRUCache(maxsize)
 
     @wraps(f)
-    def wrap(*args):
-        if args not in cache:
-            cache[args] = f(*args)
-        return cache[args]
+    def wrap(*args, **kwargs):
+        key = make_key(args, kwargs)
+        if key is None:
+            return f(*args, **kwargs)
+
+        result = cache.get(key, LRUCache._missing)
+        if result is LRUCache._missing:
+            result = f(*args, **kwargs)
+            cache.put(key, result)
+        return result
+
+    wrap.cache_info = cache.info
+    wrap.cache_clear = cache.clear
 
     return wrap
 
 
+def memo(f=None, maxsize=DEFAULT_MAXSIZE):
+    """Memoization for function $f$, `@memo` or `@memo(maxsize=...)`"""
+    if f is None:
+        return lambda f: memo(f, maxsize=maxsize)
+
+    return memoized(f, arguments_key, maxsize)
+
+
+# Memoization for functions of a hypothgraph, `f(hypothgraph, ...)`. The key
+# holds the version stamp of the hypothgraph (see `graph_stamp`), hence an entry
+# computed before the hypothgraph changed is never returned after. Hypothgraphs
+# without a version stamp (plain networkx digraphs) are not memoized, telling
+# whether they changed would cost as much as the functions we memoize
+def graph_memo(f=None, maxsize=DEFAULT_MAXSIZE):
+    """Memoization for $f(hypothgraph, ...)$"""
+    if f is None:
+        return lambda f: graph_memo(f, maxsize=maxsize)
+
+    def make_key(args, kwargs):
+        stamp = graph_stamp(args[0])
+        if stamp is None:
+            return None
+        return (stamp, arguments_key(args[1:], kwargs))
+
+    return memoized(f, make_key, maxsize)
+
+
+def arguments_key(args, kwargs):
+    """((arg...), {name: arg}) -> hashable key"""
+    if kwargs:
+        return (freeze(args), freeze(kwargs))
+    return freeze(args)
+
+
+# Hashable version of a value, lists and tuples (e.g. `Hypoth_Conf` with its
+# list of evidenced nodes) become tuples, sets become frozensets and
+# dictionaries frozensets of their items
+def freeze(value):
+    """(value) -> hashable value"""
+    if isinstance(value, dict):
+        return frozenset((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value).__name__, repr(value))
+    return value
+
+
+# ## Graph version stamps
+#
+# We remember for every hypothgraph its version signature together with a
+# stamp. The stamp stays the same as long as the signature does not change, and
+# a new stamp is drawn otherwise. Stamps are never reused, not even by another
+# hypothgraph, hence a stamp identifies one state of one hypothgraph. Compiled
+# hypothgraphs never change and keep their first stamp, versioned hypothgraphs
+# (see `hypothgraph.HypothGraph`) use their version counters as signature, and
+# overlays the stamp of their base with their own counter. Plain networkx
+# digraphs do not tell when they were modified and have no stamp
+_stamps = weakref.WeakKeyDictionary()
+_next_stamp = it.count()
+
+
+def graph_stamp(hypothgraph):
+    """
+    (hypothgraph) -> int | None
+
+    The stamp changes whenever the hypothgraph changes, `None` if the
+    hypothgraph is not versioned
+
+    """
+    signature = version_signature(hypothgraph)
+    if signature is None:
+        return None
+
+    cached = _stamps.get(hypothgraph)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    stamp = next(_next_stamp)
+    _stamps[hypothgraph] = (signature, stamp)
+
+    return stamp
+
+
+def version_signature(hypothgraph):
+    """(hypothgraph) -> hashable version | None if not versioned"""
+    if isinstance(hypothgraph, CompiledHypothgraph):
+        return 0
+    if isinstance(hypothgraph, HypothGraph):
+        return hypothgraph.version
+    if isinstance(hypothgraph, EvidenceOverlay):
+        base_stamp = graph_stamp(hypothgraph.base)
+        if base_stamp is None:
+            return None
+        return (base_stamp, hypothgraph.version)
+
+    return None
+
+
 def find_node_name(node_id, g):
     """Go through the attributes and find the node with the given name"""
     return g.node[node_id]["label"]
@@ -38,6 +38,7 @@ import argparse
 from hypotest.setup_hypothgraph import sample_graphs
 from hypotest.graph_generation import sub_hypothgraph, hypoth_conf
 from hypotest.io import write_dot
+from hypotest.utils import result_store
 
 # Prepare a sample big and small graphs
 def sample_big_and_small(ratio_endpoints_paths=0.5, ratio_on_boundary_paths=0.5):
@@ -69,9 +70,14 @@ def main():
     parser.add_argument('--output-superimposed', default=def_output_superimposed)
     parser.add_argument('--output-small', default=def_output_small)
     parser.add_argument('--output-big', default=def_output_big)
+    parser.add_argument('--result-store', default=None,
+                        help='SQLite file to keep confidences between runs')
 
     args = parser.parse_args()
 
+    if args.result_store:
+        result_store.use_result_store(args.result_store)
+
     # get a sample hypothgraph
     big, small, source, target = sample_big_and_small(
                     ratio_endpoints_paths=float(args.ratio_endpoints),
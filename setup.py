@@ -27,6 +27,7 @@ setup(name='hypotest-conf-propagation',
       url='plumdeq.xyz',
       install_requires=[
           'networkx',
+          'numpy',
           'pandas'
       ]
       )
@@ -65,3 +65,13 @@ def test_generate_max_endpoints(get_digraph_with_cycle):
         nb_paths_i = len(list(nx.all_simple_paths(hypothgraph, u, v)))
         if max_nb_paths < nb_paths_i:
             assert False
+
+
+# Without arcs between different nodes there are no endpoints
+def test_generate_max_endpoints_no_path():
+    digraph = nx.DiGraph()
+    digraph.add_nodes_from(range(3))
+    digraph.add_edge(1, 1)
+
+    with pytest.raises(nx.NetworkXNoPath):
+        hypoth_conf.generate_max_endpoints(digraph)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Shared fixtures of the confidence tests
+#
+# The sample hypothgraph is a path with two shortcuts, with and without a
+# cycle. The scratch checks compare incremental results with the computation
+# from scratch
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import path_counting
+from hypotest.inference import node_contribution
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+import pytest
+
+
+# ## Sample hypothgraph
+@pytest.fixture(params=['acyclic', 'cyclic'])
+def get_sample_digraph(request):
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4)
+    digraph.add_edge(2, 6)
+    if request.param == 'cyclic':
+        digraph.add_cycle([3, 4, 5])
+
+    return digraph
+
+
+@pytest.fixture
+def get_sample_hypothgraph(get_sample_digraph):
+    return convert_to_hypothgraph.convert_to_hypothgraph(get_sample_digraph)
+
+
+# ## Scratch checks
+@pytest.fixture
+def assert_session_as_scratch():
+    def check(session, measure):
+        hypothgraph = session.hypothgraph
+        conf = session.hypoth_conf()
+
+        assert set(conf.evidenced_nodes) == session.evidenced
+        assert session.confidence == pytest.approx(
+            compute_confidence.confidence(hypothgraph, conf,
+                                          func_importance=measure))
+        assert session.max_confidence == pytest.approx(
+            compute_confidence.max_confidence(hypothgraph, conf.source,
+                                              conf.target,
+                                              func_importance=measure))
+        assert session.normalized_confidence() == pytest.approx(
+            compute_confidence.normalized_confidence(hypothgraph, conf,
+                                                     func_importance=measure))
+
+        ranking = session.most_informative_missing_node()
+        expected = node_contribution.most_informative_missing_node(
+            hypothgraph, conf, fn_importance=measure)
+        assert [node for node, _ in ranking] == [node for node, _ in expected]
+        assert [gain for _, gain in ranking] == \
+            pytest.approx([gain for _, gain in expected])
+
+    return check
+
+
+@pytest.fixture
+def assert_counts_as_scratch():
+    def check(dynamic):
+        counts = path_counting.all_pairs_path_counts(dynamic.hypothgraph)
+        assert dict((u, node_counts)
+                    for u, node_counts in dynamic.counts.items()
+                    if node_counts) == \
+            dict((u, node_counts) for u, node_counts in counts.items()
+                 if node_counts)
+
+    return check
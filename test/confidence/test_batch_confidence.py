@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import itertools as it
+
+import numpy as np
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing batched confidence
+#
+# Confidences for many evidence configurations computed at once should be the
+# same as the confidences computed one configuration at a time
+from hypotest.confidence import compute_confidence, batch_confidence
+from hypotest.graph_generation import hypoth_conf, boundary
+from hypotest.stats import confidences
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture
+def get_hypothgraph(get_sample_hypothgraph):
+    return get_sample_hypothgraph, 1, 7
+
+
+def test_batch_same_as_confidence(get_hypothgraph):
+    hypothgraph, source, target = get_hypothgraph
+    nodes = hypothgraph.nodes()
+
+    evidence_matrix = np.random.RandomState(0).rand(20, len(nodes)) < 0.4
+    batched = batch_confidence.batch_confidence(
+            hypothgraph, source, target, evidence_matrix)
+    normalized = batch_confidence.batch_confidence(
+            hypothgraph, source, target, evidence_matrix, normalized=True)
+
+    for row, batch_conf, batch_norm in zip(evidence_matrix, batched, normalized):
+        evidenced_nodes = [node for node, evidenced in zip(nodes, row)
+                           if evidenced]
+        conf = Hypoth_Conf(source, target, evidenced_nodes)
+
+        assert batch_conf == compute_confidence.confidence(hypothgraph, conf)
+        assert batch_norm == pytest.approx(
+                compute_confidence.normalized_confidence(hypothgraph, conf))
+
+    with pytest.raises(ValueError):
+        batch_confidence.batch_confidence(
+                hypothgraph, source, target, evidence_matrix[:, 1:])
+
+
+def test_confidences_possibilities(get_hypothgraph):
+    hypothgraph, source, target = get_hypothgraph
+    interior = list(boundary.in_boundary_interior(hypothgraph, source, target))
+
+    for number_of_evidenced in range(len(interior) + 1):
+        for normalized in (False, True):
+            func_confidence = compute_confidence.confidence
+            if normalized:
+                func_confidence = compute_confidence.normalized_confidence
+
+            expected = [0.0] if number_of_evidenced == 0 else [
+                func_confidence(hypothgraph,
+                                Hypoth_Conf(source, target, evidenced_nodes))
+                for evidenced_nodes in it.combinations(interior,
+                                                       number_of_evidenced)
+            ]
+
+            possibilities = confidences.confidences_possibilities(
+                    hypothgraph, source, target, number_of_evidenced,
+                    normalized=normalized)
+
+            assert possibilities == pytest.approx(expected)
+
+
+def test_batch_no_path(get_hypothgraph):
+    hypothgraph, source, _ = get_hypothgraph
+    hypothgraph.add_node('isolated')
+    evidence_matrix = np.ones((3, len(hypothgraph)), dtype=bool)
+
+    batched = batch_confidence.batch_confidence(
+            hypothgraph, source, 'isolated', evidence_matrix)
+    assert batched.tolist() == [compute_confidence.MIN_CONFIDENCE] * 3
+
+    conf = Hypoth_Conf(source, 'isolated', [source])
+    assert compute_confidence.confidence_report(hypothgraph, conf) is None
+    assert compute_confidence.normalized_confidence(hypothgraph, conf) == \
+        compute_confidence.MIN_CONFIDENCE
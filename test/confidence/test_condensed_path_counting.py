@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import itertools as it
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing path counting on graphs with cycles
+#
+# The region between the causal endpoints is condensed into strongly connected
+# components, the number of paths via every node should be the same as if we
+# enumerated all the simple paths
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf, path_counting, boundary
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+# Cycles among the nodes of a path graph, and a complete graph with a tail
+def cyclic_digraphs():
+    digraph = nx.path_graph(11, create_using=nx.DiGraph())
+    digraph.add_cycle([2, 3, 4])
+    digraph.add_cycle([6, 7, 8])
+    yield digraph
+
+    digraph = nx.complete_graph(5, create_using=nx.DiGraph())
+    digraph.add_path(range(4, 10))
+    digraph.add_edge(7, 5)
+    yield digraph
+
+    for seed in range(3):
+        yield nx.gnp_random_graph(9, 0.3, seed=seed, directed=True)
+
+
+@pytest.fixture(params=list(cyclic_digraphs()))
+def get_cyclic_hypothgraph(request):
+    return convert_to_hypothgraph.convert_to_hypothgraph(request.param.copy())
+
+
+def enumerated_paths_through(hypothgraph, source, target):
+    nb_paths_through = dict.fromkeys(hypothgraph.nodes(), 0)
+    for path in nx.all_simple_paths(hypothgraph, source, target):
+        for node in path:
+            nb_paths_through[node] += 1
+
+    return nb_paths_through
+
+
+def test_condensed_count_simple_paths(get_cyclic_hypothgraph):
+    hypothgraph = get_cyclic_hypothgraph
+
+    for source, target in it.permutations(hypothgraph.nodes(), 2):
+        expected = enumerated_paths_through(hypothgraph, source, target)
+        counted = path_counting.condensed_paths_through(
+                hypothgraph, source, target)
+
+        for node in hypothgraph.nodes_iter():
+            assert counted.get(node, 0) == expected[node]
+
+
+def test_condensed_confidence(get_cyclic_hypothgraph):
+    hypothgraph = get_cyclic_hypothgraph
+    nodes = hypothgraph.nodes()
+    evidenced_nodes = nodes[::2]
+
+    for source, target in it.permutations(nodes, 2):
+        if not nx.has_path(hypothgraph, source, target):
+            continue
+
+        counted = compute_confidence.sum_weighted_paths(
+                hypothgraph, source, target, evidenced_nodes)
+        enumerated = compute_confidence.enumerate_weighted_paths(
+                hypothgraph, source, target, evidenced_nodes)
+        assert counted == enumerated
+
+        counted = compute_confidence.sum_weighted_paths(
+                hypothgraph, source, target)
+        enumerated = compute_confidence.enumerate_weighted_paths(
+                hypothgraph, source, target)
+        assert counted == enumerated
+
+
+# Nodes on the simple paths are found without enumerating the paths, also when
+# a node of the region can only be reached via the node it leads to
+def test_condensed_interior(get_cyclic_hypothgraph):
+    hypothgraph = get_cyclic_hypothgraph
+
+    for source, target in it.permutations(hypothgraph.nodes(), 2):
+        expected = set(node for path in
+                       nx.all_simple_paths(hypothgraph, source, target)
+                       for node in path)
+
+        assert path_counting.st_interior(hypothgraph, source, target) == \
+            expected
+
+
+def test_interior_detour():
+    digraph = nx.DiGraph([('s', 'c'), ('c', 'd'), ('d', 'c'), ('c', 't')])
+    hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+    assert path_counting.st_region(hypothgraph, 's', 't') == \
+        set(['s', 'c', 'd', 't'])
+    assert boundary.in_boundary_interior(hypothgraph, 's', 't') == \
+        set(['s', 'c', 't'])
+    assert list(boundary.on_boundary(hypothgraph, 's', 't')) == ['d']
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing confidence reports
+#
+# The fused evaluation should give the same confidence, max confidence and
+# normalized confidence as the separate functions, and its per path breakdown
+# should add up to them
+from hypotest.confidence import compute_confidence, importance_kernel
+from hypotest.graph_generation import hypoth_conf
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture(params=['acyclic', 'cyclic', 'loop'])
+def get_hypothgraph(request):
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4)
+    digraph.add_edge(2, 6)
+    source, target = 1, 7
+    if request.param != 'acyclic':
+        digraph.add_cycle([3, 4, 5])
+    if request.param == 'loop':
+        source = target = 4
+
+    hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+    return hypothgraph, source, target
+
+
+def test_report_same_as_separate(get_hypothgraph):
+    hypothgraph, source, target = get_hypothgraph
+    measure = importance_kernel.attribute_importance('importance_weight')
+
+    for evidenced_nodes in ([], [3], [2, 4, 6], hypothgraph.nodes()):
+        conf = Hypoth_Conf(source, target, evidenced_nodes)
+        report = compute_confidence.confidence_report(
+                hypothgraph, conf, func_importance=measure, paths=True)
+
+        assert report.confidence == pytest.approx(
+            compute_confidence.confidence(hypothgraph, conf,
+                                          func_importance=measure))
+        assert report.max_confidence == pytest.approx(
+            compute_confidence.max_confidence(hypothgraph, source, target,
+                                              func_importance=measure))
+        assert report.normalized == pytest.approx(
+            compute_confidence.normalized_confidence(
+                hypothgraph, conf, func_importance=measure))
+
+        # breakdown per path
+        paths = list(nx.all_simple_paths(hypothgraph, source, target))
+        assert sorted(path.path for path in report.paths) == \
+            sorted(tuple(path) for path in paths)
+        assert sum(path.confidence for path in report.paths) == \
+            pytest.approx(report.confidence)
+        assert sum(path.max_confidence for path in report.paths) == \
+            pytest.approx(report.max_confidence)
+
+    assert compute_confidence.confidence_report(
+        hypothgraph, Hypoth_Conf(source, target, [])).paths is None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing confidence sessions
+#
+# After every toggle of the evidence and every edit of the hypothgraph the
+# session should give the same confidences and ranking of the missing nodes as
+# the computation from scratch
+from hypotest.confidence import importance_kernel
+from hypotest.confidence.confidence_session import ConfidenceSession
+from hypotest.graph_generation.dynamic_path_counting import DynamicPathCounts
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+# ## Fixtures
+import pytest
+
+
+# the sample hypothgraph with a component of its own
+@pytest.fixture
+def get_hypothgraph(get_sample_digraph):
+    digraph = get_sample_digraph
+    digraph.add_edge(9, 10)
+
+    return convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+
+def test_toggle_evidence(get_hypothgraph, assert_session_as_scratch):
+    hypothgraph = get_hypothgraph
+    measure = importance_kernel.attribute_importance('importance_weight')
+    session = ConfidenceSession(hypothgraph, 1, 7, evidenced_nodes=[3],
+                                func_importance=measure)
+    assert_session_as_scratch(session, measure)
+
+    for node in [4, 6, 10, 3, 4, 1, 6, 2]:
+        session.toggle_evidence(node)
+        assert_session_as_scratch(session, measure)
+
+    assert session.most_informative_missing_node(top_k=2) == \
+        session.most_informative_missing_node()[:2]
+
+    with pytest.raises(KeyError):
+        session.assert_evidence('missing')
+
+
+def test_structural_edits(get_hypothgraph, assert_session_as_scratch):
+    hypothgraph = get_hypothgraph
+    measure = importance_kernel.attribute_importance('importance_weight')
+    session = ConfidenceSession(hypothgraph, 1, 7, evidenced_nodes=[2, 5],
+                                func_importance=measure)
+
+    # arcs off the paths between the endpoints, nothing to recount
+    counts = session.counts
+    session.add_edge(10, 'a', importance_weight=1.0)
+    session.add_edge(7, 8)
+    assert session.counts is counts
+    assert_session_as_scratch(session, measure)
+
+    # arcs and nodes on the paths
+    edits = [
+        lambda: session.add_edge(1, 9),
+        lambda: session.add_edge(10, 7),
+        lambda: session.remove_edge(2, 6),
+        lambda: session.add_node('b', importance_weight=0.5),
+        lambda: session.add_edge(2, 'b'),
+        lambda: session.add_edge('b', 6),
+        lambda: session.remove_node(5),
+        lambda: session.toggle_evidence('b'),
+    ]
+    for edit in edits:
+        edit()
+        assert_session_as_scratch(session, measure)
+
+    hypothgraph.node[4]['importance_weight'] += 1
+    session.update_importance(4)
+    assert_session_as_scratch(session, measure)
+
+    # no more paths
+    session.remove_edge(6, 7)
+    session.remove_edge(10, 7)
+    assert session.max_confidence == pytest.approx(0)
+    assert session.normalized_confidence() == 0
+
+    with pytest.raises(ValueError):
+        session.remove_node(1)
+
+
+def test_dynamic_path_counts(get_hypothgraph, assert_session_as_scratch):
+    hypothgraph = get_hypothgraph
+    if not nx.is_directed_acyclic_graph(hypothgraph):
+        pytest.skip("dynamic path counts need an acyclic hypothgraph")
+
+    measure = importance_kernel.attribute_importance('importance_weight')
+    session = ConfidenceSession(hypothgraph, 1, 7, evidenced_nodes=[2, 5],
+                                func_importance=measure,
+                                path_counts=DynamicPathCounts(hypothgraph))
+    assert_session_as_scratch(session, measure)
+
+    edits = [
+        lambda: session.add_edge(1, 9),
+        lambda: session.add_edge(10, 7),
+        lambda: session.remove_edge(2, 6),
+        lambda: session.remove_node(5),
+    ]
+    for edit in edits:
+        edit()
+        assert_session_as_scratch(session, measure)
+
+    with pytest.raises(nx.NetworkXUnfeasible):
+        session.add_edge(7, 1)
+    assert not hypothgraph.has_edge(7, 1)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import itertools as it
+from collections import Counter
+from fractions import Fraction
+
+import networkx as nx
+import numpy as np
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing the analytic confidence spectrum
+#
+# Means and distributions of the confidences per number of evidenced nodes
+# should be the same as those of the enumerated spectrum
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+from hypotest.stats import confidences
+
+# ## Fixtures
+import pytest
+
+
+@pytest.fixture(params=['acyclic', 'cyclic'])
+def get_hypothgraph(request):
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4)
+    digraph.add_edge(2, 6)
+    if request.param == 'cyclic':
+        digraph.add_cycle([3, 4, 5])
+
+    hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+    return hypothgraph, 1, 7
+
+
+def real_importance(hypothgraph, node):
+    return 0.5 + node / 7.0
+
+
+@pytest.mark.parametrize('func_importance', [
+    confidences.def_func_import, real_importance])
+@pytest.mark.parametrize('normalized', [False, True])
+def test_analytic_same_as_enumerated(get_hypothgraph, func_importance,
+                                     normalized):
+    hypothgraph, source, target = get_hypothgraph
+
+    enumerated = confidences.confidence_spectrum(
+            hypothgraph, source, target, normalized=normalized,
+            func_importance=func_importance)
+    analytic = confidences.confidence_spectrum(
+            hypothgraph, source, target, normalized=normalized,
+            func_importance=func_importance, method='analytic')
+
+    assert len(analytic) == len(enumerated)
+    for level, possibilities in zip(analytic, enumerated):
+        values = [value
+                  for value, count in zip(level.values, level.counts)
+                  for _ in range(count)]
+
+        assert level.mean == pytest.approx(
+                sum(possibilities) / len(possibilities))
+        assert values == pytest.approx(sorted(possibilities))
+
+
+def test_analytic_histogram(get_hypothgraph):
+    hypothgraph, source, target = get_hypothgraph
+
+    exact = confidences.confidence_spectrum(
+            hypothgraph, source, target, method='analytic')
+    histogram = confidences.confidence_spectrum(
+            hypothgraph, source, target, method='analytic', bins=4)
+    nb_interior = len(exact) - 1
+
+    for exact_level, level in zip(exact, histogram):
+        assert level.mean == exact_level.mean
+        assert sum(level.counts) == len(list(
+            it.combinations(range(nb_interior), level.number_of_evidenced)))
+        assert level.values == sorted(level.values)
+
+    with pytest.raises(ValueError):
+        confidences.confidence_spectrum(hypothgraph, source, target,
+                                        method='unknown')
+
+
+# Sums which are equal in exact arithmetic are one value of the spectrum,
+# whatever the order in which the contributions were added
+def test_analytic_exact_sums(get_hypothgraph, monkeypatch):
+    hypothgraph, source, target = get_hypothgraph
+    contributions = [0.1, 0.2, 0.3, 0.1, 0.2, 0.3]
+    monkeypatch.setattr(
+        confidences, 'interior_contributions',
+        lambda *args, **kwargs: (np.array(contributions), 1.0))
+
+    spectrum = confidences.analytic_confidence_spectrum(hypothgraph, source,
+                                                        target)
+    for level in spectrum:
+        sums = Counter(sum(Fraction(value) for value in combination)
+                       for combination in it.combinations(
+                           contributions, level.number_of_evidenced))
+        assert level.counts == [sums[key] for key in sorted(sums)]
+        assert level.values == [float(key) for key in sorted(sums)]
+
+
+# Sampled spectrum is reproducible, and close to the analytic one
+def test_sampled_spectrum(get_hypothgraph):
+    hypothgraph, source, target = get_hypothgraph
+
+    analytic = confidences.confidence_spectrum(
+            hypothgraph, source, target, normalized=True, method='analytic')
+    sampled = confidences.confidence_spectrum(
+            hypothgraph, source, target, normalized=True, method='sampled',
+            tolerance=1e-3, seed=0)
+
+    assert sampled == confidences.confidence_spectrum(
+            hypothgraph, source, target, normalized=True, method='sampled',
+            tolerance=1e-3, seed=0)
+
+    for exact_level, level in zip(analytic, sampled):
+        assert level.number_of_evidenced == exact_level.number_of_evidenced
+        assert level.std_error < 1e-3
+        assert abs(level.mean - exact_level.mean) < 5 * 1e-3
+        assert exact_level.values[0] <= level.quantiles[0] <= \
+            level.quantiles[-1] <= exact_level.values[-1]
+
+    # bounded number of samples
+    bounded = confidences.confidence_spectrum(
+            hypothgraph, source, target, normalized=True, method='sampled',
+            tolerance=1e-9, seed=0, batch_size=10, max_samples=30)
+    assert all(level.nb_samples == 30 for level in bounded[1:-1])
+
+
+# Every sampled combination has exactly `k` different nodes
+def test_sample_confidences():
+    contributions = 2.0 ** np.arange(10)
+    random_state = np.random.RandomState(0)
+
+    for number_of_evidenced in range(11):
+        sampled = confidences.sample_confidences(
+                contributions, number_of_evidenced, 50, random_state)
+        assert [bin(int(confidence)).count('1') for confidence in sampled] == \
+            [number_of_evidenced] * 50
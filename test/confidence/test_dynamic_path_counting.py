@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import random
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing dynamic path counting
+#
+# After every arc inserted or removed the maintained counts should be the same
+# as counting all the paths again, and arcs creating cycles are rejected
+from hypotest.graph_generation import path_counting
+from hypotest.graph_generation.dynamic_path_counting import DynamicPathCounts
+
+# ## Fixtures
+import pytest
+
+
+# Random acyclic graph, arcs go from smaller to bigger nodes
+@pytest.fixture
+def get_random_dag():
+    rand = random.Random(7)
+    digraph = nx.DiGraph()
+    digraph.add_nodes_from(range(20))
+    for u in range(20):
+        for v in range(u + 1, 20):
+            if rand.random() < 0.2:
+                digraph.add_edge(u, v)
+
+    return digraph, rand
+
+
+def test_random_edits(get_random_dag, assert_counts_as_scratch):
+    digraph, rand = get_random_dag
+    dynamic = DynamicPathCounts(digraph)
+    assert_counts_as_scratch(dynamic)
+
+    for _ in range(30):
+        u, v = sorted(rand.sample(range(20), 2))
+        if digraph.has_edge(u, v):
+            dynamic.remove_edge(u, v)
+        else:
+            dynamic.add_edge(u, v)
+        assert_counts_as_scratch(dynamic)
+
+        assert dynamic.paths_through(0, 19) == \
+            path_counting.paths_through(digraph, 0, 19)
+
+    dynamic.remove_node(10)
+    assert_counts_as_scratch(dynamic)
+    dynamic.add_edge('new', 0)
+    assert_counts_as_scratch(dynamic)
+
+
+def test_cycles_rejected():
+    digraph = nx.DiGraph([(0, 1), (1, 2), (0, 2)])
+    dynamic = DynamicPathCounts(digraph)
+
+    assert dynamic.nb_paths(0, 2) == 2
+    assert dynamic.creates_cycle(2, 0)
+    assert dynamic.creates_cycle(1, 1)
+    assert not dynamic.creates_cycle(0, 3)
+
+    with pytest.raises(nx.NetworkXUnfeasible):
+        dynamic.add_edge(2, 0)
+    assert not digraph.has_edge(2, 0)
+    assert dynamic.nb_paths(0, 2) == 2
+
+    digraph.add_edge(2, 0)
+    with pytest.raises(nx.NetworkXUnfeasible):
+        DynamicPathCounts(digraph)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing evidence overlays
+#
+# Overlays should be usable as hypothgraphs, see their own evidence and
+# endpoints, and never change the base hypothgraph
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf, boundary
+from hypotest.inference import generalization
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+from hypotest.setup_hypothgraph.evidence_overlay import EvidenceOverlay
+from hypotest.stats import utils as stats_utils
+from hypotest.stats import generalization_stats
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture
+def get_hypothgraph():
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4)
+    digraph.add_edge(2, 6)
+    for node, data in digraph.nodes_iter(data=True):
+        data['evidenced'] = -1
+        data['label'] = str(node)
+
+    return convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+
+def evidenced_importance(hypothgraph, node):
+    return 1 if hypothgraph.node[node].get('evidenced') == 1 else 0
+
+
+def test_overlay_attributes(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    base_data = hypothgraph.nodes(data=True)
+
+    overlay = EvidenceOverlay(hypothgraph, evidenced_nodes=[3],
+                              endpoints=(0, 8))
+    overlay.node[4]['evidenced'] = 1
+    overlay.node[5]['color'] = 'red'
+    del overlay.node[5]['color']
+
+    assert hypothgraph.nodes(data=True) == base_data
+    assert sorted(overlay.changes) == [0, 3, 4, 5, 8]
+    assert overlay.evidenced_nodes() == [3, 4]
+    assert overlay.endpoints() == (0, 8)
+    assert 'color' not in overlay.node[5]
+    assert overlay.node[3]['label'] == '3'
+
+    # stacked overlays, and back to a digraph
+    stacked = EvidenceOverlay(overlay, endpoints=(1, 7))
+    stacked.unassert_evidence(3)
+    assert stacked.endpoints() == (1, 7)
+    assert stacked.evidenced_nodes() == [4]
+    assert overlay.endpoints() == (0, 8)
+
+    digraph = stacked.copy()
+    assert hypoth_conf.get_boundary_nodes(digraph) == (1, 7)
+    assert digraph.edges() == hypothgraph.edges()
+    assert hypothgraph.nodes(data=True) == base_data
+
+    with pytest.raises(KeyError):
+        overlay.assert_evidence('missing')
+
+
+def test_overlay_as_hypothgraph(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    conf = Hypoth_Conf(0, 8, [4, 6])
+    overlay = EvidenceOverlay(hypothgraph)
+
+    assert boundary.in_boundary_interior(overlay, 0, 8) == \
+        boundary.in_boundary_interior(hypothgraph, 0, 8)
+
+    def confidence(graph):
+        return compute_confidence.confidence(
+            graph, conf, func_importance=evidenced_importance)
+
+    assert confidence(overlay) == confidence(hypothgraph) == 0
+
+    # cached confidences follow the writes of the overlay
+    overlay.assert_evidence(4)
+    assert confidence(overlay) > 0
+    assert confidence(hypothgraph) == 0
+    overlay.unassert_evidence(4)
+    assert confidence(overlay) == 0
+
+
+def test_prepare_hypothesis_graph(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    base_data = hypothgraph.nodes(data=True)
+
+    prepared = stats_utils.preapre_hypothesis_graph(
+            hypothgraph, endpoints=(8, 0), evidenced_nodes=[2, 5])
+    assert stats_utils.extract_hypoth_conf(prepared) == \
+        Hypoth_Conf(0, 8, [2, 5])
+    assert hypothgraph.nodes(data=True) == base_data
+
+    with pytest.raises(ValueError):
+        stats_utils.extract_hypoth_conf(hypothgraph)
+
+
+def test_generalization_stats(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    base_data = hypothgraph.nodes(data=True)
+
+    stats = generalization_stats.generalization_stats(
+            hypothgraph, endpoints=(2, 6), evidenced_nodes=[3])
+    assert sorted(stats) == [0, 1, 2, 4, 5, 6, 7, 8]
+    assert stats[4] == generalization.generalization_data_for_plot(
+            hypothgraph, Hypoth_Conf(2, 6, [3, 4]))
+
+    evidenced = generalization_stats.generalization_different_evidenced_nodes(
+            hypothgraph, (2, 6), [[3], [3, 4]], ['one', 'two'])
+    assert evidenced['two'] == stats[4]
+    assert hypothgraph.nodes(data=True) == base_data
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing the generalization
+#
+# Confidences and distances of the farther endpoints obtained in one sweep
+# should be the same as if computed for each new pair of endpoints
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf
+from hypotest.inference import generalization
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture(params=['acyclic', 'cyclic'])
+def get_hypothgraph(request):
+    digraph = nx.path_graph(12, create_using=nx.DiGraph())
+    digraph.add_edges_from([(0, 2), (1, 4), (2, 6), (3, 5), (5, 8), (7, 10)])
+    if request.param == 'cyclic':
+        digraph.add_cycle([1, 2, 3])
+        digraph.add_cycle([8, 9, 10])
+
+    hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+    return hypothgraph, Hypoth_Conf(4, 7, [0, 2, 5, 6, 9, 11])
+
+
+def betweenness_importance(hypothgraph, node):
+    return hypothgraph.node[node]['importance_weight']
+
+
+@pytest.mark.parametrize('direction', ['backwards', 'forward'])
+def test_generalize_directional(get_hypothgraph, direction):
+    hypothgraph, conf = get_hypothgraph
+    current_confidence = compute_confidence.confidence(
+            hypothgraph, conf, func_importance=betweenness_importance)
+    current_distance = nx.shortest_path_length(hypothgraph, 4, 7)
+
+    generalized = generalization.generalize_directional(
+            hypothgraph, conf, direction=direction,
+            fn_importance=betweenness_importance)
+
+    if direction == 'backwards':
+        farther_nodes = nx.ancestors(hypothgraph.copy(), 4)
+        expected_endpoints = set((node, 7) for node in farther_nodes)
+    else:
+        farther_nodes = nx.descendants(hypothgraph, 7)
+        expected_endpoints = set((4, node) for node in farther_nodes)
+    assert set(generalized) == expected_endpoints
+
+    for (source, target), path in generalized.items():
+        new_conf = Hypoth_Conf(source, target, conf.evidenced_nodes)
+        confidence = compute_confidence.confidence(
+                hypothgraph, new_conf, func_importance=betweenness_importance)
+        distance = nx.shortest_path_length(hypothgraph, source, target)
+
+        assert path.confidence == pytest.approx(confidence)
+        assert path.conf_delta == pytest.approx(confidence - current_confidence)
+        assert path.distance == distance
+        dist_delta = distance - current_distance
+        if direction == 'backwards':
+            dist_delta *= -1
+        assert path.dist_delta == dist_delta
+
+
+def test_generalization_data_for_plot(get_hypothgraph):
+    hypothgraph, conf = get_hypothgraph
+
+    data = generalization.generalization_data_for_plot(hypothgraph, conf)
+    nb_farther = len(nx.ancestors(hypothgraph.copy(), 4)) + \
+        len(nx.descendants(hypothgraph, 7))
+
+    assert len(data['confidences']) == nb_farther + 1
+    assert 0 in data['dist_deltas']
+    assert compute_confidence.confidence(hypothgraph, conf) in \
+        data['confidences']
+
+
+# With a cycle through both endpoints the fixed endpoint reaches (or is
+# reached from) the other one, it is not a candidate against itself
+@pytest.mark.parametrize('direction', ['backwards', 'forward'])
+def test_cycle_through_endpoints(direction):
+    digraph = nx.path_graph(10, create_using=nx.DiGraph())
+    digraph.add_edge(7, 4)
+    hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+    conf = Hypoth_Conf(4, 7, [2, 5, 6, 9])
+
+    generalized = generalization.generalize_directional(
+            hypothgraph, conf, direction=direction)
+
+    if direction == 'backwards':
+        farther_nodes = nx.ancestors(hypothgraph, 4) - set([7])
+        expected_endpoints = set((node, 7) for node in farther_nodes)
+    else:
+        farther_nodes = nx.descendants(hypothgraph, 7) - set([4])
+        expected_endpoints = set((4, node) for node in farther_nodes)
+    assert set(generalized) == expected_endpoints
+
+    for (source, target), path in generalized.items():
+        assert source != target
+        assert path.confidence == pytest.approx(compute_confidence.confidence(
+            hypothgraph, Hypoth_Conf(source, target, conf.evidenced_nodes)))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import pickle
+
+import networkx as nx
+import numpy as np
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing importance kernels
+#
+# Paths scored by the kernel should have the same weight as the sum of the
+# per node importances, and the per node callables should be called once
+from hypotest.confidence import compute_confidence, importance_kernel
+from hypotest.graph_generation import hypoth_conf
+from hypotest.setup_hypothgraph.compiled_hypothgraph import compile_hypothgraph
+from hypotest.setup_hypothgraph.hypothgraph import HypothGraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+def test_path_weight(get_sample_hypothgraph):
+    hypothgraph = get_sample_hypothgraph
+    measure = importance_kernel.attribute_importance('importance_weight')
+    kernel = importance_kernel.importance_kernel(hypothgraph, measure)
+    evidenced_nodes = (1, 3, 6, 'missing')
+    mask = kernel.evidence_mask(evidenced_nodes)
+
+    for path in nx.all_simple_paths(hypothgraph, 0, 8):
+        expected = sum(hypothgraph.node[node]['importance_weight']
+                       for node in path if node in evidenced_nodes)
+        assert kernel.path_weight(path, mask) == pytest.approx(expected)
+        assert compute_confidence.weighted_path(
+            hypothgraph, path, evidenced_nodes,
+            func_importance=measure) == pytest.approx(expected)
+        assert compute_confidence.weighted_path(
+            hypothgraph, path, kernel=kernel,
+            mask=mask) == pytest.approx(expected)
+
+    # same importances from the arrays of a compiled hypothgraph
+    compiled = compile_hypothgraph(hypothgraph)
+    compiled_kernel = importance_kernel.importance_kernel(compiled, measure)
+    assert compiled_kernel.weights(compiled_kernel.node_ids(kernel.nodes)) == \
+        pytest.approx(kernel.importance)
+
+
+# kernels are kept only for versioned hypothgraphs
+def test_callable_adapter(get_sample_hypothgraph):
+    hypothgraph = HypothGraph(get_sample_hypothgraph)
+    calls = []
+
+    def importance(hypothgraph, node):
+        calls.append(node)
+        return hypothgraph.node[node]['importance_weight']
+
+    measure = importance_kernel.attribute_importance('importance_weight')
+    for evidenced_nodes in ([1, 3], [1, 3, 6], [6, 7]):
+        conf = Hypoth_Conf(0, 8, evidenced_nodes)
+        assert compute_confidence.confidence(
+            hypothgraph, conf, func_importance=importance) == pytest.approx(
+                compute_confidence.confidence(
+                    hypothgraph, conf, func_importance=measure))
+
+    # every node was asked at most once
+    assert sorted(calls) == sorted(set(calls))
+    assert set(calls) <= set([1, 3, 6, 7])
+
+    # kernels follow the changes of the hypothgraph
+    before = compute_confidence.confidence(
+        hypothgraph, Hypoth_Conf(0, 8, [6]), func_importance=importance)
+    hypothgraph.node[6]['importance_weight'] += 1
+    assert compute_confidence.confidence(
+        hypothgraph, Hypoth_Conf(0, 8, [6]),
+        func_importance=importance) > before
+
+
+def test_measure_as_callable(get_sample_hypothgraph):
+    hypothgraph = get_sample_hypothgraph
+    measure = importance_kernel.attribute_importance('missing', default=2.0)
+
+    assert measure(hypothgraph, 3) == 2.0
+    assert compute_confidence.default_node_importance_measure(
+        hypothgraph, 3) == 1.0
+    assert repr(measure) == "ImportanceMeasure(attribute_importance(" \
+        "'missing', 2.0))"
+
+    kernel = importance_kernel.importance_kernel(hypothgraph)
+    counts = {1: 2, 3: 5, 6: 1}
+    mask = kernel.evidence_mask([3, 6])
+    assert kernel.weighted_sum(counts) == 8.0
+    assert kernel.weighted_sum(counts, mask) == 6.0
+    assert np.array_equal(kernel.contributions([6, 0, 3], counts),
+                          [1.0, 0.0, 5.0])
+
+
+# Workers of other processes load the measures by reference
+def test_measure_pickles(get_sample_hypothgraph):
+    hypothgraph = get_sample_hypothgraph
+    nodes = hypothgraph.nodes()
+
+    for measure in (compute_confidence.default_node_importance_measure,
+                    importance_kernel.attribute_importance('importance_weight',
+                                                           default=2.0)):
+        loaded = pickle.loads(pickle.dumps(measure))
+        assert repr(loaded) == repr(measure)
+        assert np.array_equal(loaded.vector(hypothgraph, nodes),
+                              measure.vector(hypothgraph, nodes))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing memoization
+#
+# Memoized graph functions should return the same values as without the cache,
+# also after the hypothgraph was modified, and the caches should stay bounded
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf, boundary
+from hypotest.setup_hypothgraph import convert_to_hypothgraph, \
+    compiled_hypothgraph
+from hypotest.setup_hypothgraph.hypothgraph import HypothGraph
+from hypotest.utils import utils
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture
+def get_hypothgraph():
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4)
+    digraph.add_edge(2, 6)
+
+    return HypothGraph(convert_to_hypothgraph.convert_to_hypothgraph(digraph))
+
+
+def weight_importance(hypothgraph, node):
+    return hypothgraph.node[node].get('weight', 1)
+
+
+def test_memo_bounded():
+    calls = []
+
+    @utils.memo(maxsize=2)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(x) for x in (1, 2, 1, 3, 2)] == [1, 4, 1, 9, 4]
+    # 2 was evicted by 3, the least recently used after 1 was asked again
+    assert calls == [1, 2, 3, 2]
+    assert square.cache_info() == utils.CacheInfo(1, 4, 2, 2)
+
+    square.cache_clear()
+    assert square.cache_info() == utils.CacheInfo(0, 0, 2, 0)
+
+
+def test_graph_stamp(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    stamp = utils.graph_stamp(hypothgraph)
+    assert utils.graph_stamp(hypothgraph) == stamp
+
+    # a copy is another hypothgraph
+    assert utils.graph_stamp(hypothgraph.copy()) != stamp
+
+    hypothgraph.node[3]['weight'] = 5
+    attribute_stamp = utils.graph_stamp(hypothgraph)
+    assert attribute_stamp != stamp
+
+    hypothgraph.add_edge(0, 8)
+    assert utils.graph_stamp(hypothgraph) != attribute_stamp
+
+    compiled = compiled_hypothgraph.compile_hypothgraph(hypothgraph)
+    assert utils.graph_stamp(compiled) == utils.graph_stamp(compiled)
+
+    # plain digraphs are not versioned
+    assert utils.graph_stamp(nx.DiGraph(hypothgraph)) is None
+
+
+def test_confidence_cache_invalidated(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    conf = Hypoth_Conf(0, 8, [1, 3, 6])
+    confidence = compute_confidence.confidence
+    uncached = confidence.__wrapped__
+
+    def check():
+        expected = uncached(hypothgraph, conf,
+                            func_importance=weight_importance)
+        assert confidence(hypothgraph, conf,
+                          func_importance=weight_importance) == expected
+        return expected
+
+    confidence.cache_clear()
+    before = check()
+    check()
+    assert confidence.cache_info().hits == 1
+
+    # attributes changed
+    hypothgraph.node[3]['weight'] = 5
+    assert check() != before
+
+    # arcs changed
+    hypothgraph.add_edge(0, 3)
+    hypothgraph.add_edge(3, 8)
+    check()
+
+    assert boundary.in_boundary_interior(hypothgraph, 0, 8) == \
+        boundary.in_boundary_interior.__wrapped__(hypothgraph, 0, 8)
+
+    hypothgraph.remove_edge(7, 8)
+    hypothgraph.remove_edge(3, 8)
+    with pytest.raises(Exception):
+        hypoth_conf.sort_hypoth_conf_endpoints(hypothgraph, 0, 8)
+
+
+def test_mutable_arguments(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    evidenced_nodes = [1]
+    conf = Hypoth_Conf(0, 8, evidenced_nodes)
+
+    first = compute_confidence.confidence(hypothgraph, conf)
+    evidenced_nodes.append(6)
+    assert compute_confidence.confidence(hypothgraph, conf) > first
+
+
+def test_plain_digraph_not_memoized(get_hypothgraph):
+    digraph = nx.DiGraph(get_hypothgraph)
+    conf = Hypoth_Conf(0, 8, [1, 3, 6])
+    confidence = compute_confidence.confidence
+
+    confidence.cache_clear()
+    first = confidence(digraph, conf, func_importance=weight_importance)
+    assert confidence(digraph, conf, func_importance=weight_importance) == \
+        first
+    assert confidence.cache_info() == utils.CacheInfo(
+        0, 0, utils.DEFAULT_MAXSIZE, 0)
+
+    digraph.node[3]['weight'] = 5
+    assert confidence(digraph, conf, func_importance=weight_importance) > \
+        first
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing the most informative missing nodes
+#
+# Gains of all the missing nodes computed in one pass should be the same as the
+# differences in confidence with and without each missing node
+from hypotest.graph_generation import hypoth_conf
+from hypotest.inference import node_contribution
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture
+def get_hypothgraph(get_sample_hypothgraph):
+    return get_sample_hypothgraph, Hypoth_Conf(1, 7, [2, 5])
+
+
+def test_most_informative_missing_node(get_hypothgraph):
+    hypothgraph, conf = get_hypothgraph
+    edges_before = sorted(hypothgraph.edges(data=True))
+    nodes_before = sorted(hypothgraph.nodes(data=True))
+
+    most_informative = node_contribution.most_informative_missing_node(
+            hypothgraph, conf)
+
+    # all the missing nodes, the most informative first
+    assert sorted(node for node, _ in most_informative) == \
+        sorted(node_contribution.find_missing_nodes(hypothgraph, conf))
+    gains = [gain for _, gain in most_informative]
+    assert gains == sorted(gains, reverse=True)
+
+    for node, gain in most_informative:
+        assert gain == node_contribution.difference_importance(
+                hypothgraph, conf, node)
+
+    # top k are the first k nodes of the ranking
+    top_3 = node_contribution.most_informative_missing_node(
+            hypothgraph, conf, top_k=3)
+    assert [gain for _, gain in top_3] == gains[:3]
+
+    # the hypothgraph is left untouched
+    assert sorted(hypothgraph.edges(data=True)) == edges_before
+    assert sorted(hypothgraph.nodes(data=True)) == nodes_before
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import itertools as it
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing the optimal domain
+#
+# Every pair of nodes with a path between them is scored, in one process or in
+# a pool of processes, with the same results
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf
+from hypotest.inference import optimal_domain
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture(params=['acyclic', 'cyclic'])
+def get_hypothgraph(request):
+    digraph = nx.path_graph(10, create_using=nx.DiGraph())
+    digraph.add_edges_from([(0, 2), (1, 4), (2, 6), (3, 5), (5, 8)])
+    if request.param == 'cyclic':
+        digraph.add_cycle([3, 4, 5])
+
+    hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+    return hypothgraph, Hypoth_Conf(1, 8, [2, 4, 6, 7])
+
+
+def test_optimal_domain(get_hypothgraph):
+    hypothgraph, conf = get_hypothgraph
+    current_confidence = compute_confidence.confidence(hypothgraph, conf)
+
+    domains = optimal_domain.optimal_domain(hypothgraph, conf)
+
+    # every pair with a path, sorted by confidence
+    expected_pairs = set()
+    for u, v in it.combinations(hypothgraph.nodes(), 2):
+        try:
+            expected_pairs.add(
+                hypoth_conf.sort_hypoth_conf_endpoints(hypothgraph, u, v))
+        except Exception:
+            pass
+    assert set((d.source, d.target) for d in domains) == expected_pairs
+
+    confidences = [d.confidence for d in domains]
+    assert confidences == sorted(confidences, reverse=True)
+
+    for d in domains:
+        conf_d = Hypoth_Conf(d.source, d.target, conf.evidenced_nodes)
+        assert d.confidence == compute_confidence.confidence(hypothgraph,
+                                                             conf_d)
+        assert d.conf_delta == d.confidence - current_confidence
+        assert d.distance == nx.shortest_path_length(hypothgraph, d.source,
+                                                     d.target)
+
+    # threshold keeps the best domains only
+    best = optimal_domain.optimal_domain(hypothgraph, conf, threshold=5)
+    assert best == [d for d in domains if d.confidence >= 5]
+
+
+def test_parallel_optimal_domain(get_hypothgraph):
+    hypothgraph, conf = get_hypothgraph
+
+    assert optimal_domain.optimal_domain(hypothgraph, conf, nb_workers=2) == \
+        optimal_domain.optimal_domain(hypothgraph, conf)
+
+
+# Pruned search gives the same best domains, and scores less pairs, with
+# cycles we score all the pairs
+def test_pruned_optimal_domain(get_hypothgraph, monkeypatch):
+    hypothgraph, conf = get_hypothgraph
+    domains = optimal_domain.optimal_domain(hypothgraph, conf)
+
+    nb_scored = []
+    domain_stats = optimal_domain.domain_stats
+
+    def counting_domain_stats(*args, **kwargs):
+        nb_scored.append(1)
+        return domain_stats(*args, **kwargs)
+
+    monkeypatch.setattr(optimal_domain, 'domain_stats', counting_domain_stats)
+
+    for top_k in (1, 3, 10):
+        del nb_scored[:]
+        assert optimal_domain.optimal_domain(
+                hypothgraph, conf, top_k=top_k) == domains[:top_k]
+        # only acyclic hypothgraphs are pruned
+        if nx.is_directed_acyclic_graph(hypothgraph):
+            assert len(nb_scored) < len(domains)
+
+    threshold = domains[len(domains) // 2].confidence
+    assert optimal_domain.optimal_domain(hypothgraph, conf,
+                                         threshold=threshold) == \
+        [d for d in domains if d.confidence >= threshold]
+    assert optimal_domain.optimal_domain(hypothgraph, conf, top_k=2,
+                                         threshold=threshold) == \
+        [d for d in domains if d.confidence >= threshold][:2]
+
+
+# Bitsets of descendants unpacked into a matrix, with a number of nodes which
+# is not a multiple of eight
+def test_reachability_matrix():
+    nb_nodes = 13
+    descendants = [(i * 2654435761) % (1 << nb_nodes) for i in range(nb_nodes)]
+    matrix = optimal_domain.reachability_matrix(descendants, nb_nodes)
+
+    assert matrix.shape == (nb_nodes, nb_nodes)
+    for row, bits in zip(matrix, descendants):
+        assert [j for j in range(nb_nodes) if row[j]] == \
+            [j for j in range(nb_nodes) if bits >> j & 1]
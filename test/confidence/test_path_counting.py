@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import random
+import itertools as it
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing confidence by counting paths
+#
+# Whenever the region between the causal endpoints is acyclic, confidence is
+# computed by counting the paths instead of enumerating them. Both ways should
+# give exactly the same numbers
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf, path_counting
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+# Layered graph, every node of one layer causes some nodes of the next layer,
+# the number of paths grows exponentially with the number of layers
+@pytest.fixture
+def get_layered_hypothgraph():
+    rand = random.Random(42)
+    layers = [[(layer, i) for i in range(4)] for layer in range(6)]
+
+    digraph = nx.DiGraph()
+    for layer, next_layer in zip(layers, layers[1:]):
+        for node in layer:
+            for next_node in rand.sample(next_layer, 3):
+                digraph.add_edge(node, next_node)
+
+    source = ('source', 0)
+    target = ('target', 0)
+    digraph.add_edges_from((source, node) for node in layers[0])
+    digraph.add_edges_from((node, target) for node in layers[-1])
+
+    hypothgraph = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+    evidenced_nodes = rand.sample(hypothgraph.nodes(), 10)
+
+    return hypothgraph, Hypoth_Conf(source, target, evidenced_nodes)
+
+
+# importance is the betweenness centrality computed on the graph conversion
+def betweenness_importance(hypothgraph, node):
+    return hypothgraph.node[node]['importance_weight']
+
+
+def test_paths_through_count_simple_paths(get_layered_hypothgraph):
+    hypothgraph, conf = get_layered_hypothgraph
+
+    nb_paths_through = path_counting.acyclic_paths_through(
+            hypothgraph, conf.source, conf.target)
+    simple_paths = list(nx.all_simple_paths(hypothgraph, conf.source, conf.target))
+
+    assert nb_paths_through[conf.source] == len(simple_paths)
+    assert nb_paths_through[conf.target] == len(simple_paths)
+
+    for node in hypothgraph.nodes_iter():
+        nb_paths = sum(1 for path in simple_paths if node in path)
+        assert nb_paths_through.get(node, 0) == nb_paths
+
+
+def test_counting_same_as_enumeration(get_layered_hypothgraph):
+    hypothgraph, conf = get_layered_hypothgraph
+    source, target = conf.source, conf.target
+
+    counted = compute_confidence.sum_weighted_paths(
+            hypothgraph, source, target, conf.evidenced_nodes)
+    enumerated = compute_confidence.enumerate_weighted_paths(
+            hypothgraph, source, target, conf.evidenced_nodes)
+    assert counted == enumerated
+    assert compute_confidence.confidence(hypothgraph, conf) == enumerated
+
+    max_counted = compute_confidence.max_confidence(hypothgraph, source, target)
+    max_enumerated = compute_confidence.enumerate_weighted_paths(
+            hypothgraph, source, target)
+    assert max_counted == max_enumerated
+
+    # custom importance measure with real values
+    counted = compute_confidence.normalized_confidence(
+            hypothgraph, conf, func_importance=betweenness_importance)
+    enumerated = compute_confidence.enumerate_weighted_paths(
+            hypothgraph, source, target, conf.evidenced_nodes,
+            func_importance=betweenness_importance)
+    max_enumerated = compute_confidence.enumerate_weighted_paths(
+            hypothgraph, source, target, func_importance=betweenness_importance)
+    assert counted == pytest.approx(enumerated / max_enumerated)
+
+
+# Cycles in the region between the endpoints cannot be counted, while cycles
+# outside of the region do not matter
+def test_counting_cycles():
+    digraph = nx.path_graph(6, create_using=nx.DiGraph())
+    digraph.add_edge(1, 3)
+    digraph.add_cycle([4, 5])
+
+    assert path_counting.acyclic_paths_through(digraph, 0, 4) == {
+        0: 2, 1: 2, 2: 1, 3: 2, 4: 2
+    }
+    assert path_counting.acyclic_paths_through(digraph, 0, 5) == {
+        0: 2, 1: 2, 2: 1, 3: 2, 4: 2, 5: 2
+    }
+    assert path_counting.acyclic_paths_through(digraph, 4, 0) == {}
+
+    digraph.add_edge(3, 2)
+    assert path_counting.acyclic_paths_through(digraph, 0, 4) is None
+
+
+# Number of paths between all pairs, in both directions
+def test_all_pairs_path_counts(get_layered_hypothgraph):
+    hypothgraph, _ = get_layered_hypothgraph
+    cyclic = hypothgraph.copy()
+    cyclic.add_edge((3, 0), (1, 0))
+
+    for digraph in (hypothgraph, cyclic):
+        counts = path_counting.all_pairs_path_counts(digraph)
+
+        for u, v in it.permutations(digraph.nodes(), 2):
+            nb_paths = len(list(nx.all_simple_paths(digraph, u, v)))
+            assert counts[u].get(v, 0) == nb_paths
+
+    nodes = hypothgraph.nodes()
+    matrix = path_counting.path_count_matrix(hypothgraph, nodes)
+    counts = path_counting.all_pairs_path_counts(hypothgraph)
+    for (i, u), (j, v) in it.product(enumerate(nodes), repeat=2):
+        assert matrix[i, j] == counts[u].get(v, 0)
+
+    # pairs are oriented along the paths, the max pair has the most paths
+    pairs = hypoth_conf.sorted_pairs(hypothgraph)
+    assert len(pairs) == len(nodes) * (len(nodes) - 1) // 2
+    for u, v, nb_paths in pairs:
+        assert nb_paths == counts[u].get(v, 0)
+        assert counts[v].get(u, 0) <= nb_paths
+
+    assert path_counting.top_pairs(hypothgraph, 1)[0] == \
+        (('source', 0), ('target', 0), pairs[-1][2])
+    assert [pair[2] for pair in path_counting.top_pairs(hypothgraph, 5)] == \
+        [pair[2] for pair in pairs[::-1][:5]]
+
+
+# Counts which do not fit in 64 bits stay exact
+def test_path_count_matrix_big_counts():
+    digraph = nx.DiGraph()
+    for i in range(70):
+        digraph.add_edges_from([(i, ('up', i)), (i, ('down', i)),
+                                (('up', i), i + 1), (('down', i), i + 1)])
+
+    matrix = path_counting.path_count_matrix(digraph, nodes=[0, 70])
+    assert matrix[0, 1] == 2**70
+    assert matrix[1, 0] == 0
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing relative confidence spectra
+#
+# Spectra from the cumulative contributions should be the same as evidencing
+# the nodes one at a time and computing the confidences from scratch
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf, boundary
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+from hypotest.stats import confidences
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture(params=['acyclic', 'cyclic'])
+def get_sample_configuration(request):
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4)
+    digraph.add_edge(2, 6)
+    digraph.add_path([1, 'a', 'b', 7])
+    if request.param == 'cyclic':
+        digraph.add_cycle([3, 4, 5])
+
+    big = convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+    small = big.subgraph(range(9))
+
+    return big, small, 1, 7
+
+
+# Reference spectrum, one confidence evaluation per step
+def step_by_step_spectrum(big, small, source, target):
+    evidenced_nodes = []
+    spectra = dict((key, []) for key in [
+        'sub_confidence_spectrum', 'big_confidence_spectrum',
+        'sub_confidence_normalized_spectrum',
+        'big_confidence_normalized_spectrum'])
+
+    nodes = [None] + list(boundary.in_boundary_interior(small, source, target))
+    for node in nodes:
+        if node is not None:
+            evidenced_nodes.append(node)
+        conf = Hypoth_Conf(source, target, list(evidenced_nodes))
+
+        spectra['sub_confidence_spectrum'].append(
+            compute_confidence.confidence(small, conf))
+        spectra['big_confidence_spectrum'].append(
+            compute_confidence.confidence(big, conf))
+        spectra['sub_confidence_normalized_spectrum'].append(
+            compute_confidence.normalized_confidence(small, conf))
+        spectra['big_confidence_normalized_spectrum'].append(
+            compute_confidence.normalized_confidence(big, conf))
+
+    return spectra
+
+
+def test_same_as_step_by_step(get_sample_configuration):
+    big, small, source, target = get_sample_configuration
+
+    spectra = confidences.relative_confidence_spectrum(big, small, source,
+                                                       target)
+    expected = step_by_step_spectrum(big, small, source, target)
+
+    assert sorted(spectra) == sorted(expected)
+    for key, spectrum in expected.items():
+        assert spectra[key] == pytest.approx(spectrum)
+        assert all(isinstance(value, float) for value in spectra[key])
+
+    # the full subgraph evidenced, only part of the big graph is
+    assert spectra['sub_confidence_normalized_spectrum'][-1] == \
+        pytest.approx(1.0)
+    assert spectra['big_confidence_normalized_spectrum'][-1] < 1.0
+
+
+
+# No path between the endpoints, nothing to evidence
+def test_cumulative_no_path(get_sample_configuration):
+    big, _, source, _ = get_sample_configuration
+    big.add_node('isolated')
+
+    cumulative, max_confidence = confidences.cumulative_confidences(
+            big, source, 'isolated', [2, 3, 'a'])
+    assert cumulative.tolist() == [0.0] * 4
+    assert max_confidence == 1.0
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import sqlite3
+import time
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing the result store
+#
+# Stored results should survive the store being reopened, follow the changes
+# of the hypothgraph, and the store should stay within its size
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+from hypotest.stats import confidences
+from hypotest.utils import result_store
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture
+def get_store(tmpdir):
+    store = result_store.use_result_store(str(tmpdir.join('results.sqlite')))
+    yield store
+    result_store.close_result_store()
+
+
+@pytest.fixture
+def get_hypothgraph():
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4)
+    digraph.add_edge(2, 6)
+
+    return convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+
+def test_put_get_evict(tmpdir):
+    path = str(tmpdir.join('store', 'results.sqlite'))
+    store = result_store.ResultStore(path, max_bytes=None)
+    store.put('a', {'spectrum': [0.0, 0.5]})
+    assert store.get('a') == {'spectrum': [0.0, 0.5]}
+    assert store.get('b', 'missing') == 'missing'
+    assert (store.hits, store.misses) == (1, 1)
+
+    # another reader of the same file
+    assert result_store.ResultStore(path).get('a') == {'spectrum': [0.0, 0.5]}
+
+    nb_results, nb_bytes = store.size()
+    store.max_bytes = 3 * nb_bytes
+    for key in 'bcde':
+        store.put(key, {'spectrum': [0.0, 0.5]})
+    assert store.size()[1] <= store.max_bytes
+    assert store.get('e') is not None
+    assert store.get('a') is None
+
+
+# Readers do not wait for a writer holding the lock
+def test_reader_does_not_wait(tmpdir):
+    path = str(tmpdir.join('results.sqlite'))
+    store = result_store.ResultStore(path, timeout=5)
+    store.put('a', [1, 2])
+
+    writer = sqlite3.connect(path)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        start = time.time()
+        assert store.get('a') == [1, 2]
+        assert time.time() - start < 1
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+# The store keeps the total size of its results
+def test_running_total(tmpdir):
+    path = str(tmpdir.join('results.sqlite'))
+    store = result_store.ResultStore(path, max_bytes=None)
+
+    def summed_sizes():
+        connection = sqlite3.connect(path)
+        try:
+            return connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        finally:
+            connection.close()
+
+    store.put('a', [1])
+    store.put('b', list(range(100)))
+    store.put('a', [1, 2])
+    assert store.size() == (2, summed_sizes())
+
+    store.max_bytes = store.size()[1] - 1
+    store.put('c', [3])
+    assert store.size()[1] == summed_sizes() <= store.max_bytes
+
+    store.clear()
+    assert store.size() == (0, 0)
+
+
+def test_stored_spectrum_keys(get_store, get_hypothgraph):
+    store = get_store
+    hypothgraph = get_hypothgraph
+    spectrum = confidences.confidence_spectrum
+
+    expected = spectrum(hypothgraph, 0, 8, method='analytic')
+    assert spectrum(hypothgraph, 0, 8, method='analytic') == expected
+    assert spectrum(hypothgraph.copy(), 0, 8, method='analytic') == expected
+    assert store.hits == 2
+
+    # another hypothgraph, another result
+    hypothgraph.remove_edge(2, 6)
+    assert spectrum(hypothgraph, 0, 8, method='analytic') != expected
+    assert store.misses == 2
+
+    # local importance functions have no stable name, they are not stored
+    nb_results = store.size()[0]
+    spectrum(hypothgraph, 0, 8, method='analytic',
+             func_importance=lambda H, node: 2)
+    assert store.size()[0] == nb_results
+
+
+# Confidences are computed inside the loops of the other functions, they are
+# not stored one by one
+def test_confidence_not_stored(get_store, get_hypothgraph):
+    store = get_store
+    conf = Hypoth_Conf(0, 8, [1, 3, 6])
+    compute_confidence.confidence(get_hypothgraph, conf)
+    compute_confidence.max_confidence(get_hypothgraph, 0, 8)
+
+    assert store.size()[0] == 0
+
+
+# A function redefined with another body (e.g. in a notebook) has other keys
+def test_redefined_function(get_store):
+    store = get_store
+    functions = []
+    for body in ('return 1.0', 'return 2.0'):
+        namespace = {'__name__': 'notebook'}
+        exec('def weight(hypothgraph, node):\n    ' + body, namespace)
+        functions.append(namespace['weight'])
+
+    results = []
+    for weight in functions:
+        stored_weight = result_store.stored(version=1)(weight)
+        results.append(stored_weight(None, 0))
+        assert stored_weight(None, 0) == results[-1]
+
+    assert results == [1.0, 2.0]
+    assert (store.hits, store.misses) == (2, 2)
+    assert result_store.argument_repr(functions[0]) != \
+        result_store.argument_repr(functions[1])
+
+
+def test_stored_spectrum(get_store, get_hypothgraph):
+    store = get_store
+    hypothgraph = get_hypothgraph
+
+    spectrum = confidences.confidence_spectrum(hypothgraph, 0, 8,
+                                               method='analytic')
+    assert confidences.confidence_spectrum(hypothgraph, 0, 8,
+                                           method='analytic') == spectrum
+    assert store.hits == 1
+
+    # unseeded samples are not stored
+    nb_results = store.size()[0]
+    confidences.confidence_spectrum(hypothgraph, 0, 8, method='sampled')
+    assert store.size()[0] == nb_results
+    confidences.confidence_spectrum(hypothgraph, 0, 8, method='sampled',
+                                    seed=0)
+    assert store.size()[0] == nb_results + 1
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import pickle
+import itertools as it
+
+import networkx as nx
+import numpy as np
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing compiled hypothesis graphs
+#
+# Compiled hypothgraph is an immutable snapshot of the hypothgraph with integer
+# ids, it should be accepted by confidence, boundary and paths functions
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf, boundary, paths
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+from hypotest.setup_hypothgraph.compiled_hypothgraph import compile_hypothgraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture(params=['acyclic', 'cyclic'])
+def get_hypothgraph(request):
+    digraph = nx.path_graph(11, create_using=nx.DiGraph())
+    digraph.add_edge(1, 5)
+    digraph.add_edge(3, 7)
+    if request.param == 'cyclic':
+        digraph.add_cycle([2, 3, 4])
+        digraph.add_cycle([6, 7, 8])
+
+    return convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+
+def test_compiled_arrays(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    compiled = compile_hypothgraph(hypothgraph)
+
+    assert len(compiled) == hypothgraph.number_of_nodes()
+    assert compiled.number_of_edges() == hypothgraph.number_of_edges()
+
+    for node in hypothgraph.nodes_iter():
+        i = compiled.node_id(node)
+        successors = compiled.succ_indices[
+            compiled.succ_indptr[i]:compiled.succ_indptr[i + 1]]
+        predecessors = compiled.pred_indices[
+            compiled.pred_indptr[i]:compiled.pred_indptr[i + 1]]
+
+        assert set(compiled.nodes_list[j] for j in successors) == \
+            set(hypothgraph.successors(node))
+        assert set(compiled.nodes_list[j] for j in predecessors) == \
+            set(hypothgraph.predecessors(node))
+        assert compiled.importance_weight[i] == \
+            hypothgraph.node[node]['importance_weight']
+        assert compiled.evidence_weight[i] == \
+            hypothgraph.node[node]['evidence_weight']
+
+    # arcs go forward in the topological order, and never to a previous
+    # strongly connected component
+    for u, v in hypothgraph.edges_iter():
+        i, j = compiled.node_id(u), compiled.node_id(v)
+        assert compiled.component_ids[i] <= compiled.component_ids[j]
+        if compiled.is_acyclic:
+            assert compiled.topological_position[i] < \
+                compiled.topological_position[j]
+
+
+# Changing the hypothgraph does not change its snapshot, and the snapshot
+# itself cannot be changed
+def test_compiled_is_snapshot(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    compiled = compile_hypothgraph(hypothgraph)
+
+    hypothgraph.add_edge(10, 0)
+    hypothgraph.node[0]['importance_weight'] = 100
+
+    assert not compiled.has_edge(10, 0)
+    assert compiled.node[0]['importance_weight'] != 100
+
+    with pytest.raises(ValueError):
+        compiled.importance_weight[0] = 100
+    with pytest.raises(TypeError):
+        compiled.node[0]['importance_weight'] = 100
+
+    # snapshot survives pickling, e.g. to be sent to other processes
+    unpickled = pickle.loads(pickle.dumps(compiled))
+    assert unpickled.edges() == compiled.edges()
+    assert np.array_equal(unpickled.importance_weight,
+                          compiled.importance_weight)
+
+
+def test_compiled_confidence(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    compiled = compile_hypothgraph(hypothgraph)
+    conf = Hypoth_Conf(0, 10, [1, 3, 6, 7, 9])
+
+    assert compute_confidence.confidence(compiled, conf) == \
+        compute_confidence.confidence(hypothgraph, conf)
+    assert compute_confidence.max_confidence(compiled, 0, 10) == \
+        compute_confidence.max_confidence(hypothgraph, 0, 10)
+    assert compute_confidence.normalized_confidence(compiled, conf) == \
+        compute_confidence.normalized_confidence(hypothgraph, conf)
+
+    # the same endpoints are sorted, or there is no path for both
+    def sorted_or_no_path(graph, u, v):
+        try:
+            return hypoth_conf.sort_hypoth_conf_endpoints(graph, u, v)
+        except Exception:
+            return None
+
+    for u, v in it.permutations(hypothgraph.nodes(), 2):
+        assert sorted_or_no_path(compiled, u, v) == \
+            sorted_or_no_path(hypothgraph, u, v)
+
+
+def test_compiled_boundary_and_paths(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    compiled = compile_hypothgraph(hypothgraph)
+    source, target = 1, 9
+
+    assert boundary.in_boundary_interior(compiled, source, target) == \
+        boundary.in_boundary_interior(hypothgraph, source, target)
+    assert set(boundary.on_boundary(compiled, source, target)) == \
+        set(boundary.on_boundary(hypothgraph, source, target))
+    assert boundary.is_sub_hypothgraph(compiled, hypothgraph, source, target)
+
+    assert paths.sort_simple_paths(compiled, source, target) == \
+        paths.sort_simple_paths(hypothgraph, source, target)
+    assert sorted(paths.passing_via_endpoints(compiled, source, target)) == \
+        sorted(paths.passing_via_endpoints(hypothgraph, source, target))
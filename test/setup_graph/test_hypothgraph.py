@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import pickle
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing versioned hypothgraphs
+#
+# Version counters should follow every change of the hypothgraph, also the
+# changes made in place by the graph mutations, and the content hash should
+# only depend on the content
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import hypoth_conf
+from hypotest.setup_hypothgraph import convert_to_hypothgraph, hypothgraph
+from hypotest.setup_hypothgraph.compiled_hypothgraph import compile_hypothgraph
+
+# ## Fixtures
+import pytest
+
+HypothGraph = hypothgraph.HypothGraph
+
+
+@pytest.fixture
+def get_hypothgraph():
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edge(1, 4, label='results in')
+    digraph.add_edge(2, 6)
+
+    return HypothGraph(digraph)
+
+
+def test_structure_version(get_hypothgraph):
+    versioned = get_hypothgraph
+    structure_version, attribute_version = versioned.version
+
+    versioned.add_edge(1, 4)
+    versioned.add_node(3)
+    versioned.add_edges_from([(0, 1), (2, 6)])
+    assert versioned.structure_version == structure_version
+
+    versioned.add_edge(0, 8)
+    assert versioned.structure_version == structure_version + 1
+    versioned.add_nodes_from(['a', 'b'])
+    versioned.remove_node('a')
+    versioned.remove_edge(0, 8)
+    assert versioned.structure_version == structure_version + 4
+
+    versioned.add_path([5, 'b'])
+    assert versioned.structure_version == structure_version + 5
+    assert versioned.attribute_version > attribute_version
+
+
+def test_attribute_version(get_hypothgraph):
+    versioned = get_hypothgraph
+    structure_version = versioned.structure_version
+
+    def changes(mutation):
+        attribute_version = versioned.attribute_version
+        mutation()
+        return versioned.attribute_version > attribute_version
+
+    assert changes(lambda: versioned.node[3].update(label='x'))
+    assert changes(lambda: versioned.node[3].__setitem__('label', 'y'))
+    assert changes(lambda: versioned[1][4].pop('label'))
+    assert changes(lambda: versioned.edge[2][6].setdefault('weight', 2))
+    assert changes(lambda: versioned.graph.update(name='hypothesis'))
+    assert changes(lambda: convert_to_hypothgraph.convert_to_hypothgraph(
+        versioned))
+    assert changes(lambda: hypoth_conf.assign_boundary(versioned, 0, 8))
+    assert changes(lambda: hypoth_conf.assign_boundary(versioned, 1, 7))
+    assert hypoth_conf.get_boundary_nodes(versioned) == (1, 7)
+    assert versioned.structure_version == structure_version
+
+    # a subgraph shares the dictionaries and follows their changes
+    subgraph = versioned.subgraph([1, 2, 6])
+    assert changes(lambda: subgraph.node[2].update(label='z'))
+    attribute_version = subgraph.attribute_version
+    versioned[2][6]['weight'] = 3
+    assert subgraph.attribute_version > attribute_version
+
+
+def test_copies(get_hypothgraph):
+    versioned = get_hypothgraph
+    versioned.node[3]['label'] = 'x'
+
+    for copy in (versioned.copy(), pickle.loads(pickle.dumps(versioned))):
+        assert isinstance(copy, HypothGraph)
+        assert copy.edges(data=True) == versioned.edges(data=True)
+        assert copy.content_hash() == versioned.content_hash()
+
+        attribute_version = versioned.attribute_version
+        copy_version = copy.attribute_version
+        copy.node[3]['label'] = 'y'
+        copy[1][4]['label'] = 'y'
+        assert versioned.attribute_version == attribute_version
+        assert copy.attribute_version > copy_version
+        assert versioned.node[3]['label'] == 'x'
+
+
+def test_content_hash(get_hypothgraph):
+    versioned = get_hypothgraph
+    digest = versioned.content_hash()
+
+    # insertion order does not matter, nor the kind of hypothgraph
+    reordered = nx.DiGraph(**versioned.graph)
+    reordered.add_edges_from(reversed(versioned.edges(data=True)))
+    assert hypothgraph.content_hash(reordered) == digest
+    assert hypothgraph.content_hash(compile_hypothgraph(versioned)) == digest
+
+    versioned.node[3]['evidence_weight'] = 1.0
+    assert versioned.content_hash() != digest
+    del versioned.node[3]['evidence_weight']
+    assert versioned.content_hash() == digest
+
+    versioned[1][4]['label'] = 'causes'
+    assert versioned.content_hash() != digest
+    versioned[1][4]['label'] = 'results in'
+
+    versioned.remove_edge(2, 6)
+    versioned.add_edge(6, 2)
+    assert versioned.content_hash() != digest
+
+
+def test_confidence_follows_versions(get_hypothgraph):
+    versioned = get_hypothgraph
+    conf = hypoth_conf.Hypoth_Conf(0, 8, [4, 6])
+
+    def importance(hypothgraph, node):
+        return hypothgraph.node[node].get('weight', 1)
+
+    confidence = compute_confidence.confidence(
+        versioned, conf, func_importance=importance)
+    versioned.node[4]['weight'] = 2
+    assert compute_confidence.confidence(
+        versioned, conf, func_importance=importance) > confidence
+
+    versioned.remove_edge(1, 2)
+    versioned.remove_edge(1, 4)
+    assert hypoth_conf.sort_hypoth_conf_endpoints(versioned, 2, 8) == (2, 8)
+    with pytest.raises(Exception):
+        hypoth_conf.sort_hypoth_conf_endpoints(versioned, 0, 8)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import random
+import itertools as it
+from collections import Counter
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing the reachability index
+#
+# Bitsets of descendants should answer the same as the graph traversals, and
+# should follow the changes of the hypothgraph
+from hypotest.graph_generation import hypoth_conf
+from hypotest.setup_hypothgraph import reachability_index
+from hypotest.setup_hypothgraph.compiled_hypothgraph import compile_hypothgraph
+from hypotest.setup_hypothgraph.hypothgraph import HypothGraph
+
+# ## Fixtures
+import pytest
+
+
+@pytest.fixture(params=[0, 1, 2, 'dag'])
+def get_digraph(request):
+    if request.param == 'dag':
+        digraph = nx.gnp_random_graph(12, 0.3, seed=0, directed=True)
+        digraph.remove_edges_from([(u, v) for u, v in digraph.edges()
+                                   if u > v])
+        return digraph
+
+    return nx.gnp_random_graph(12, 0.15, seed=request.param, directed=True)
+
+
+def test_has_path_and_precedes(get_digraph):
+    digraph = get_digraph
+    index = reachability_index.reachability_index(digraph)
+
+    assert index.is_acyclic == nx.is_directed_acyclic_graph(digraph)
+    for u, v in it.product(digraph.nodes(), repeat=2):
+        assert index.has_path(u, v) == nx.has_path(digraph, u, v)
+        assert index.precedes(u, v) == (
+            u != v and nx.has_path(digraph, u, v) and
+            not nx.has_path(digraph, v, u))
+
+    for node in digraph.nodes_iter():
+        assert index.descendants_of(node) == \
+            nx.descendants(digraph, node) | set([node])
+
+    compiled_index = reachability_index.reachability_index(
+            compile_hypothgraph(digraph))
+    for u, v in it.product(digraph.nodes(), repeat=2):
+        assert compiled_index.has_path(u, v) == index.has_path(u, v)
+
+
+# Index is rebuilt whenever the arcs change, even if the number of arcs stays
+# the same. Only versioned hypothgraphs keep their index
+@pytest.mark.parametrize('graph_class', [nx.DiGraph, HypothGraph])
+def test_index_follows_changes(graph_class):
+    digraph = graph_class([(0, 1), (1, 2)])
+    index = reachability_index.reachability_index(digraph)
+    is_cached = reachability_index.reachability_index(digraph) is index
+    assert is_cached == (graph_class is HypothGraph)
+    assert hypoth_conf.sort_hypoth_conf_endpoints(digraph, 2, 0) == (0, 2)
+
+    digraph.remove_edge(1, 2)
+    digraph.add_edge(2, 1)
+    assert not reachability_index.reachability_index(digraph).has_path(0, 2)
+    with pytest.raises(nx.NetworkXNoPath):
+        hypoth_conf.sort_hypoth_conf_endpoints(digraph, 0, 2)
+    # with a cycle the endpoints are kept as they are
+    digraph.add_edge(1, 0)
+    assert hypoth_conf.sort_hypoth_conf_endpoints(digraph, 2, 0) == (2, 0)
+
+    digraph.add_node(3)
+    assert reachability_index.reachability_index(digraph).has_path(3, 3)
+
+
+def test_random_reachable_pair(get_digraph):
+    digraph = get_digraph
+    index = reachability_index.reachability_index(digraph)
+    rand = random.Random(0)
+
+    reachable_pairs = set((u, v) for u, v in
+                          it.permutations(digraph.nodes(), 2)
+                          if nx.has_path(digraph, u, v))
+    drawn = Counter(index.random_reachable_pair(rand=rand)
+                    for _ in range(50 * len(reachable_pairs)))
+
+    # every reachable pair is drawn, and nothing else
+    assert set(drawn) == reachable_pairs
+
+    candidates = digraph.nodes()[:6]
+    for _ in range(100):
+        u, v = index.random_reachable_pair(nodes=candidates, rand=rand)
+        assert u in candidates and v in candidates
+        assert (u, v) in reachable_pairs
+
+
+def test_nth_bit():
+    bits = (1 << 3) | (1 << 64) | (1 << 200)
+
+    assert [reachability_index.nth_bit(bits, n) for n in range(3)] == \
+        [3, 64, 200]
+    assert list(reachability_index.iter_bits(bits)) == [3, 64, 200]
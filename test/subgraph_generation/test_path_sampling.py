@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import random
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing path sampling
+#
+# Ranks of the sampled paths should number all the simple paths exactly once,
+# and sub hypothgraphs generated from the sampled paths keep the topology
+from hypotest.graph_generation import path_sampling, sub_hypothgraph, boundary
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+
+# ## Fixtures
+import pytest
+
+
+@pytest.fixture(params=['acyclic', 'cyclic'])
+def get_hypothgraph(request):
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edges_from([(0, 2), (1, 4), (2, 6), (3, 5), (5, 8)])
+    if request.param == 'cyclic':
+        digraph.add_cycle([3, 4, 5])
+
+    return convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+
+def test_rank_unrank(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    sampler = path_sampling.PathSampler(hypothgraph, 0, 8)
+
+    simple_paths = list(nx.all_simple_paths(hypothgraph, 0, 8))
+    unranked = [sampler.unrank(rank) for rank in range(sampler.nb_paths)]
+
+    assert sampler.nb_paths == len(simple_paths)
+    assert sorted(unranked) == sorted(simple_paths)
+    for rank, path in enumerate(unranked):
+        assert sampler.rank(path) == rank
+
+    with pytest.raises(IndexError):
+        sampler.unrank(sampler.nb_paths)
+    assert path_sampling.PathSampler(hypothgraph, 8, 0).nb_paths == 0
+
+
+def test_sample_paths(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    sampler = path_sampling.PathSampler(hypothgraph, 0, 8)
+    rand = random.Random(0)
+
+    # without replacement all the paths are different
+    sampled = list(sampler.sample_paths(sampler.nb_paths, rand=rand))
+    assert sorted(sampled) == sorted(nx.all_simple_paths(hypothgraph, 0, 8))
+    with pytest.raises(ValueError):
+        list(sampler.sample_paths(sampler.nb_paths + 1, rand=rand))
+
+    # with replacement every path is drawn about as often
+    counts = dict.fromkeys(range(sampler.nb_paths), 0)
+    for path in sampler.sample_paths(200 * sampler.nb_paths, replace=True,
+                                     rand=rand):
+        counts[sampler.rank(path)] += 1
+    assert min(counts.values()) > 100
+
+
+# Too many paths to ever list them
+def test_sample_many_paths():
+    digraph = nx.DiGraph()
+    for i in range(70):
+        digraph.add_edges_from([(i, ('up', i)), (i, ('down', i)),
+                                (('up', i), i + 1), (('down', i), i + 1)])
+
+    sampler = path_sampling.PathSampler(digraph, 0, 70)
+    assert sampler.nb_paths == 2**70
+
+    rand = random.Random(0)
+    sampled = list(sampler.sample_paths(10, rand=rand))
+    assert len(set(map(tuple, sampled))) == 10
+    for path in sampled:
+        assert len(path) == 141
+        assert sampler.unrank(sampler.rank(path)) == path
+
+
+def test_many_to_many_sampler(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    nodes = [0, 3, 6, 8]
+    sampler = path_sampling.many_to_many_path_sampler(hypothgraph, nodes)
+
+    expected = [path for source in nodes for target in nodes
+                if source != target
+                for path in nx.all_simple_paths(hypothgraph, source, target)]
+    assert sorted(sampler.unrank(rank) for rank in range(sampler.nb_paths)) == \
+        sorted(expected)
+
+
+def test_generate_sub_hypothgraph(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    random.seed(0)
+
+    sub = sub_hypothgraph.generate_sub_hypothgraph(
+            hypothgraph, 0, 8, ratio_endpoints_paths=0.5,
+            ratio_on_boundary_paths=0.5)
+
+    assert boundary.is_sub_hypothgraph(sub, hypothgraph, 0, 8)
+    assert set(sub.edges()) <= set(hypothgraph.edges())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import itertools as it
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing paths via endpoints
+#
+# Paths composed of a prefix, a middle and a suffix should be all the simple
+# paths of the graph which pass via both endpoints
+from hypotest.graph_generation import paths
+
+# ## Fixtures
+import pytest
+
+
+@pytest.fixture(params=['acyclic', 'cyclic', 'random'])
+def get_digraph(request):
+    if request.param == 'random':
+        return nx.gnp_random_graph(8, 0.25, seed=3, directed=True)
+
+    digraph = nx.path_graph(8, create_using=nx.DiGraph())
+    digraph.add_edges_from([(0, 2), (1, 4), (3, 6), (2, 5)])
+    if request.param == 'cyclic':
+        digraph.add_cycle([3, 4, 5])
+        digraph.add_edge(6, 1)
+
+    return digraph
+
+
+# every simple path of the graph which contains both endpoints
+def brute_force_via_endpoints(digraph, source, target):
+    return [path
+            for u, v in it.permutations(digraph.nodes(), 2)
+            for path in nx.all_simple_paths(digraph, u, v)
+            if source in path and target in path]
+
+
+def test_passing_via_endpoints(get_digraph):
+    digraph = get_digraph
+
+    for source, target in [(1, 5), (5, 1), (2, 2), (0, 7)]:
+        expected = sorted(brute_force_via_endpoints(digraph, source, target))
+
+        composed = list(paths.passing_via_endpoints(digraph, source, target))
+        assert sorted(composed) == expected
+        assert paths.count_passing_via_endpoints(
+                digraph, source, target) == len(expected)
+
+        # streamed by increasing length
+        streamed = list(paths.passing_via_endpoints_sorted(
+                digraph, source, target))
+        assert sorted(streamed) == expected
+        assert [len(path) for path in streamed] == \
+            sorted(len(path) for path in expected)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# author: Asan Agibetov
+#
+# same old trick to put this directory into the path
+import os
+import sys
+import random
+
+import networkx as nx
+
+filename = os.path.abspath(__file__)
+dirname = os.path.dirname(filename)
+mypath = os.path.join(dirname, '..')
+mypath = os.path.abspath(mypath)
+sys.path.insert(0, mypath)
+
+# # Testing sub hypothgraph views
+#
+# Views should behave as the materialized subgraphs, and share the attributes
+# of the parent hypothgraph
+from hypotest.confidence import compute_confidence
+from hypotest.graph_generation import sub_hypothgraph, subgraph_view, \
+    boundary, hypoth_conf
+from hypotest.setup_hypothgraph import convert_to_hypothgraph
+from hypotest.setup_hypothgraph.compiled_hypothgraph import compile_hypothgraph
+
+# ## Fixtures
+import pytest
+
+Hypoth_Conf = hypoth_conf.Hypoth_Conf
+
+
+@pytest.fixture
+def get_hypothgraph():
+    digraph = nx.path_graph(9, create_using=nx.DiGraph())
+    digraph.add_edges_from([(0, 2), (1, 4), (2, 6), (3, 5), (5, 8)])
+
+    return convert_to_hypothgraph.convert_to_hypothgraph(digraph)
+
+
+def test_view(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    view = subgraph_view.SubHypothgraphView(hypothgraph)
+    view.add_path([0, 2, 6, 7, 8])
+    view.add_path([0, 1, 4, 5, 8])
+
+    assert len(view) == 8
+    assert 3 not in view and 2 in view
+    assert view.has_edge(2, 6) and not view.has_edge(2, 3)
+    assert sorted(view.successors(0)) == [1, 2]
+    assert view.predecessors(8) == [7, 5]
+
+    # attributes are the ones of the parent
+    assert view.node[2] is hypothgraph.node[2]
+    assert view[2][6] is hypothgraph[2][6]
+    with pytest.raises(KeyError):
+        view.node[3]
+    with pytest.raises(KeyError):
+        view.add_edge(0, 8)
+
+    # the view and its materialization are the same graph
+    digraph = view.materialize()
+    assert sorted(digraph.edges()) == sorted(view.edges())
+    assert sorted(digraph.nodes()) == sorted(view.nodes())
+    assert digraph.node[2] is hypothgraph.node[2]
+
+    conf = Hypoth_Conf(0, 8, [2, 4, 7])
+    assert compute_confidence.confidence(view, conf) == \
+        compute_confidence.confidence(digraph, conf)
+    assert boundary.in_boundary_interior(view, 0, 8) == \
+        boundary.in_boundary_interior(digraph, 0, 8)
+
+
+def test_generate_view(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+
+    random.seed(1)
+    digraph = sub_hypothgraph.generate_sub_hypothgraph(hypothgraph, 0, 8)
+    random.seed(1)
+    view = sub_hypothgraph.generate_sub_hypothgraph(hypothgraph, 0, 8,
+                                                    materialize=False)
+
+    assert isinstance(view, subgraph_view.SubHypothgraphView)
+    assert sorted(view.edges()) == sorted(digraph.edges())
+    assert boundary.is_sub_hypothgraph(view, hypothgraph, 0, 8)
+
+
+# Successors and predecessors of the materialized digraph share the arc
+# attributes of the parent
+def test_materialize_arc_data(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    hypothgraph[2][6]['weight'] = 2
+    view = subgraph_view.SubHypothgraphView(hypothgraph)
+    view.add_path([0, 2, 6, 7, 8])
+
+    digraph = view.materialize()
+    assert sorted(digraph.in_edges(data=True)) == \
+        sorted(digraph.edges(data=True))
+    assert digraph.pred[6][2] is digraph[2][6] is hypothgraph[2][6]
+    assert sorted(digraph.edges(data=True)) == sorted(view.edges(data=True))
+
+
+def test_generate_from_compiled(get_hypothgraph):
+    hypothgraph = get_hypothgraph
+    compiled = compile_hypothgraph(hypothgraph)
+
+    random.seed(1)
+    digraph = sub_hypothgraph.generate_sub_hypothgraph(hypothgraph, 0, 8)
+    random.seed(1)
+    from_compiled = sub_hypothgraph.generate_sub_hypothgraph(compiled, 0, 8)
+
+    assert isinstance(from_compiled, nx.DiGraph)
+    assert sorted(from_compiled.edges(data=True)) == \
+        sorted(digraph.edges(data=True))
+    assert sorted(from_compiled.in_edges(data=True)) == \
+        sorted(digraph.in_edges(data=True))
+    assert sorted(from_compiled.nodes(data=True)) == \
+        sorted(digraph.nodes(data=True))
+
+    # the snapshot is a standalone digraph
+    from_compiled.node[0]['evidenced'] = True
+    from_compiled[0][1]['weight'] = 2
+    assert 'weight' not in compiled[0][1]